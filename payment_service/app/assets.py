@@ -0,0 +1,214 @@
+"""
+Precompressed static assets
+
+Everything under static/ is read once, hashed and compressed (gzip, plus
+brotli when the brotli package is installed) and kept in memory.
+Templates link assets by content-hashed URL:
+
+    {{ asset_url("styles.css") }} -> /static/styles.1f0c2e9ab3d4.css
+
+Those URLs are served with a long, immutable Cache-Control; a changed file
+gets a new URL, so browsers never have to revalidate. The plain URL
+(/static/styles.css) still works, with no-cache, so it is revalidated by
+ETag.
+
+The same Asset type serves pages that have no per-request data (see
+templating.static_page). Responses pick the smallest encoding the client
+accepts (br, then gzip, then identity), and a matching If-None-Match is
+answered with 304 and no body.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict, Mapping, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response
+
+from payment_service.app import metrics
+from payment_service.app.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 256
+HASH_LENGTH = 12
+
+IMMUTABLE = f"public, max-age={settings.STATIC_MAX_AGE}, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first
+ENCODINGS = ("br", "gzip", "identity")
+
+STATIC_RESPONSES = metrics.counter(
+    "static_responses_total",
+    "Precompressed static responses by encoding and status",
+    ("encoding", "status")
+)
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """
+    Content codings an Accept-Encoding header allows (q > 0)
+    """
+    accepted = {"identity"}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding, params = coding.strip(), params.strip()
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted |= set(ENCODINGS) if coding == "*" else {coding}
+    return accepted
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class Asset:
+    """
+    One body with its precompressed variants and their ETags
+    """
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants["br"] = compressed
+        # Strong ETags must differ between encodings of the same content
+        self.etags = {
+            encoding: f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+    def negotiate(self, accept_encoding: str) -> str:
+        accepted = _accepted_encodings(accept_encoding)
+        return next(encoding for encoding in ENCODINGS if encoding in self.variants and encoding in accepted)
+
+    def response(self, request_headers: Mapping[str, str], cache_control: str = REVALIDATE) -> Response:
+        """
+        The variant for these request headers, or 304 when the client
+        already has it
+
+        Args:
+            request_headers: Request headers (Accept-Encoding, If-None-Match)
+            cache_control: Cache-Control of the response
+        """
+        encoding = self.negotiate(request_headers.get("accept-encoding", ""))
+        headers = {"ETag": self.etags[encoding], "Cache-Control": cache_control}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+
+        if _etag_matches(request_headers.get("if-none-match"), self.etags[encoding]):
+            STATIC_RESPONSES.inc(encoding=encoding, status="304")
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        STATIC_RESPONSES.inc(encoding=encoding, status="200")
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+class StaticAssets:
+    """
+    ASGI app serving a directory from memory; mount it at prefix
+    """
+
+    def __init__(self, directory: str = STATIC_DIR, prefix: str = "/static"):
+        self.directory = directory
+        self.prefix = prefix
+        # Served name -> (asset, Cache-Control); plain and hashed names
+        self._files: Dict[str, Tuple[Asset, str]] = {}
+        # Plain name -> hashed name
+        self._hashed: Dict[str, str] = {}
+        self._built = False
+
+    def build(self) -> int:
+        """
+        Read, hash and compress every file in the directory
+
+        Returns:
+            Number of files
+        """
+        files: Dict[str, Tuple[Asset, str]] = {}
+        hashed: Dict[str, str] = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    body = f.read()
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                asset = Asset(body, media_type)
+                stem, extension = os.path.splitext(relative)
+                hashed_name = f"{stem}.{asset.digest}{extension}"
+                files[relative] = (asset, REVALIDATE)
+                files[hashed_name] = (asset, IMMUTABLE)
+                hashed[relative] = hashed_name
+
+        self._files = files
+        self._hashed = hashed
+        self._built = True
+        logging.info(
+            "Prepared %d static assets (%s)",
+            len(hashed),
+            "gzip and brotli" if brotli is not None else "gzip only, brotli not installed"
+        )
+        return len(hashed)
+
+    def url(self, path: str) -> str:
+        """
+        Content-hashed URL of a file in the directory (the plain URL if
+        there is no such file)
+        """
+        if not self._built or settings.DEBUG:
+            # DEBUG: pick up edited files without a restart
+            self.build()
+        path = path.lstrip("/")
+        return f"{self.prefix}/{self._hashed.get(path, path)}"
+
+    async def __call__(self, scope, receive, send) -> None:
+        assert scope["type"] == "http"
+        if not self._built:
+            self.build()
+
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        entry = self._files.get(path.lstrip("/"))
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+        elif entry is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            asset, cache_control = entry
+            response = asset.response(Headers(scope=scope), cache_control)
+        await response(scope, receive, send)
+
+
+static_assets = StaticAssets()
@@ -0,0 +1,42 @@
+"""
+Admin API authentication
+
+Back-office endpoints (/transactions, /transactions/export, /stats, and
+/payments/batch, which creates transactions in bulk) require the
+ADMIN_API_TOKEN bearer token:
+
+    curl -H "Authorization: Bearer $ADMIN_API_TOKEN" http://localhost:8000/stats
+
+When ADMIN_API_TOKEN is not set they are closed (503) rather than open.
+"""
+import hmac
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from payment_service.app import metrics
+from payment_service.app.config import settings
+
+REJECTED = metrics.counter(
+    "admin_auth_rejected_total",
+    "Admin API requests rejected, by reason",
+    ("reason",)
+)
+
+_bearer = HTTPBearer(auto_error=False, description="ADMIN_API_TOKEN")
+
+
+def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> None:
+    """
+    Dependency: reject the request unless it carries the admin token
+    """
+    if not settings.ADMIN_API_TOKEN:
+        REJECTED.inc(reason="not_configured")
+        raise HTTPException(status_code=503, detail="Admin API is disabled (ADMIN_API_TOKEN is not set)")
+    if credentials is None:
+        REJECTED.inc(reason="missing")
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if not hmac.compare_digest(credentials.credentials.encode(), settings.ADMIN_API_TOKEN.encode()):
+        REJECTED.inc(reason="invalid")
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,159 @@
+"""
+Command line tools for the payment service
+
+Usage:
+    python -m payment_service.app.cli reconcile [--no-resume] [--limit N]
+    python -m payment_service.app.cli reconcile-window [--since-hours H | --from ISO --to ISO]
+    python -m payment_service.app.cli export --output FILE|- [--format csv|ndjson] [--gzip] [filters]
+    python -m payment_service.app.cli rollups-rebuild [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python -m payment_service.app.cli rollups-check [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python -m payment_service.app.cli archive [--older-than-days D] [--batch-size N] [--limit N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+from payment_service.app.config import settings
+from payment_service.app.db import async_engine
+from payment_service.app.services.http_client import close_http_client
+
+
+async def _reconcile(args: argparse.Namespace) -> dict:
+    from payment_service.app.services.reconciliation import ReconciliationService
+
+    service = ReconciliationService()
+    if args.chunk_size:
+        service.chunk_size = args.chunk_size
+    if args.concurrency:
+        service.concurrency = args.concurrency
+    if args.min_age is not None:
+        service.min_age = args.min_age
+    report = await service.run(resume=not args.no_resume, limit=args.limit)
+    return report.as_dict()
+
+
+async def _reconcile_window(args: argparse.Namespace) -> dict:
+    from payment_service.app.services.reconciliation import ReconciliationService
+
+    end = args.to or datetime.now(timezone.utc)
+    start = args.from_ or end - timedelta(hours=args.since_hours)
+    report = await ReconciliationService().run_window(start, end, per_page=args.per_page)
+    return report.as_dict()
+
+
+async def _export(args: argparse.Namespace) -> dict:
+    from payment_service.app.services.export import TransactionExport
+    from payment_service.app.services.transaction_query import TransactionFilters
+
+    filters = TransactionFilters(
+        status=args.status,
+        email=args.email,
+        created_from=args.from_,
+        created_to=args.to
+    )
+    export = TransactionExport(filters, format=args.format, compress=args.gzip, batch_size=args.batch_size)
+    to_stdout = args.output == "-"
+    out = sys.stdout.buffer if to_stdout else open(args.output, "wb")
+    try:
+        async for chunk in export.chunks():
+            out.write(chunk)
+    finally:
+        if to_stdout:
+            out.flush()
+        else:
+            out.close()
+    return {"output": args.output, "format": args.format, "gzip": args.gzip, "rows": export.rows, "bytes": export.bytes}
+
+
+async def _rollups_rebuild(args: argparse.Namespace) -> dict:
+    from payment_service.app.db import AsyncSessionLocal
+    from payment_service.app.services import rollups
+
+    async with AsyncSessionLocal() as db:
+        return await rollups.rebuild(db, args.from_, args.to)
+
+
+async def _rollups_check(args: argparse.Namespace) -> dict:
+    from payment_service.app.db import AsyncSessionLocal
+    from payment_service.app.services import rollups
+
+    async with AsyncSessionLocal() as db:
+        return await rollups.check(db, args.from_, args.to)
+
+
+async def _archive(args: argparse.Namespace) -> dict:
+    from payment_service.app.services.archival import ArchivalJob
+
+    job = ArchivalJob(older_than_days=args.older_than_days, batch_size=args.batch_size)
+    return await job.run(limit=args.limit)
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    try:
+        return await args.handler(args)
+    finally:
+        await close_http_client()
+        await async_engine.dispose()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="payment_service.app.cli", description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser("reconcile", help="Verify pending transactions against Paystack")
+    reconcile.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint and start from the first row")
+    reconcile.add_argument("--limit", type=int, default=None, help="Stop after scanning this many rows")
+    reconcile.add_argument("--chunk-size", type=int, default=None, help="Rows per keyset page")
+    reconcile.add_argument("--concurrency", type=int, default=None, help="Concurrent Paystack calls")
+    reconcile.add_argument("--min-age", type=float, default=None, help="Skip rows younger than this (seconds)")
+    reconcile.set_defaults(handler=_reconcile)
+
+    window = commands.add_parser("reconcile-window", help="Settle pending transactions from Paystack's transaction list")
+    window.add_argument("--from", dest="from_", type=datetime.fromisoformat, default=None, help="Window start (ISO 8601)")
+    window.add_argument("--to", type=datetime.fromisoformat, default=None, help="Window end (ISO 8601, default now)")
+    window.add_argument("--since-hours", type=float, default=24, help="Window length when --from is not given")
+    window.add_argument("--per-page", type=int, default=100, help="Paystack records per page")
+    window.set_defaults(handler=_reconcile_window)
+
+    export = commands.add_parser("export", help="Stream transactions to a CSV or NDJSON file")
+    export.add_argument("--output", "-o", required=True, help="File to write, or - for stdout")
+    export.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    export.add_argument("--gzip", action="store_true", help="Gzip the output")
+    export.add_argument("--status", default=None, help="Only this status")
+    export.add_argument("--email", default=None, help="Only this customer email")
+    export.add_argument("--from", dest="from_", type=datetime.fromisoformat, default=None, help="Created at or after (ISO 8601)")
+    export.add_argument("--to", type=datetime.fromisoformat, default=None, help="Created before (ISO 8601)")
+    export.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE, help="Rows per cursor fetch")
+    export.set_defaults(handler=_export)
+
+    rebuild = commands.add_parser("rollups-rebuild", help="Recompute daily rollups from the transactions table")
+    check = commands.add_parser("rollups-check", help="Compare daily rollups against the transactions table")
+    for command, handler in ((rebuild, _rollups_rebuild), (check, _rollups_check)):
+        command.add_argument("--from", dest="from_", type=date.fromisoformat, default=None, help="First day (default: all)")
+        command.add_argument("--to", type=date.fromisoformat, default=None, help="Last day, inclusive (default: all)")
+        command.set_defaults(handler=handler)
+
+    archive = commands.add_parser("archive", help="Move old settled transactions to transactions_archive")
+    archive.add_argument("--older-than-days", type=float, default=settings.ARCHIVE_AFTER_DAYS, help="Archive settled rows created before this many days ago")
+    archive.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE, help="Rows moved per transaction")
+    archive.add_argument("--limit", type=int, default=None, help="Stop after archiving this many rows")
+    archive.set_defaults(handler=_archive)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    args = build_parser().parse_args(argv)
+    result = asyncio.run(_run(args))
+    # Keep stdout clean when it carries the export itself
+    print(json.dumps(result, indent=2), file=sys.stderr if getattr(args, "output", None) == "-" else sys.stdout)
+    if result.get("consistent") is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,125 @@ class Settings:
     # Paystack Configuration
     PAYSTACK_SECRET_KEY: str = os.getenv("PAYSTACK_SECRET_KEY", "")
     PAYSTACK_PUBLIC_KEY: str = os.getenv("PAYSTACK_PUBLIC_KEY", "")
-    PAYSTACK_BASE_URL: str = "https://api.paystack.co"
-    
+    PAYSTACK_BASE_URL: str = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")  # point at bench/fake_paystack.py for load tests
+
+    # Paystack HTTP client (shared connection pool)
+    PAYSTACK_HTTP2: bool = os.getenv("PAYSTACK_HTTP2", "true").lower() == "true"
+    PAYSTACK_MAX_CONNECTIONS: int = int(os.getenv("PAYSTACK_MAX_CONNECTIONS", "100"))
+    PAYSTACK_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("PAYSTACK_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    PAYSTACK_KEEPALIVE_EXPIRY: float = float(os.getenv("PAYSTACK_KEEPALIVE_EXPIRY", "30"))
+    PAYSTACK_CONNECT_TIMEOUT: float = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", "5"))
+    PAYSTACK_READ_TIMEOUT: float = float(os.getenv("PAYSTACK_READ_TIMEOUT", "15"))
+    PAYSTACK_WRITE_TIMEOUT: float = float(os.getenv("PAYSTACK_WRITE_TIMEOUT", "10"))
+    PAYSTACK_POOL_TIMEOUT: float = float(os.getenv("PAYSTACK_POOL_TIMEOUT", "5"))
+
+    # Transaction references: node id (0-4095) unique per process, -1 leases a free one from the database
+    REFERENCE_NODE_ID: int = int(os.getenv("REFERENCE_NODE_ID", "-1"))
+    REFERENCE_NODE_LEASE: float = float(os.getenv("REFERENCE_NODE_LEASE", "60"))  # seconds; renewed every third of it
+
+    # Outbound protection for Paystack calls
+    PAYSTACK_RATE_LIMIT: float = float(os.getenv("PAYSTACK_RATE_LIMIT", "50"))  # requests/second, 0 disables
+    PAYSTACK_RATE_BURST: float = float(os.getenv("PAYSTACK_RATE_BURST", "50"))
+    PAYSTACK_RATE_LIMIT_MAX_WAIT: float = float(os.getenv("PAYSTACK_RATE_LIMIT_MAX_WAIT", "2"))  # fail instead of queueing longer
+    PAYSTACK_BREAKER_FAILURES: int = int(os.getenv("PAYSTACK_BREAKER_FAILURES", "5"))  # consecutive failures to open, 0 disables
+    PAYSTACK_BREAKER_RESET_TIMEOUT: float = float(os.getenv("PAYSTACK_BREAKER_RESET_TIMEOUT", "30"))
+    PAYSTACK_VERIFY_RETRIES: int = int(os.getenv("PAYSTACK_VERIFY_RETRIES", "2"))
+    PAYSTACK_RETRY_BACKOFF_BASE: float = float(os.getenv("PAYSTACK_RETRY_BACKOFF_BASE", "0.25"))
+    PAYSTACK_RETRY_BACKOFF_MAX: float = float(os.getenv("PAYSTACK_RETRY_BACKOFF_MAX", "2"))
+
+    # Inbound rate limits ("requests/seconds", "0" disables) and concurrency caps (0 = none)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory or redis
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # in-memory backend
+    RATE_LIMIT_TRUST_PROXY: bool = os.getenv("RATE_LIMIT_TRUST_PROXY", os.getenv("RENDER", "false")).lower() == "true"
+    RATE_LIMIT_INITIATE_IP: str = os.getenv("RATE_LIMIT_INITIATE_IP", "30/60")
+    RATE_LIMIT_INITIATE_EMAIL: str = os.getenv("RATE_LIMIT_INITIATE_EMAIL", "5/60")
+    RATE_LIMIT_BATCH_IP: str = os.getenv("RATE_LIMIT_BATCH_IP", "10/60")
+    RATE_LIMIT_SUCCESS_IP: str = os.getenv("RATE_LIMIT_SUCCESS_IP", "120/60")
+    MAX_CONCURRENT_REQUESTS: int = int(os.getenv("MAX_CONCURRENT_REQUESTS", "500"))  # whole app
+    MAX_CONCURRENT_INITIATE: int = int(os.getenv("MAX_CONCURRENT_INITIATE", "50"))
+    MAX_CONCURRENT_BATCH: int = int(os.getenv("MAX_CONCURRENT_BATCH", "2"))
+    MAX_CONCURRENT_SUCCESS: int = int(os.getenv("MAX_CONCURRENT_SUCCESS", "100"))
+
     # Database Configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./payment_service.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_MIGRATE_ON_STARTUP: bool = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"  # apply Alembic migrations in lifespan
+
+    # SQLite connection pragmas and group commit (see db.py, group_commit.py)
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes, 0 disables
+    DB_GROUP_COMMIT: str = os.getenv("DB_GROUP_COMMIT", "auto")  # auto (SQLite only), true, false
+    DB_GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("DB_GROUP_COMMIT_MAX_BATCH", "200"))
+    DB_GROUP_COMMIT_DELAY: float = float(os.getenv("DB_GROUP_COMMIT_DELAY", "0.002"))  # seconds to wait for more writes
     
+    # Webhook signature verification (x-paystack-signature, HMAC-SHA512 of the raw body)
+    WEBHOOK_VERIFY_SIGNATURE: bool = os.getenv("WEBHOOK_VERIFY_SIGNATURE", "true").lower() == "true"
+    PAYSTACK_WEBHOOK_SECRET: str = os.getenv("PAYSTACK_WEBHOOK_SECRET", os.getenv("PAYSTACK_SECRET_KEY", ""))
+
+    # Webhook inbox processing
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "2"))
+    WEBHOOK_BATCH_SIZE: int = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+    WEBHOOK_POLL_INTERVAL: float = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1.0"))
+    WEBHOOK_CLAIM_TIMEOUT: int = int(os.getenv("WEBHOOK_CLAIM_TIMEOUT", "60"))
+    WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+    WEBHOOK_DEDUP_CACHE_SIZE: int = int(os.getenv("WEBHOOK_DEDUP_CACHE_SIZE", "10000"))
+    WEBHOOK_DEDUP_TTL: float = float(os.getenv("WEBHOOK_DEDUP_TTL", "86400"))
+
+    # Archival of settled transactions to transactions_archive (see services/archival.py)
+    ARCHIVE_AFTER_DAYS: float = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))  # settled rows older than this move out of the hot table
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))  # rows moved per transaction
+    ARCHIVE_INTERVAL: float = float(os.getenv("ARCHIVE_INTERVAL", "0"))  # seconds, 0 disables the in-app schedule
+
+    # Verification result cache (/payments/success)
+    VERIFICATION_CACHE_SIZE: int = int(os.getenv("VERIFICATION_CACHE_SIZE", "10000"))
+    VERIFICATION_CACHE_TTL: float = float(os.getenv("VERIFICATION_CACHE_TTL", "300"))
+    VERIFICATION_PENDING_CACHE_TTL: float = float(os.getenv("VERIFICATION_PENDING_CACHE_TTL", "2"))
+    VERIFICATION_PENDING_REFRESH: int = int(os.getenv("VERIFICATION_PENDING_REFRESH", "10"))  # pending page auto-refresh (seconds)
+
+    # Reconciliation of pending transactions
+    RECONCILE_INTERVAL: float = float(os.getenv("RECONCILE_INTERVAL", "0"))  # seconds, 0 disables the in-app schedule
+    RECONCILE_CHUNK_SIZE: int = int(os.getenv("RECONCILE_CHUNK_SIZE", "200"))
+    RECONCILE_CONCURRENCY: int = int(os.getenv("RECONCILE_CONCURRENCY", "5"))
+    RECONCILE_MIN_AGE: float = float(os.getenv("RECONCILE_MIN_AGE", "900"))  # leave rows younger than this alone
+    RECONCILE_MAX_RETRIES: int = int(os.getenv("RECONCILE_MAX_RETRIES", "5"))
+    RECONCILE_BACKOFF_BASE: float = float(os.getenv("RECONCILE_BACKOFF_BASE", "1.0"))
+    RECONCILE_BACKOFF_MAX: float = float(os.getenv("RECONCILE_BACKOFF_MAX", "60"))
+    RECONCILE_PAGE_SIZE: int = int(os.getenv("RECONCILE_PAGE_SIZE", "100"))  # Paystack list page size (window mode)
+    RECONCILE_CHECKPOINT_PATH: str = os.getenv("RECONCILE_CHECKPOINT_PATH", "./reconcile_checkpoint.json")
+
+    # Health probes
+    HEALTH_CHECK_INTERVAL: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+    HEALTH_CHECK_TIMEOUT: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+    # Batch initiation (/payments/batch)
+    BATCH_INITIATE_MAX_ITEMS: int = int(os.getenv("BATCH_INITIATE_MAX_ITEMS", "5000"))
+    BATCH_INITIATE_CONCURRENCY: int = int(os.getenv("BATCH_INITIATE_CONCURRENCY", "10"))  # concurrent Paystack calls per batch
+
+    # Transaction listing (/transactions)
+    TRANSACTIONS_PAGE_SIZE: int = int(os.getenv("TRANSACTIONS_PAGE_SIZE", "50"))
+    TRANSACTIONS_MAX_PAGE_SIZE: int = int(os.getenv("TRANSACTIONS_MAX_PAGE_SIZE", "500"))
+    STATS_DEFAULT_DAYS: int = int(os.getenv("STATS_DEFAULT_DAYS", "30"))  # /stats range when none is given
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))  # rows per server-side cursor fetch
+
+    # Compiled template bytecode kept across restarts ("" = in memory only)
+    TEMPLATE_CACHE_DIR: str = os.getenv("TEMPLATE_CACHE_DIR", "")
+    # Browser cache lifetime of content-hashed /static URLs (seconds)
+    STATIC_MAX_AGE: int = int(os.getenv("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+
+    # Logging pipeline (see logs.py)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records waiting for the writer thread; beyond this they are dropped
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))  # share of high-volume INFO events kept (per-request lines, webhook receipts)
+
     # App Configuration
     APP_NAME: str = "FastAPI Payment Service"
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
@@ -24,6 +138,7 @@ class Settings:
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")  # bearer token for /transactions (incl. export), /stats and /payments/batch; empty disables them
     
     # CORS - Support both local and production origins
     ALLOWED_ORIGINS: list = os.getenv(
@@ -1,17 +1,145 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from payment_service.app.config import settings
+from payment_service.app import metrics
+from payment_service.app.instrumentation import instrument_engine
 
-# Create SQLAlchemy engine
+# Async driver used for each sync database URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(database_url: str) -> str:
+    """
+    Map a sync DATABASE_URL onto its async driver
+    (sqlite -> aiosqlite, postgresql -> asyncpg); async URLs pass through
+    """
+    scheme, sep, rest = database_url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme)
+    if driver is None:
+        return database_url
+    return f"{driver}{sep}{rest}"
+
+
+def to_sync_url(database_url: str) -> str:
+    """
+    Map DATABASE_URL onto a sync driver (Render hands out postgres:// URLs)
+    """
+    scheme, sep, rest = database_url.partition("://")
+    if scheme == "postgres":
+        return f"postgresql{sep}{rest}"
+    if scheme == "sqlite+aiosqlite":
+        return f"sqlite{sep}{rest}"
+    if scheme == "postgresql+asyncpg":
+        return f"postgresql{sep}{rest}"
+    return database_url
+
+
+def _connect_args(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"check_same_thread": False}  # Needed for SQLite
+    return {}
+
+
+def sqlite_pragmas() -> tuple:
+    """
+    Statements run on every new SQLite connection
+
+    WAL lets readers run alongside the writer and turns each commit into an
+    append to the log; with synchronous=NORMAL it is fsynced at checkpoints
+    rather than on every commit (durable against process crashes, a power
+    cut can lose the last commits). busy_timeout makes writers queue for
+    the lock instead of failing with "database is locked".
+    """
+    return (
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+
+def apply_sqlite_pragmas(sync_engine: Engine) -> None:
+    """
+    Run sqlite_pragmas() on each connection sync_engine opens (no-op for
+    other databases); for async engines pass async_engine.sync_engine
+    """
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _pool_kwargs() -> dict:
+    # aiosqlite defaults to NullPool (a new connection per checkout); pool it
+    # like Postgres so the pool settings apply to both backends
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+SYNC_DATABASE_URL = to_sync_url(settings.DATABASE_URL)
+ASYNC_DATABASE_URL = to_async_url(settings.DATABASE_URL)
+
+# Create SQLAlchemy engine (schema creation, CLI tools)
 engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    SYNC_DATABASE_URL,
+    connect_args=_connect_args(SYNC_DATABASE_URL)
+)
+
+# Async engine used by the request path
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_connect_args(ASYNC_DATABASE_URL),
+    **_pool_kwargs()
 )
 
+DB_COMMITS = metrics.counter(
+    "db_commits_total",
+    "Database transactions committed by the async engine"
+)
+
+
+@event.listens_for(async_engine.sync_engine, "commit")
+def _count_commit(conn):
+    DB_COMMITS.inc()
+
+
+instrument_engine(async_engine.sync_engine)
+apply_sqlite_pragmas(engine)
+apply_sqlite_pragmas(async_engine.sync_engine)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async sessions keep attributes loaded after commit so templates can render
+# them without lazy-loading on a closed session
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -22,3 +150,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
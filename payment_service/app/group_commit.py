@@ -0,0 +1,179 @@
+"""
+Group commit for request-path writes
+
+SQLite has one writer at a time and every commit costs a journal write,
+so with many concurrent requests each committing its own transaction most
+of the time goes to waiting for the lock and syncing. GroupCommitWriter
+funnels writes through one task instead: whatever was submitted while the
+previous batch committed (plus up to DB_GROUP_COMMIT_DELAY more) runs in a
+single transaction and one commit, with the daily rollup deltas of the
+whole batch merged into one upsert.
+
+An operation is an async callable taking the AsyncSession and returning
+its result. It must not commit, should not flush (rows added without a
+flush are inserted together at commit) and must build its rows inside the
+call: if any operation in a batch fails, the batch is rolled back and each
+operation is retried in its own transaction, so only the failing one sees
+its exception.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from payment_service.app import metrics
+from payment_service.app.config import settings
+from payment_service.app.db import AsyncSessionLocal, async_engine
+from payment_service.app.services.rollups import defer_rollups, end_deferred_rollups
+
+BATCH_SIZE = metrics.histogram(
+    "db_group_commit_batch_size",
+    "Write operations committed together by the group-commit writer",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+BATCH_RETRIES = metrics.counter(
+    "db_group_commit_retries_total",
+    "Batches rolled back and retried one operation at a time"
+)
+
+Operation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def group_commit_enabled() -> bool:
+    """
+    DB_GROUP_COMMIT: true, false, or auto (on for SQLite only; PostgreSQL
+    commits concurrently and gains little from serialising writes)
+    """
+    if settings.DB_GROUP_COMMIT == "auto":
+        return async_engine.dialect.name == "sqlite"
+    return settings.DB_GROUP_COMMIT.lower() == "true"
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        max_batch: int = settings.DB_GROUP_COMMIT_MAX_BATCH,
+        max_delay: float = settings.DB_GROUP_COMMIT_DELAY,
+        enabled: Optional[bool] = None
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enabled = group_commit_enabled() if enabled is None else enabled
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._loop(), name="group-commit-writer")
+
+    async def stop(self) -> None:
+        """
+        Commit everything already submitted, then stop
+        """
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._queue = None
+
+    async def submit(self, operation: Operation) -> Any:
+        """
+        Run operation in a shared transaction and wait for its commit
+
+        Returns:
+            The operation's result, once committed
+
+        Raises:
+            Whatever the operation (or the commit) raised
+        """
+        if self._task is None:
+            # Not started (CLI, tests) or disabled: a transaction of its own
+            return await self._run_alone(operation)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _run_alone(self, operation: Operation) -> Any:
+        async with self.session_factory() as db:
+            result = await operation(db)
+            await db.commit()
+            return result
+
+    async def _collect(self, first) -> Tuple[List, bool]:
+        """
+        The batch starting with first: everything already queued, then
+        whatever arrives within max_delay, up to max_batch
+        """
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch, stopping = await self._collect(first)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List) -> None:
+        BATCH_SIZE.observe(len(batch))
+        try:
+            async with self.session_factory() as db:
+                # One rollup upsert per day/status for the whole batch
+                deltas = defer_rollups(db)
+                try:
+                    results = [await operation(db) for operation, _ in batch]
+                finally:
+                    end_deferred_rollups(db)
+                await deltas.apply(db)
+                await db.commit()
+        except Exception as e:
+            if len(batch) == 1:
+                self._resolve(batch[0][1], error=e)
+                return
+            BATCH_RETRIES.inc()
+            logging.warning("Group commit of %d writes failed, retrying individually: %s", len(batch), e)
+            for operation, future in batch:
+                try:
+                    self._resolve(future, await self._run_alone(operation))
+                except Exception as error:
+                    self._resolve(future, error=error)
+            return
+
+        for (_, future), result in zip(batch, results):
+            self._resolve(future, result)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        # The submitter may have gone away (client disconnect); the write stands
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+db_writer = GroupCommitWriter()
@@ -0,0 +1,104 @@
+"""
+Liveness/readiness state, refreshed in the background
+
+Probes read a cached snapshot, so a load balancer polling every second per
+instance costs a dict copy rather than a database round-trip. A background
+task re-runs the dependency checks every HEALTH_CHECK_INTERVAL seconds.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from payment_service.app.config import settings
+from payment_service.app.db import async_engine
+from payment_service.app.services.paystack_service import PAYSTACK_LAST_SUCCESS, paystack_breaker
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        engine=async_engine,
+        interval: float = settings.HEALTH_CHECK_INTERVAL,
+        timeout: float = settings.HEALTH_CHECK_TIMEOUT
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.timeout = timeout
+        self._snapshot: Optional[Dict] = None
+        self._checked_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="health-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    async def snapshot(self) -> Dict:
+        """
+        Cached readiness state; checks inline only when nothing has
+        refreshed it recently (e.g. the background task is not running)
+        """
+        if self._snapshot is None or time.monotonic() - self._checked_at > self.interval * 2:
+            if self._refreshing is None or self._refreshing.done():
+                self._refreshing = asyncio.ensure_future(self.refresh())
+            await asyncio.shield(self._refreshing)
+        return self._snapshot
+
+    async def refresh(self) -> Dict:
+        database = await self._check_database()
+        last_success = PAYSTACK_LAST_SUCCESS.value()
+        paystack = {
+            "last_success": (
+                datetime.fromtimestamp(last_success, timezone.utc).isoformat() if last_success else None
+            ),
+            "seconds_since_success": round(time.time() - last_success, 1) if last_success else None,
+            "circuit": paystack_breaker.state,
+        }
+        self._snapshot = {
+            "ready": database["status"] == "connected",
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "database": database,
+            "paystack": paystack,
+        }
+        self._checked_at = time.monotonic()
+        return self._snapshot
+
+    async def _select_one(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _check_database(self) -> Dict:
+        """
+        Check out a pooled connection and run SELECT 1
+        """
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._select_one(), timeout=self.timeout)
+        except Exception as e:
+            logging.warning("Readiness database check failed: %s", e)
+            return {"status": "unavailable", "error": type(e).__name__}
+
+        pool = self.engine.sync_engine.pool
+        return {
+            "status": "connected",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "pool_checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        }
+
+
+health_monitor = HealthMonitor()
@@ -0,0 +1,153 @@
+"""
+Per-stage latency instrumentation
+
+- HTTP request latency per route (pure ASGI middleware)
+- DB query time per statement type and commit time (SQLAlchemy events)
+- DB and Paystack HTTP pool saturation (read at scrape time)
+
+Everything on the hot path is a perf_counter() pair and one histogram
+observe, so it stays on in production.
+"""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from payment_service.app import metrics
+from payment_service.app.config import settings
+
+REQUEST_LATENCY = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status")
+)
+DB_QUERY_LATENCY = metrics.histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ("statement",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+DB_COMMIT_LATENCY = metrics.histogram(
+    "db_commit_duration_seconds",
+    "Session commit time, including the flush",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+DB_POOL_CONNECTIONS = metrics.gauge(
+    "db_pool_connections",
+    "Async engine pool connections by state",
+    ("state",)
+)
+HTTP_POOL_CONNECTIONS = metrics.gauge(
+    "paystack_http_pool_connections",
+    "Paystack client connections by state (in_use is in-flight requests)",
+    ("state",)
+)
+PAYSTACK_IN_FLIGHT = metrics.gauge(
+    "paystack_requests_in_flight",
+    "Paystack API calls currently awaiting a response"
+)
+
+
+class MetricsMiddleware:
+    """
+    Record request latency labelled with the matched route template, so
+    /payments/success?reference=... and friends collapse to one series
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route_label(scope),
+                status=status_code
+            )
+
+
+def route_label(scope) -> str:
+    """
+    Route template of a finished request (/payments/success, not the
+    concrete URL), "mount" for mounted apps, "unmatched" otherwise
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unknown")
+    if scope.get("endpoint") is not None:
+        return "mount"
+    return "unmatched"
+
+
+def _statement_kind(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Time every statement executed through engine (pass async_engine.sync_engine)
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        DB_QUERY_LATENCY.observe(time.perf_counter() - started, statement=_statement_kind(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _execute_failed(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+    def collect_pool() -> None:
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return
+        DB_POOL_CONNECTIONS.set(pool.checkedout(), state="checked_out")
+        DB_POOL_CONNECTIONS.set(pool.checkedin(), state="idle")
+        DB_POOL_CONNECTIONS.set(pool.size() + max(0, getattr(pool, "_max_overflow", 0)), state="max")
+
+    metrics.registry.add_collector(collect_pool)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    session.info["commit_start"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    started = session.info.pop("commit_start", None)
+    if started is not None:
+        DB_COMMIT_LATENCY.observe(time.perf_counter() - started)
+
+
+def _collect_http_pool() -> None:
+    HTTP_POOL_CONNECTIONS.set(PAYSTACK_IN_FLIGHT.value(), state="in_use")
+    HTTP_POOL_CONNECTIONS.set(settings.PAYSTACK_MAX_CONNECTIONS, state="max")
+
+
+metrics.registry.add_collector(_collect_http_pool)
@@ -0,0 +1,35 @@
+"""
+JSON encoding/decoding with orjson when it is installed, stdlib json otherwise
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch
+# the stdlib exception either way
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data):
+    """
+    Parse JSON from bytes or str
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, default=None) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes
+
+    Args:
+        obj: Value to serialize
+        default: Called for objects JSON cannot represent (e.g. str)
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default) if default is not None else orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), default=default).encode()
@@ -0,0 +1,267 @@
+"""
+Structured logging off the request path
+
+configure() puts a QueueHandler on the root logger. A log call on the
+event loop only builds the LogRecord, stamps it with the current request's
+id and transaction reference and puts it on a bounded queue. A
+QueueListener thread formats it (one JSON object per line, or the plain
+text format) and writes it to stderr, so a slow log pipe never stalls the
+event loop. When the queue is full the record is dropped and counted
+instead of waited on.
+
+Messages take %-style arguments, merged into the message by the listener
+thread rather than by the caller. INFO events that happen on every request
+go through info_sampled(), which keeps LOG_SAMPLE_RATE of them and decides
+before any LogRecord is built; kept records carry "sampled": true.
+Everything else, and every warning and error, is always kept:
+
+    info_sampled("Received Paystack webhook: %s", event_type)
+    logging.error("Webhook processing error: %s", e)
+
+RequestContextMiddleware gives each request an id (X-Request-ID, taken
+from the request if the client sent a usable one) and, when the request
+finishes, logs a sampled line with method, route, status and duration_ms.
+"""
+import atexit
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from payment_service.app import jsonutil, metrics
+from payment_service.app.config import settings
+from payment_service.app.instrumentation import route_label
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    "log_records_dropped_total",
+    "Log records not written, by reason (sampled out, queue full)",
+    ("reason",)
+)
+
+# Request id and transaction reference of the request being served. A
+# dict rather than two variables so a reference bound inside the endpoint
+# is also seen by the middleware's request line.
+_request_context: ContextVar[Optional[Dict[str, str]]] = ContextVar("request_context", default=None)
+
+_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+# Arguments of these types cannot change after the call, so merging them
+# into the message can wait for the listener thread
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+# Attributes every LogRecord has; anything else came from extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_handler: Optional["ContextQueueHandler"] = None
+_listener: Optional["_Listener"] = None
+
+
+def info_sampled(message: str, *args, **fields) -> None:
+    """
+    Log a high-volume INFO event, keeping LOG_SAMPLE_RATE of them
+
+    Args:
+        message: %-style message
+        *args: Message arguments
+        **fields: Extra fields for the JSON record
+    """
+    if _handler is not None and random.random() >= _handler.sample_rate:
+        LOG_RECORDS_DROPPED.inc(reason="sampled")
+        return
+    fields["sampled"] = True
+    logging.info(message, *args, extra=fields)
+
+
+def bind_reference(reference: Optional[str]) -> None:
+    """
+    Attach a transaction reference to the rest of this request's log records
+    """
+    context = _request_context.get()
+    if context is not None and reference:
+        context["reference"] = reference
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: time, level, logger, message, the request
+    context and any extra= fields
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return jsonutil.dumps(entry, default=str).decode()
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Stamp records with the request context and enqueue them without
+    blocking; formatting is left to the listener thread
+    """
+
+    def __init__(self, log_queue: queue.Queue, sample_rate: float = settings.LOG_SAMPLE_RATE):
+        super().__init__(log_queue)
+        # Read by info_sampled()
+        self.sample_rate = sample_rate
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        context = _request_context.get()
+        if context is not None:
+            for key, value in context.items():
+                record.__dict__.setdefault(key, value)
+
+        # Objects passed as arguments may change before the listener gets
+        # to them; render those messages now
+        if record.args and not (
+            isinstance(record.args, tuple) and all(type(arg) in _IMMUTABLE_ARGS for arg in record.args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        # Same for tracebacks, whose frames keep running
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail on a full queue, so stop() always
+        # flushes and ends the thread
+        self.queue.put(self._sentinel)
+
+
+def configure(
+    level: str = settings.LOG_LEVEL,
+    log_format: str = settings.LOG_FORMAT,
+    queue_size: int = settings.LOG_QUEUE_SIZE,
+    sample_rate: float = settings.LOG_SAMPLE_RATE,
+    stream=None,
+    force: bool = False
+) -> bool:
+    """
+    Route root logging through the queue and start the writer thread
+
+    Like logging.basicConfig, this leaves a root logger that already has
+    other handlers alone unless force is set.
+
+    Args:
+        level: Root log level
+        log_format: "json" or "text"
+        queue_size: Records that may wait for the writer before new ones are dropped
+        sample_rate: Share of info_sampled() events kept (0-1)
+        stream: Output stream (default: stderr)
+        force: Replace existing root handlers
+
+    Returns:
+        True if the pipeline was installed
+    """
+    global _handler, _listener
+    root = logging.getLogger()
+    if any(handler is not _handler for handler in root.handlers) and not force:
+        return False
+
+    stop()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    _handler = ContextQueueHandler(log_queue, sample_rate)
+    _listener = _Listener(log_queue, output)
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    _listener.start()
+    return True
+
+
+def stop() -> None:
+    """
+    Write out queued records and stop the writer thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop)
+
+
+class RequestContextMiddleware:
+    """
+    Give each HTTP request an id for its log records and the X-Request-ID
+    response header, and log one sampled line per request
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not _REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        token = _request_context.set({"request_id": request_id})
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            info_sampled(
+                "%s %s %d",
+                scope["method"],
+                scope["path"],
+                status_code,
+                method=scope["method"],
+                route=route_label(scope),
+                status=status_code,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3)
+            )
+            _request_context.reset(token)
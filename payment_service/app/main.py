@@ -2,33 +2,67 @@
 FastAPI Payment Service - Main Application Entry Point
 Production-ready entry point for Render deployment
 """
-"""
-FastAPI Payment Service - Main Application Entry Point
-Production-ready entry point for Render deployment
-"""
+from payment_service.app import logs
+
+# JSON log records, written by a background thread (see logs.py). Set up
+# before the imports below, some of which log while being imported.
+logs.configure()
+
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine
-from payment_service.app.db import Base, engine
+from payment_service.app.db import async_engine
 from payment_service.app.config import settings
-from payment_service.app.routes import payments, webhook
-import logging
-
-# Rest of the code stays the same...
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+from payment_service.app.routes import payments, stats, transactions, webhook
+from payment_service.app.schema import init_schema
+from payment_service.app.services.http_client import start_http_client, close_http_client
+from payment_service.app.services.webhook_processor import webhook_processor
+from payment_service.app.services.reconciliation import reconciliation_scheduler
+from payment_service.app.services.archival import archival_scheduler
+from payment_service.app.services.references import node_lease
+from payment_service.app import metrics
+from payment_service.app.instrumentation import MetricsMiddleware
+from payment_service.app.ratelimit import LoadSheddingMiddleware
+from payment_service.app.health import health_monitor
+from payment_service.app.group_commit import db_writer
+from payment_service.app.assets import static_assets
+from payment_service.app.templating import static_page, warm_templates
+from contextlib import asynccontextmanager
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open shared resources on startup and release them on shutdown
+
+    Schema migrations run here rather than at import time, so importing
+    the app (tests, CLI, workers) never touches the database.
+    """
+    await init_schema()
+    # Fails startup when no reference node id can be leased
+    await node_lease.acquire()
+    static_assets.build()
+    warm_templates()
+    await start_http_client()
+    db_writer.start()
+    webhook_processor.start()
+    reconciliation_scheduler.start()
+    archival_scheduler.start()
+    health_monitor.start()
+    try:
+        yield
+    finally:
+        await health_monitor.stop()
+        await archival_scheduler.stop()
+        await reconciliation_scheduler.stop()
+        await webhook_processor.stop()
+        await db_writer.stop()
+        await close_http_client()
+        await node_lease.release()
+        await async_engine.dispose()
 
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     description="A FastAPI-based payment microservice with Paystack integration",
     version="1.0.0",
@@ -45,34 +79,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="payment_service/app/static"), name="static")
+# Refuse work with 503 once MAX_CONCURRENT_REQUESTS are in progress
+app.add_middleware(LoadSheddingMiddleware)
+
+# Per-route latency histograms for /metrics (outside LoadSheddingMiddleware, so shed requests are counted)
+app.add_middleware(MetricsMiddleware)
 
-# Initialize templates
-templates = Jinja2Templates(directory="payment_service/app/templates")
+# Request id and one sampled log line per request (outermost, so every
+# record of the request carries the id)
+app.add_middleware(logs.RequestContextMiddleware)
+
+# Static files, served from memory precompressed (see assets.py)
+app.mount("/static", static_assets, name="static")
 
 # Include routers
 app.include_router(payments.router)
 app.include_router(webhook.router)
+app.include_router(transactions.router)
+app.include_router(stats.router)
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """
     Home page with payment form
+
+    The page has no per-request data, so it is rendered once and served
+    precompressed, with 304 for clients that already have it.
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    return static_page("index.html").response(request.headers)
 
 @app.get("/health")
 async def health_check():
     """
-    Health check endpoint
+    Health check endpoint (cached readiness, see /health/ready)
     """
-    return {
-        "status": "ok",
-        "service": settings.APP_NAME,
-        "version": "1.0.0",
-        "database": "connected"
-    }
+    snapshot = await health_monitor.snapshot()
+    return JSONResponse(
+        {
+            "status": "ok" if snapshot["ready"] else "unavailable",
+            "service": settings.APP_NAME,
+            "version": "1.0.0",
+            "database": snapshot["database"]["status"]
+        },
+        status_code=200 if snapshot["ready"] else 503
+    )
+
+@app.get("/health/live")
+async def liveness_probe():
+    """
+    Liveness probe: the process is up and serving its event loop
+    """
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def readiness_probe():
+    """
+    Readiness probe: cached DB check and last Paystack success
+    """
+    snapshot = await health_monitor.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Prometheus metrics endpoint
+    """
+    return metrics.registry.render()
 
 @app.get("/info")
 async def app_info():
@@ -86,12 +158,17 @@ async def app_info():
         "endpoints": {
             "home": "/",
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
+            "metrics": "/metrics",
             "docs": "/docs",
             "payment_form": "/",
             "initiate_payment": "/payments/initiate",
             "payment_success": "/payments/success",
             "payment_failed": "/payments/failed",
-            "webhook": "/webhook/paystack"
+            "webhook": "/webhook/paystack",
+            "transactions": "/transactions",
+            "stats": "/stats"
         },
         "features": [
             "Paystack payment integration",
@@ -106,7 +183,7 @@ async def app_info():
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
-        "app.main:app",
+        "payment_service.app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.DEBUG
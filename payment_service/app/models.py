@@ -1,19 +1,198 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+import json
+import zlib
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Text, Index, LargeBinary
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from payment_service.app.db import Base
 
+
+# Transaction status state machine: status -> statuses it may move to.
+# pending -> pending only refreshes the gateway fields of an unsettled
+# transaction. Changes are applied by services/transitions.py.
+STATUS_TRANSITIONS = {
+    "pending": ("pending", "success", "failed"),
+    "success": (),
+    "failed": (),
+}
+
+# Statuses a transaction never leaves once reached
+TERMINAL_STATUSES = tuple(status for status, targets in STATUS_TRANSITIONS.items() if not targets)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON document stored as JSONB on PostgreSQL and as zlib-compressed
+    JSON bytes everywhere else (SQLite)
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            # Imported here so SQLite deployments never load the PostgreSQL dialect
+            from sqlalchemy.dialects.postgresql import JSONB
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode())
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return json.loads(zlib.decompress(value))
+
+
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Keyset pagination walks (created_at, id) newest first, optionally
+    # within one status or one email; see services/transaction_query.py
+    __table_args__ = (
+        Index("ix_transactions_created_at_id", "created_at", "id"),
+        Index("ix_transactions_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_transactions_email_created_at_id", "email", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(255), nullable=False, index=True)
+    email = Column(String(255), nullable=False)
     amount = Column(Integer, nullable=False)  # Amount in kobo (smallest currency unit)
     reference = Column(String(255), unique=True, nullable=False, index=True)
     status = Column(String(50), nullable=False, default="pending")
     paystack_reference = Column(String(255), nullable=True, index=True)
-    gateway_response = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Fields extracted from the gateway payload; the raw payloads live in gateway_events
+    gateway_status = Column(String(50), nullable=True)
+    channel = Column(String(50), nullable=True)
+    fees = Column(Integer, nullable=True)  # Paystack fees in kobo
+    paid_at = Column(DateTime(timezone=True), nullable=True)
+    # Set client-side too, so SQLite stores one sortable format with microseconds
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Never loaded implicitly: query GatewayEvent when the raw payload is needed
+    gateway_events = relationship(
+        "GatewayEvent",
+        primaryjoin="Transaction.reference == foreign(GatewayEvent.reference)",
+        lazy="raise",
+        viewonly=True
+    )
+
     def __repr__(self):
         return f"<Transaction(id={self.id}, email='{self.email}', amount={self.amount}, status='{self.status}')>"
+
+
+class ArchivedTransaction(Base):
+    """
+    Settled transactions moved out of the hot table by the archival job
+    (services/archival.py): the same columns plus archived_at. On
+    PostgreSQL the table is range-partitioned by month of created_at.
+    """
+    __tablename__ = "transactions_archive"
+    # Listing and export page through the archive like the hot table
+    __table_args__ = (
+        Index("ix_transactions_archive_reference", "reference"),
+        Index("ix_transactions_archive_created_at_id", "created_at", "id"),
+        Index("ix_transactions_archive_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_transactions_archive_email_created_at_id", "email", "created_at", "id"),
+    )
+
+    # Partitioned tables need the partition key in the primary key
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+    email = Column(String(255), nullable=False)
+    amount = Column(Integer, nullable=False)  # kobo
+    reference = Column(String(255), nullable=False)
+    status = Column(String(50), nullable=False)
+    paystack_reference = Column(String(255), nullable=True)
+    gateway_status = Column(String(50), nullable=True)
+    channel = Column(String(50), nullable=True)
+    fees = Column(Integer, nullable=True)
+    paid_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<ArchivedTransaction(id={self.id}, email='{self.email}', amount={self.amount}, status='{self.status}')>"
+
+
+class WebhookEvent(Base):
+    """
+    Inbox of raw Paystack webhook deliveries, drained by background workers
+    """
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        Index("ix_webhook_events_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    event_key = Column(String(255), nullable=False, unique=True)  # dedup key, see webhook_processor.event_key
+    event_type = Column(String(100), nullable=True)
+    reference = Column(String(255), nullable=True, index=True)
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, processed, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claim_token = Column(String(32), nullable=True, index=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<WebhookEvent(id={self.id}, event_type='{self.event_type}', reference='{self.reference}', status='{self.status}')>"
+
+
+class GatewayEvent(Base):
+    """
+    Raw Paystack payloads (verify responses, webhook data) for a transaction,
+    kept out of the hot transactions table
+    """
+    __tablename__ = "gateway_events"
+
+    id = Column(Integer, primary_key=True)
+    reference = Column(String(255), nullable=False, index=True)  # Transaction.reference
+    source = Column(String(20), nullable=False)  # verify, webhook, reconcile, initialize, legacy
+    gateway_status = Column(String(50), nullable=True)
+    payload = deferred(Column(CompressedJSON, nullable=False))
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<GatewayEvent(id={self.id}, reference='{self.reference}', source='{self.source}', gateway_status='{self.gateway_status}')>"
+
+
+class TransactionRollup(Base):
+    """
+    Transaction count and amount per UTC creation day and status,
+    maintained incrementally on every insert and status change
+    (see services/rollups.py)
+    """
+    __tablename__ = "transaction_rollups"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum_amount = Column(BigInteger, nullable=False, default=0)  # kobo
+
+    def __repr__(self):
+        return f"<TransactionRollup(day={self.day}, status='{self.status}', count={self.count}, sum_amount={self.sum_amount})>"
+
+
+class ReferenceNode(Base):
+    """
+    Lease on a transaction reference node id (0-4095), held by one process
+    while it runs and renewed in the background (see services/references.py)
+    """
+    __tablename__ = "reference_nodes"
+
+    node_id = Column(Integer, primary_key=True, autoincrement=False)
+    owner = Column(String(255), nullable=False)  # host:pid:random
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<ReferenceNode(node_id={self.node_id}, owner='{self.owner}', expires_at={self.expires_at})>"
@@ -0,0 +1,363 @@
+"""
+Inbound rate limiting and load shedding
+
+- Per-client sliding windows (by IP, and by email on /payments/initiate)
+  answer 429 with Retry-After once a client exceeds its rate
+- Per-route concurrency caps answer 503 when a route already has its
+  maximum number of requests in progress
+- LoadSheddingMiddleware caps requests in progress across the whole app
+
+Limits are configured per route in Settings (RATE_LIMIT_*,
+MAX_CONCURRENT_*). Window counters live in-process by default; with
+RATE_LIMIT_BACKEND=redis every instance shares them.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from payment_service.app import jsonutil, metrics
+from payment_service.app.config import settings
+
+RATE_LIMITED = metrics.counter(
+    "http_rate_limited_total",
+    "Requests rejected with 429 by per-client limits",
+    ("route", "key")
+)
+SHED = metrics.counter(
+    "http_shed_total",
+    "Requests rejected with 503 by concurrency caps",
+    ("route",)
+)
+IN_PROGRESS = metrics.gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled, by concurrency cap",
+    ("route",)
+)
+BACKEND_ERRORS = metrics.counter(
+    "rate_limit_backend_errors_total",
+    "Rate limit checks that failed open because the backend errored"
+)
+
+# Never shed probes, scrapes or static files: they are cheap and are how
+# an overloaded instance gets noticed
+EXEMPT_PREFIXES = ("/health", "/metrics", "/static")
+
+
+def parse_rate(value: str, setting: str = "rate limit") -> Optional[Tuple[int, float]]:
+    """
+    Parse "requests/seconds" (e.g. "30/60")
+
+    Args:
+        value: Configured rate
+        setting: Setting name for the error message
+
+    Returns:
+        (limit, window) or None when the limit is disabled ("" or "0")
+
+    Raises:
+        ValueError: Not "requests/seconds" with both parts positive
+    """
+    value = (value or "").strip()
+    if not value or value == "0":
+        return None
+    limit, _, window = value.partition("/")
+    try:
+        parsed = int(limit), float(window or 1)
+    except ValueError:
+        parsed = None
+    if parsed is None or parsed[0] <= 0 or not 0 < parsed[1] < math.inf:
+        raise ValueError(
+            f"Invalid {setting} {value!r}: expected \"requests/seconds\" with both above zero "
+            "(e.g. \"30/60\"), or \"0\" to disable"
+        )
+    return parsed
+
+
+def _window_state(previous: int, current: int, elapsed: float, limit: int, window: float) -> Optional[float]:
+    """
+    Sliding window counter: the previous fixed window's count is weighted
+    by how much of it still overlaps the sliding window
+
+    Returns:
+        None if one more request fits, else seconds until one would
+    """
+    remaining = 1 - elapsed / window
+    if previous * remaining + current + 1 <= limit:
+        return None
+    if current + 1 <= limit:
+        # Fits once enough of the previous window has slid out
+        return max(0.001, remaining * window - (limit - 1 - current) * window / previous)
+    # Not before the next window, and then only once current has slid out enough
+    return (window - elapsed) + window * max(0.0, 1 - (limit - 1) / current)
+
+
+class MemoryWindowBackend:
+    """
+    Per-process window counters, bounded LRU by key
+
+    Checks run on the event loop without awaiting, so they are atomic.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, list]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        """
+        Count a request for key if it fits in limit per window
+
+        Returns:
+            None when allowed, else the Retry-After in seconds
+        """
+        now = time.time()
+        index = int(now // window)
+        # Entries are [window index, previous window count, current window count]
+        entry = self._windows.get(key)
+        if entry is None or entry[0] < index - 1:
+            previous, current = 0, 0
+        elif entry[0] == index - 1:
+            previous, current = entry[2], 0
+        else:
+            previous, current = entry[1], entry[2]
+
+        retry_after = _window_state(previous, current, now - index * window, limit, window)
+        if retry_after is None:
+            current += 1
+        self._windows[key] = [index, previous, current]
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+        return retry_after
+
+    def clear(self) -> None:
+        self._windows.clear()
+
+
+# KEYS[1] current window, KEYS[2] previous window; ARGV limit, window, elapsed
+_REDIS_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+if previous * (1 - elapsed / window) + current + 1 <= limit then
+    redis.call('INCR', KEYS[1])
+    redis.call('PEXPIRE', KEYS[1], math.ceil(window * 2000))
+    return {1, current, previous}
+end
+return {0, current, previous}
+"""
+
+
+class RedisWindowBackend:
+    """
+    Window counters in Redis, shared by every instance; one Lua script
+    call per check keeps check-and-increment atomic
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_SCRIPT)
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+        allowed, current, previous = await self._script(
+            keys=[f"{self.prefix}:{key}:{index}", f"{self.prefix}:{key}:{index - 1}"],
+            args=[limit, window, elapsed]
+        )
+        if allowed:
+            return None
+        return _window_state(int(previous), int(current), elapsed, limit, window)
+
+
+def create_backend():
+    """
+    Backend selected by RATE_LIMIT_BACKEND (memory or redis)
+    """
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        try:
+            return RedisWindowBackend(settings.RATE_LIMIT_REDIS_URL)
+        except ImportError:
+            logging.warning("RATE_LIMIT_BACKEND=redis but the 'redis' package is missing, limiting per process")
+    return MemoryWindowBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
+class ConcurrencyLimit:
+    """
+    Non-blocking counter of requests in progress: over the limit, the
+    request is refused rather than queued
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.limit > 0 and self.active >= self.limit:
+            SHED.inc(route=self.name)
+            return False
+        self.active += 1
+        IN_PROGRESS.set(self.active, route=self.name)
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        IN_PROGRESS.set(self.active, route=self.name)
+
+
+class RouteLimit:
+    """
+    Limits for one route: requests per window by client IP and by email,
+    and requests in progress
+    """
+
+    def __init__(self, name: str, per_ip: str = "", per_email: str = "", concurrency: int = 0):
+        self.name = name
+        self.per_ip = parse_rate(per_ip, f"RATE_LIMIT_{name.upper()}_IP")
+        self.per_email = parse_rate(per_email, f"RATE_LIMIT_{name.upper()}_EMAIL")
+        self.concurrency = ConcurrencyLimit(name, concurrency)
+
+
+ROUTE_LIMITS: Dict[str, RouteLimit] = {
+    "initiate": RouteLimit(
+        "initiate",
+        per_ip=settings.RATE_LIMIT_INITIATE_IP,
+        per_email=settings.RATE_LIMIT_INITIATE_EMAIL,
+        concurrency=settings.MAX_CONCURRENT_INITIATE
+    ),
+    "batch": RouteLimit(
+        "batch",
+        per_ip=settings.RATE_LIMIT_BATCH_IP,
+        concurrency=settings.MAX_CONCURRENT_BATCH
+    ),
+    "success": RouteLimit(
+        "success",
+        per_ip=settings.RATE_LIMIT_SUCCESS_IP,
+        concurrency=settings.MAX_CONCURRENT_SUCCESS
+    ),
+}
+
+
+def client_ip(request: Request) -> str:
+    """
+    Caller's address; behind a trusted proxy (RATE_LIMIT_TRUST_PROXY) the
+    last X-Forwarded-For hop, the one the proxy itself appended
+    """
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _retry_after_header(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class RateLimiter:
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    async def check(self, route: str, kind: str, value: str, rate: Tuple[int, float]) -> None:
+        """
+        Raises:
+            HTTPException: 429 when value is over its rate on route
+        """
+        if self.backend is None:
+            self.backend = create_backend()
+        limit, window = rate
+        try:
+            retry_after = await self.backend.hit(f"{route}:{kind}:{value}", limit, window)
+        except Exception as e:
+            # A limiter outage must not take payments down with it
+            BACKEND_ERRORS.inc()
+            logging.warning("Rate limit check failed, allowing request: %s", e)
+            return
+        if retry_after is not None:
+            RATE_LIMITED.inc(route=route, key=kind)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please slow down",
+                headers=_retry_after_header(retry_after)
+            )
+
+
+rate_limiter = RateLimiter()
+
+
+def route_limit(name: str):
+    """
+    Dependency enforcing ROUTE_LIMITS[name] before the handler runs
+
+    Usage:
+        @router.post("/initiate", dependencies=[Depends(route_limit("initiate"))])
+    """
+    limits = ROUTE_LIMITS[name]
+
+    async def dependency(request: Request):
+        if settings.RATE_LIMIT_ENABLED:
+            if limits.per_ip:
+                await rate_limiter.check(name, "ip", client_ip(request), limits.per_ip)
+            if limits.per_email:
+                # Starlette caches the parsed form, so the handler's Form()
+                # parameters do not read the body again
+                form = await request.form()
+                email = (form.get("email") or "").strip().lower()
+                if email:
+                    await rate_limiter.check(name, "email", email, limits.per_email)
+
+        if not limits.concurrency.try_acquire():
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry shortly",
+                headers=_retry_after_header(1)
+            )
+        try:
+            yield
+        finally:
+            limits.concurrency.release()
+
+    return dependency
+
+
+class LoadSheddingMiddleware:
+    """
+    Refuse requests with 503 once MAX_CONCURRENT_REQUESTS are in progress,
+    before any routing, body parsing or DB work
+    """
+
+    def __init__(self, app, limit: int = settings.MAX_CONCURRENT_REQUESTS):
+        self.app = app
+        self.concurrency = ConcurrencyLimit("all", limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.concurrency.try_acquire():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": jsonutil.dumps({"detail": "Server busy, please retry shortly"}),
+            })
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency.release()
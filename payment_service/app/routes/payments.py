@@ -1,27 +1,44 @@
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
-from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from payment_service.app.db import get_db
-from payment_service.app.models import Transaction
-from payment_service.app.services.paystack_service import PaystackService
+from fastapi.responses import RedirectResponse
+from pydantic import BaseModel, Field
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from payment_service.app.auth import require_admin
+from payment_service.app.db import get_async_db
+from payment_service.app.group_commit import db_writer
+from payment_service.app.logs import bind_reference
+from payment_service.app.models import Transaction, utcnow
+from payment_service.app.ratelimit import route_limit
+from payment_service.app.services.batch_initiation import BatchInitiator
+from payment_service.app.services.paystack_service import PaystackService, PaystackUnavailableError
+from payment_service.app.services.rollups import RollupDeltas
 from payment_service.app.services.verification import VerificationService
 from payment_service.app.config import settings
+from payment_service.app.templating import templates
 import logging
+import math
 
 router = APIRouter(prefix="/payments", tags=["payments"])
-templates = Jinja2Templates(directory="payment_service/app/templates")
 
 # Initialize services
 paystack_service = PaystackService()
-verification_service = VerificationService()
+verification_service = VerificationService(paystack_service=paystack_service)
+batch_initiator = BatchInitiator(paystack_service)
 
-@router.post("/initiate")
+
+class BatchPaymentItem(BaseModel):
+    email: str = Field(..., min_length=3, max_length=255, pattern=r"^[^@\s]+@[^@\s]+$")
+    amount: int = Field(..., ge=100, description="Amount in kobo (minimum 1 NGN)")
+
+
+class BatchPaymentRequest(BaseModel):
+    payments: List[BatchPaymentItem] = Field(..., min_length=1, max_length=settings.BATCH_INITIATE_MAX_ITEMS)
+
+@router.post("/initiate", dependencies=[Depends(route_limit("initiate"))])
 async def initiate_payment(
     request: Request,
     email: str = Form(...),
-    amount: int = Form(...),
-    db: Session = Depends(get_db)
+    amount: int = Form(...)
 ):
     """
     Initiate payment with Paystack
@@ -36,18 +53,28 @@ async def initiate_payment(
         
         # Generate unique reference
         reference = paystack_service.generate_reference()
+        bind_reference(reference)
         
-        # Create transaction record
-        transaction = Transaction(
-            email=email,
-            amount=amount,
-            reference=reference,
-            status="pending"
-        )
-        
-        db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
+        # Create transaction record, committed together with other
+        # requests' writes (see group_commit.py)
+        async def create_transaction(db: AsyncSession) -> Transaction:
+            transaction = Transaction(
+                email=email,
+                amount=amount,
+                reference=reference,
+                status="pending",
+                created_at=utcnow()
+            )
+            # No flush: the batch's rows are inserted together at commit
+            db.add(transaction)
+
+            # Count the new pending transaction in the daily rollups
+            deltas = RollupDeltas()
+            deltas.add(transaction.created_at, transaction.status, transaction.amount)
+            await deltas.apply(db)
+            return transaction
+
+        await db_writer.submit(create_transaction)
         
         # Prepare callback URL
         base_url = str(request.base_url).rstrip('/')
@@ -71,16 +98,40 @@ async def initiate_payment(
                 detail=f"Payment initialization failed: {paystack_response.get('message', 'Unknown error')}"
             )
             
+    except PaystackUnavailableError as e:
+        # Fail fast rather than queue behind an outage; the pending
+        # transaction is left for reconciliation to close out
+        logging.warning("Payment initiation refused: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="Payment provider temporarily unavailable, please try again shortly",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after or 1)))}
+        )
     except Exception as e:
-        logging.error(f"Payment initiation error: {str(e)}")
+        logging.error("Payment initiation error: %s", e)
         raise HTTPException(status_code=500, detail=f"Payment initiation failed: {str(e)}")
 
-@router.get("/success")
+@router.post("/batch", dependencies=[Depends(require_admin), Depends(route_limit("batch"))])
+async def initiate_batch(request: Request, batch: BatchPaymentRequest):
+    """
+    Initiate many payments at once (invoicing runs); admin token only
+
+    Returns one result per item, in order, with the reference and either
+    the Paystack authorization_url or the error. Items Paystack rejects are
+    recorded as failed transactions; the others are kept.
+    """
+    callback_url = f"{str(request.base_url).rstrip('/')}/payments/success"
+    return await batch_initiator.initiate(
+        [item.model_dump() for item in batch.payments],
+        callback_url=callback_url
+    )
+
+@router.get("/success", dependencies=[Depends(route_limit("success"))])
 async def payment_success(
     request: Request,
     reference: str = None,
     trxref: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle successful payment redirect from Paystack
@@ -88,6 +139,7 @@ async def payment_success(
     try:
         # Use trxref if reference is not provided (Paystack standard)
         transaction_ref = reference or trxref
+        bind_reference(transaction_ref)
         
         if not transaction_ref:
             return templates.TemplateResponse(
@@ -116,6 +168,17 @@ async def payment_success(
                     "amount_ngn": transaction.amount / 100  # Convert from kobo to NGN
                 }
             )
+        elif transaction.status == "pending":
+            # Not settled yet, or Paystack could not be reached: never show
+            # a failure for a payment that may have gone through
+            return templates.TemplateResponse(
+                "pending.html",
+                {
+                    "request": request,
+                    "transaction": transaction,
+                    "refresh_seconds": settings.VERIFICATION_PENDING_REFRESH
+                }
+            )
         else:
             return templates.TemplateResponse(
                 "failed.html", 
@@ -127,7 +190,7 @@ async def payment_success(
             )
             
     except Exception as e:
-        logging.error(f"Payment success handling error: {str(e)}")
+        logging.error("Payment success handling error: %s", e)
         return templates.TemplateResponse(
             "failed.html", 
             {"request": request, "error": f"Error processing payment: {str(e)}"}
@@ -138,7 +201,7 @@ async def payment_failed(
     request: Request,
     reference: str = None,
     trxref: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle failed payment
@@ -147,9 +210,7 @@ async def payment_failed(
     transaction = None
     
     if transaction_ref:
-        transaction = db.query(Transaction).filter(
-            Transaction.reference == transaction_ref
-        ).first()
+        transaction = await verification_service.get_transaction(db, transaction_ref)
     
     return templates.TemplateResponse(
         "failed.html", 
@@ -0,0 +1,48 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from payment_service.app.auth import require_admin
+from payment_service.app.db import get_async_db
+from payment_service.app.config import settings
+from payment_service.app.services.rollups import read_stats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("", dependencies=[Depends(require_admin)])
+async def transaction_stats(
+    start: Optional[date] = Query(None, alias="from", description="First day (YYYY-MM-DD, UTC)"),
+    end: Optional[date] = Query(None, alias="to", description="Last day, inclusive (default today)"),
+    status: Optional[str] = Query(None, description="Only this status"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Transaction count and volume per day and status
+
+    Served from the transaction_rollups table, so the cost depends on the
+    number of days requested, not the number of transactions.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=settings.STATS_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+
+    rows = await read_stats(db, start, end, status)
+
+    totals: Dict[str, Dict[str, int]] = {}
+    for row in rows:
+        total = totals.setdefault(row.status, {"count": 0, "sum_amount": 0})
+        total["count"] += row.count
+        total["sum_amount"] += row.sum_amount
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "days": [
+            {"day": row.day.isoformat(), "status": row.status, "count": row.count, "sum_amount": row.sum_amount}
+            for row in rows
+            if row.count
+        ],
+        "totals": totals,
+    }
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from payment_service.app.auth import require_admin
+from payment_service.app.db import get_async_db
+from payment_service.app.config import settings
+from payment_service.app.services.export import TransactionExport
+from payment_service.app.services.transaction_query import (
+    InvalidCursor, TransactionFilters, list_transactions as fetch_page
+)
+
+router = APIRouter(prefix="/transactions", tags=["transactions"])
+
+
+def transaction_filters(
+    status: Optional[str] = Query(None, description="pending, success or failed"),
+    email: Optional[str] = Query(None, description="Customer email (exact match)"),
+    created_from: Optional[datetime] = Query(None, alias="from", description="Created at or after (ISO 8601)"),
+    created_to: Optional[datetime] = Query(None, alias="to", description="Created before (ISO 8601)")
+) -> TransactionFilters:
+    return TransactionFilters(status=status, email=email, created_from=created_from, created_to=created_to)
+
+
+@router.get("", dependencies=[Depends(require_admin)])
+async def list_transactions(
+    filters: TransactionFilters = Depends(transaction_filters),
+    limit: int = Query(settings.TRANSACTIONS_PAGE_SIZE, ge=1, le=settings.TRANSACTIONS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List transactions newest first, filtered by status, email and date range
+
+    Pass the returned next_cursor to fetch the following page; it is null
+    on the last page.
+    """
+    try:
+        items, next_cursor = await fetch_page(db, filters, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "data": items,
+        "filters": filters.as_dict(),
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+async def export_transactions(
+    filters: TransactionFilters = Depends(transaction_filters),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = Query(False, description="Gzip the file"),
+):
+    """
+    Stream every matching transaction, oldest first, as CSV or NDJSON
+
+    Same filters as GET /transactions. Rows are read through a server-side
+    cursor and written as they arrive, so any size of export runs in
+    constant memory.
+    """
+    export = TransactionExport(filters, format=format, compress=gzip)
+    return StreamingResponse(
+        export.chunks(),
+        media_type=export.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export.filename}"'}
+    )
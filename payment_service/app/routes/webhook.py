@@ -1,80 +1,89 @@
-from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlalchemy.orm import Session
-from payment_service.app.db import get_db
-from payment_service.app.models import Transaction
+from fastapi import APIRouter, Request, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from payment_service.app.group_commit import db_writer
+from payment_service.app.models import WebhookEvent
+from payment_service.app.services.signature import WebhookSignatureVerifier
+from payment_service.app.services.webhook_processor import (
+    DUPLICATES, event_key, seen_events, webhook_processor
+)
 from payment_service.app.config import settings
-import json
+from payment_service.app import jsonutil, metrics
+from payment_service.app.logs import bind_reference, info_sampled
 import logging
 
 router = APIRouter(prefix="/webhook", tags=["webhooks"])
 
+signature_verifier = WebhookSignatureVerifier(settings.PAYSTACK_WEBHOOK_SECRET)
+
+REJECTED = metrics.counter(
+    "webhook_rejected_total",
+    "Webhook requests rejected before parsing",
+    ("reason",)
+)
+
 @router.post("/paystack")
-async def paystack_webhook(
-    request: Request,
-    db: Session = Depends(get_db)
-):
+async def paystack_webhook(request: Request):
     """
     Handle Paystack webhook events
+
+    The event is stored in the webhook inbox with a single insert (group
+    committed with concurrent writes, see group_commit.py) and acknowledged
+    immediately; background workers apply it to the transaction (see
+    services/webhook_processor.py). Redeliveries of an event already in the
+    inbox are acknowledged without touching it.
+
+    The x-paystack-signature HMAC is checked over the raw bytes first, so
+    forged or junk requests are rejected before any parsing or DB access.
     """
+    # Get the raw body
+    body = await request.body()
+
+    if settings.WEBHOOK_VERIFY_SIGNATURE and not signature_verifier.verify(
+        body, request.headers.get("x-paystack-signature")
+    ):
+        REJECTED.inc(reason="signature")
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
     try:
-        # Get the raw body
-        body = await request.body()
-        
         # Parse JSON payload
-        payload = json.loads(body.decode('utf-8'))
-        
-        # Verify webhook signature (in production, you should verify the signature)
-        # For now, we'll process the webhook directly
-        
+        payload = jsonutil.loads(body)
+
         event_type = payload.get("event")
-        data = payload.get("data", {})
-        
-        logging.info(f"Received Paystack webhook: {event_type}")
-        
-        if event_type == "charge.success":
-            # Handle successful payment
-            reference = data.get("reference")
-            
-            if reference:
-                transaction = db.query(Transaction).filter(
-                    Transaction.reference == reference
-                ).first()
-                
-                if transaction:
-                    transaction.status = "success"
-                    transaction.paystack_reference = data.get("paystack_reference")
-                    transaction.gateway_response = json.dumps(data)
-                    
-                    db.commit()
-                    db.refresh(transaction)
-                    
-                    logging.info(f"Updated transaction {reference} to success")
-        
-        elif event_type == "charge.failed":
-            # Handle failed payment
-            reference = data.get("reference")
-            
-            if reference:
-                transaction = db.query(Transaction).filter(
-                    Transaction.reference == reference
-                ).first()
-                
-                if transaction:
-                    transaction.status = "failed"
-                    transaction.paystack_reference = data.get("paystack_reference")
-                    transaction.gateway_response = json.dumps(data)
-                    
-                    db.commit()
-                    db.refresh(transaction)
-                    
-                    logging.info(f"Updated transaction {reference} to failed")
-        
-        return {"status": "success", "message": "Webhook processed"}
-        
-    except json.JSONDecodeError:
+        data = payload.get("data") or {}
+
+        bind_reference(data.get("reference"))
+        info_sampled("Received Paystack webhook: %s", event_type)
+
+        key = event_key(event_type, data, body)
+        if key in seen_events:
+            DUPLICATES.inc(source="cache")
+            return {"status": "success", "message": "Duplicate webhook ignored"}
+
+        async def store_event(db: AsyncSession) -> None:
+            db.add(WebhookEvent(
+                event_key=key,
+                event_type=event_type,
+                reference=data.get("reference"),
+                payload=body.decode('utf-8')
+            ))
+
+        try:
+            await db_writer.submit(store_event)
+        except IntegrityError:
+            seen_events.set(key, True)
+            DUPLICATES.inc(source="database")
+            return {"status": "success", "message": "Duplicate webhook ignored"}
+
+        seen_events.set(key, True)
+        webhook_processor.notify()
+
+        return {"status": "success", "message": "Webhook received"}
+
+    except jsonutil.JSONDecodeError:
         logging.error("Invalid JSON in webhook payload")
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
-        
+
     except Exception as e:
-        logging.error(f"Webhook processing error: {str(e)}")
+        logging.error("Webhook processing error: %s", e)
         raise HTTPException(status_code=500, detail="Webhook processing failed")
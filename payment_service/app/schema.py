@@ -0,0 +1,209 @@
+"""
+Database schema setup
+
+Tables are created and changed by the Alembic migrations in
+payment_service/migrations. On startup the app brings the database up to
+date (DB_MIGRATE_ON_STARTUP); when it already is, that costs one SELECT
+and Alembic is never imported. Run `alembic upgrade head` instead to
+migrate outside the app.
+"""
+import ast
+import asyncio
+import json
+import logging
+import os
+from typing import Dict
+
+from sqlalchemy import Text, inspect, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from payment_service.app.config import settings
+from payment_service.app.db import Base, async_engine, engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+# Newest revision in migrations/versions: bump it with every new migration
+SCHEMA_REVISION = "0004"
+# Revision matching the schema the app created with create_all before
+# migrations existed, and the tables it had
+BASELINE_REVISION = "0001"
+BASELINE_TABLES = ("transactions", "webhook_events", "gateway_events", "transaction_rollups")
+
+# Indexes create_all-era transactions tables have that the baseline replaced
+# (email lookups use ix_transactions_email_created_at_id)
+LEGACY_INDEXES = ("ix_transactions_email",)
+# Columns transactions gained with gateway_events; create_all-era tables lack them
+GATEWAY_COLUMNS = ("gateway_status", "channel", "fees", "paid_at")
+_LEGACY_BATCH_SIZE = 1000
+
+# Arbitrary key serialising concurrent migrations from several workers on PostgreSQL
+_ADVISORY_LOCK_KEY = 7_240_118_001
+
+
+async def current_revision(db_engine: AsyncEngine = async_engine):
+    """
+    Revision recorded in alembic_version, or None for an unversioned database
+    """
+    async with db_engine.connect() as conn:
+        try:
+            return await conn.scalar(text("SELECT version_num FROM alembic_version"))
+        except Exception:
+            return None
+
+
+def _legacy_payload(value: str) -> Dict:
+    """
+    Parse an old transactions.gateway_response: json.dumps(data) from
+    webhooks, str(response) from verification, or an error message
+    """
+    try:
+        payload = json.loads(value)
+    except ValueError:
+        try:
+            payload = ast.literal_eval(value)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            payload = None
+    return payload if isinstance(payload, dict) else {"gateway_response": value}
+
+
+def add_gateway_columns(conn) -> None:
+    """
+    Give a create_all-era transactions table the gateway columns, and move
+    its gateway_response text into gateway_events (source "legacy"),
+    filling the new columns from it
+
+    Args:
+        conn: Sync connection inside the migration transaction; gateway_events
+            must exist
+    """
+    from payment_service.app.models import GatewayEvent, Transaction, utcnow
+    from payment_service.app.services.gateway_events import extract_fields
+
+    table = Transaction.__table__
+    columns = {column["name"] for column in inspect(conn).get_columns("transactions")}
+    for name in GATEWAY_COLUMNS:
+        if name not in columns:
+            column_type = table.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE transactions ADD COLUMN {name} {column_type}"))
+    if "gateway_response" not in columns:
+        return
+
+    # No longer in the model, so referred to by name
+    gateway_response = literal_column("gateway_response", Text)
+    moved = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.reference, table.c.created_at, table.c.updated_at, gateway_response)
+            .where(table.c.id > last_id, gateway_response.is_not(None))
+            .order_by(table.c.id)
+            .limit(_LEGACY_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        events = []
+        for row in rows:
+            payload = _legacy_payload(row.gateway_response)
+            # Verify responses wrap the transaction in "data"
+            data = payload["data"] if isinstance(payload.get("data"), dict) else payload
+            fields = extract_fields(data)
+            known = {name: value for name, value in fields.items() if value is not None}
+            if known:
+                conn.execute(table.update().where(table.c.id == row.id).values(known))
+            events.append({
+                "reference": row.reference,
+                "source": "legacy",
+                "gateway_status": fields["gateway_status"],
+                "payload": payload,
+                "created_at": row.updated_at or row.created_at or utcnow(),
+            })
+        conn.execute(GatewayEvent.__table__.insert(), events)
+        moved += len(events)
+        last_id = rows[-1].id
+
+    conn.execute(text("ALTER TABLE transactions DROP COLUMN gateway_response"))
+    logging.info("Moved %d legacy gateway responses to gateway_events", moved)
+
+
+def add_baseline_indexes(conn) -> None:
+    """
+    Give a create_all-era transactions table the baseline's indexes (the
+    composite keyset indexes) and drop the ones they replaced
+    """
+    from payment_service.app.models import Transaction
+
+    existing = {index["name"] for index in inspect(conn).get_indexes("transactions")}
+    for name in LEGACY_INDEXES:
+        if name in existing:
+            conn.execute(text(f"DROP INDEX {name}"))
+    for index in Transaction.__table__.indexes:
+        if index.name not in existing:
+            index.create(conn)
+            logging.info("Created index %s", index.name)
+
+
+def backfill_rollups(conn) -> None:
+    """
+    Fill transaction_rollups from a create_all-era transactions table
+
+    The rollups are only kept up to date from the moment they exist, so
+    rows written before that would be missing from /stats. Whatever the
+    table already holds is replaced. There is no archive table yet at the
+    baseline revision.
+    """
+    from payment_service.app.models import Transaction, TransactionRollup
+    from payment_service.app.services.rollups import _aggregate
+
+    table = TransactionRollup.__table__
+    conn.execute(table.delete())
+    result = conn.execute(
+        table.insert().from_select(
+            [table.c.day, table.c.status, table.c["count"], table.c.sum_amount],
+            _aggregate(conn.dialect.name, None, None, models=(Transaction,))
+        )
+    )
+    logging.info("Backfilled %d transaction rollup rows", result.rowcount)
+
+
+def upgrade() -> None:
+    """
+    Apply pending migrations (blocking; uses the sync engine)
+
+    Databases created by create_all before migrations existed are brought
+    to the baseline first (missing tables, the gateway columns, indexes,
+    rollups backfilled from existing transactions) and stamped with the baseline revision.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+        config.attributes["connection"] = conn
+
+        tables = set(inspect(conn).get_table_names())
+        if "alembic_version" not in tables and "transactions" in tables:
+            logging.warning("Unversioned database, adding missing tables and stamping revision %s", BASELINE_REVISION)
+            from payment_service.app import models  # noqa: F401  (registers the tables)
+            # Only the baseline's tables: later ones are created by their migrations
+            Base.metadata.create_all(conn, tables=[Base.metadata.tables[name] for name in BASELINE_TABLES])
+            add_gateway_columns(conn)
+            add_baseline_indexes(conn)
+            backfill_rollups(conn)
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+
+
+async def init_schema() -> None:
+    """
+    Lifespan hook: migrate the database to SCHEMA_REVISION if it is behind
+    """
+    if not settings.DB_MIGRATE_ON_STARTUP:
+        return
+    revision = await current_revision()
+    if revision == SCHEMA_REVISION:
+        return
+    logging.info("Migrating database schema from %s to %s", revision or "empty", SCHEMA_REVISION)
+    await asyncio.to_thread(upgrade)
@@ -0,0 +1,232 @@
+"""
+Hot/archive split of the transactions table
+
+transactions only needs to hold what is still in play: pending rows and
+recently settled ones. The archival job moves settled rows older than
+ARCHIVE_AFTER_DAYS to transactions_archive. Each batch is one database
+transaction (INSERT ... SELECT, then DELETE). Settled rows never change
+again (see models.STATUS_TRANSITIONS), so rows can be moved without
+locking them against updates. The hot table's indexes and the pending
+scans stay sized to recent traffic.
+
+On PostgreSQL the archive is range-partitioned by month of created_at.
+The job creates each month's partition (transactions_archive_YYYY_MM)
+before moving rows into it, so an old month can later be detached or
+dropped as a whole. On SQLite the archive is a plain table.
+
+find_transaction() looks a reference up in the hot table and then in the
+archive, so callers do not care where a row lives. Generated references
+carry their creation time (services/references.py), which confines the
+archive lookup to one or two partitions. Daily rollups count both tables,
+so moving a row does not change /stats.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Union
+
+from sqlalchemy import DateTime, delete, insert, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from payment_service.app import metrics
+from payment_service.app.config import settings
+from payment_service.app.db import AsyncSessionLocal
+from payment_service.app.models import TERMINAL_STATUSES, ArchivedTransaction, Transaction, utcnow
+from payment_service.app.services.references import reference_time
+
+ARCHIVED = metrics.counter(
+    "transactions_archived_total",
+    "Settled transactions moved to transactions_archive"
+)
+ARCHIVE_LOOKUPS = metrics.counter(
+    "transaction_archive_lookups_total",
+    "Reference lookups that missed the hot table and went to the archive",
+    ("result",)
+)
+
+# Arbitrary key so only one archival job runs at a time on PostgreSQL
+_ADVISORY_LOCK_KEY = 7_240_118_024
+
+# Generated references and created_at are moments apart; a day either side
+# is ample and still prunes the archive to at most two monthly partitions
+_REFERENCE_TIME_WINDOW = timedelta(days=1)
+
+# Copied column by column; archived_at is set by the job
+_COLUMNS = [column.name for column in Transaction.__table__.columns]
+
+
+def partition_name(month: date) -> str:
+    return f"transactions_archive_{month.year:04d}_{month.month:02d}"
+
+
+def _month_start(value: datetime) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+async def ensure_partitions(db: AsyncSession, months: Iterable[date]) -> int:
+    """
+    Create the monthly archive partitions that do not exist yet
+    (PostgreSQL only; a no-op elsewhere)
+
+    Returns:
+        Number of partitions checked
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return 0
+    months = sorted(set(months))
+    for month in months:
+        following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF transactions_archive "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{following.isoformat()} 00:00:00+00')"
+        ))
+    return len(months)
+
+
+async def find_transaction(
+    db: AsyncSession,
+    reference: str
+) -> Optional[Union[Transaction, ArchivedTransaction]]:
+    """
+    Load a transaction by reference from the hot table or, failing that,
+    the archive
+
+    Returns:
+        Transaction, ArchivedTransaction (same attributes, always settled)
+        or None if not found
+    """
+    result = await db.execute(select(Transaction).where(Transaction.reference == reference))
+    transaction = result.scalar_one_or_none()
+    if transaction is not None:
+        return transaction
+
+    query = select(ArchivedTransaction).where(ArchivedTransaction.reference == reference)
+    generated_at = reference_time(reference)
+    if generated_at is not None:
+        query = query.where(
+            ArchivedTransaction.created_at >= generated_at - _REFERENCE_TIME_WINDOW,
+            ArchivedTransaction.created_at < generated_at + _REFERENCE_TIME_WINDOW
+        )
+    archived = (await db.execute(query)).scalars().first()
+    ARCHIVE_LOOKUPS.inc(result="hit" if archived is not None else "miss")
+    return archived
+
+
+class ArchivalJob:
+    """
+    Move settled transactions older than older_than_days to the archive,
+    batch_size rows per database transaction
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        older_than_days: float = settings.ARCHIVE_AFTER_DAYS,
+        batch_size: int = settings.ARCHIVE_BATCH_SIZE
+    ):
+        self.session_factory = session_factory
+        self.older_than_days = older_than_days
+        self.batch_size = batch_size
+
+    def cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=self.older_than_days)
+
+    async def run(self, limit: Optional[int] = None) -> Dict:
+        """
+        Archive everything eligible (or up to limit rows)
+
+        Returns:
+            Report with the cutoff, rows archived and batches committed
+        """
+        cutoff = self.cutoff()
+        archived = 0
+        batches = 0
+        while limit is None or archived < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - archived)
+            moved = await self._archive_batch(cutoff, size)
+            if moved is None:
+                logging.info("Another archival job is running, skipping")
+                break
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+
+        if archived:
+            logging.info("Archived %d transactions created before %s in %d batches", archived, cutoff.isoformat(), batches)
+        return {"cutoff": cutoff.isoformat(), "archived": archived, "batches": batches}
+
+    async def _archive_batch(self, cutoff: datetime, size: int) -> Optional[int]:
+        """
+        Returns:
+            Rows moved, or None when another job holds the archival lock
+        """
+        async with self.session_factory() as db:
+            if db.get_bind().dialect.name == "postgresql":
+                locked = await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+                if not locked:
+                    return None
+
+            result = await db.execute(
+                select(Transaction.id, Transaction.created_at)
+                .where(Transaction.status.in_(TERMINAL_STATUSES), Transaction.created_at < cutoff)
+                .order_by(Transaction.created_at, Transaction.id)
+                .limit(size)
+            )
+            rows = result.all()
+            if not rows:
+                return 0
+
+            ids = [row.id for row in rows]
+            await ensure_partitions(db, (_month_start(row.created_at) for row in rows))
+            hot = Transaction.__table__
+            await db.execute(
+                insert(ArchivedTransaction.__table__).from_select(
+                    _COLUMNS + ["archived_at"],
+                    select(*(hot.c[name] for name in _COLUMNS), literal(utcnow(), DateTime(timezone=True)))
+                    .where(hot.c.id.in_(ids))
+                )
+            )
+            await db.execute(delete(hot).where(hot.c.id.in_(ids)))
+            await db.commit()
+
+        ARCHIVED.inc(len(ids))
+        return len(ids)
+
+
+class ArchivalScheduler:
+    """
+    Run the archival job every ARCHIVE_INTERVAL seconds inside the app
+    """
+
+    def __init__(self, job: Optional[ArchivalJob] = None, interval: float = settings.ARCHIVE_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        self.job = self.job or ArchivalJob()
+        self._task = asyncio.create_task(self._loop(), name="archival")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.job.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error("Scheduled archival error: %s", e)
+
+
+archival_scheduler = ArchivalScheduler()
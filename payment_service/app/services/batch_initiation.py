@@ -0,0 +1,144 @@
+"""
+Batch payment initiation
+
+All transactions of a batch are inserted with one multi-row INSERT and
+committed before Paystack is called, then initialize_transaction fans out
+under a semaphore. Items Paystack rejects are marked failed (with the
+error in gateway_events) in one follow-up transaction; the rest of the
+batch is unaffected.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import insert
+
+from payment_service.app import metrics
+from payment_service.app.config import settings
+from payment_service.app.db import AsyncSessionLocal
+from payment_service.app.models import Transaction, utcnow
+from payment_service.app.services.gateway_events import event_row, record_events, settle, settle_params
+from payment_service.app.services.paystack_service import PaystackService
+from payment_service.app.services.rollups import RollupDeltas
+
+BATCH_ITEMS = metrics.counter(
+    "payment_batch_items_total",
+    "Batch initiation items by outcome",
+    ("outcome",)
+)
+
+
+class BatchInitiator:
+    def __init__(
+        self,
+        paystack_service: Optional[PaystackService] = None,
+        session_factory=AsyncSessionLocal,
+        concurrency: int = settings.BATCH_INITIATE_CONCURRENCY
+    ):
+        self.paystack_service = paystack_service or PaystackService()
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+
+    async def initiate(self, items: Sequence[Dict], callback_url: str) -> Dict:
+        """
+        Create and initialize one transaction per item
+
+        Args:
+            items: Dicts with email and amount (kobo)
+            callback_url: Where Paystack redirects after checkout
+
+        Returns:
+            Summary and per-item results, in input order, each with the
+            reference and either authorization_url or error
+        """
+        started = time.perf_counter()
+        created_at = utcnow()
+        rows = [
+            {
+                "email": item["email"],
+                "amount": item["amount"],
+                "reference": self.paystack_service.generate_reference(),
+                "status": "pending",
+                "created_at": created_at,
+            }
+            for item in items
+        ]
+
+        async with self.session_factory() as db:
+            await db.execute(insert(Transaction), rows)
+            deltas = RollupDeltas()
+            for row in rows:
+                deltas.add(created_at, "pending", row["amount"])
+            await deltas.apply(db)
+            await db.commit()
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(
+            self._initialize(index, row, callback_url, semaphore) for index, row in enumerate(rows)
+        ))
+
+        failures = [result for result in results if result["status"] == "failed"]
+        if failures:
+            await self._record_failures(failures)
+
+        BATCH_ITEMS.inc(len(results) - len(failures), outcome="initialized")
+        BATCH_ITEMS.inc(len(failures), outcome="failed")
+        elapsed = time.perf_counter() - started
+        logging.info(
+            "Batch initiation: %d/%d initialized in %.2fs", len(results) - len(failures), len(results), elapsed
+        )
+        return {
+            "count": len(results),
+            "initialized": len(results) - len(failures),
+            "failed": len(failures),
+            "elapsed_seconds": round(elapsed, 3),
+            "results": results,
+        }
+
+    async def _initialize(self, index: int, row: Dict, callback_url: str, semaphore: asyncio.Semaphore) -> Dict:
+        result = {
+            "index": index,
+            "reference": row["reference"],
+            "email": row["email"],
+            "amount": row["amount"],
+            "status": "failed",
+            "authorization_url": None,
+            "error": None,
+        }
+        async with semaphore:
+            try:
+                response = await self.paystack_service.initialize_transaction(
+                    email=row["email"],
+                    amount=row["amount"],
+                    reference=row["reference"],
+                    callback_url=callback_url
+                )
+            except Exception as e:
+                result["error"] = str(e)
+                return result
+
+        if response.get("status"):
+            result["status"] = "initialized"
+            result["authorization_url"] = response["data"]["authorization_url"]
+        else:
+            result["error"] = f"Payment initialization failed: {response.get('message', 'Unknown error')}"
+        return result
+
+    async def _record_failures(self, failures: List[Dict]) -> None:
+        """
+        Mark the transactions Paystack would not initialize as failed and
+        keep the error, without touching the initialized ones
+        """
+        try:
+            async with self.session_factory() as db:
+                await settle(db, [settle_params(f["reference"], "failed", None, {}) for f in failures])
+                await record_events(db, [
+                    event_row(f["reference"], "initialize", {"status": False, "message": f["error"]})
+                    for f in failures
+                ])
+                await db.commit()
+        except Exception as e:
+            # The per-item results still report the failures; the rows stay
+            # pending and reconciliation settles them later
+            logging.error("Recording %d batch initiation failures failed: %s", len(failures), e)
@@ -0,0 +1,167 @@
+"""
+Structured storage of Paystack payloads
+
+Transactions keep only the fields we query (gateway status, channel, fees,
+paid_at); the raw verify responses and webhook data go to gateway_events,
+compressed on SQLite and as JSONB on PostgreSQL.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, bindparam, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from payment_service.app.models import TERMINAL_STATUSES, GatewayEvent, Transaction, utcnow
+from payment_service.app.services.rollups import RollupDeltas
+from payment_service.app.services.transitions import can_transition
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_fields(data: Dict) -> Dict:
+    """
+    Pick the queryable fields out of a Paystack transaction object
+
+    Args:
+        data: The "data" object of a verify response or webhook, or one
+            record of the transaction list
+
+    Returns:
+        Dict of Transaction column values
+    """
+    return {
+        "gateway_status": data.get("status"),
+        "channel": data.get("channel"),
+        "fees": _as_int(data.get("fees")),
+        "paid_at": _parse_timestamp(data.get("paid_at") or data.get("paidAt")),
+    }
+
+
+def settle_params(reference: str, status: str, paystack_reference: Optional[str], data: Dict) -> Dict:
+    """
+    Parameters for one row of settle_statement()
+    """
+    fields = extract_fields(data)
+    return {
+        "b_reference": reference,
+        "b_status": status,
+        "b_paystack_reference": paystack_reference,
+        "b_gateway_status": fields["gateway_status"],
+        "b_channel": fields["channel"],
+        "b_fees": fields["fees"],
+        "b_paid_at": fields["paid_at"],
+    }
+
+
+def settle_statement(only_pending: bool = False):
+    """
+    Bulk UPDATE keyed on reference, executed with a list of settle_params()
+
+    Args:
+        only_pending: Only touch rows still "pending" rather than any
+            non-terminal status
+    """
+    table = Transaction.__table__
+    if only_pending:
+        guard = table.c.status == "pending"
+    else:
+        # Not NOT IN (...): expanding IN parameters cannot be used with executemany
+        guard = and_(*(table.c.status != status for status in TERMINAL_STATUSES))
+    return (
+        update(table)
+        .where(table.c.reference == bindparam("b_reference"))
+        .where(guard)
+        .values(
+            status=bindparam("b_status"),
+            paystack_reference=bindparam("b_paystack_reference"),
+            gateway_status=bindparam("b_gateway_status"),
+            channel=bindparam("b_channel"),
+            fees=bindparam("b_fees"),
+            paid_at=bindparam("b_paid_at")
+        )
+    )
+
+
+async def settle(db: AsyncSession, updates: List[Dict], only_pending: bool = False) -> List[Dict]:
+    """
+    Apply settle_params() rows and their daily rollup deltas, within the
+    caller's transaction (the caller commits)
+
+    The affected rows are locked and read first, so the rollups move by
+    exactly the transitions the UPDATE makes.
+
+    Args:
+        updates: settle_params() dicts, one per reference
+        only_pending: Only settle rows still "pending"
+
+    Returns:
+        The params of the rows that changed
+    """
+    if not updates:
+        return []
+
+    result = await db.execute(
+        select(Transaction.reference, Transaction.status, Transaction.amount, Transaction.created_at)
+        .where(Transaction.reference.in_([params["b_reference"] for params in updates]))
+        .with_for_update()
+    )
+    current = {row.reference: row for row in result}
+
+    deltas = RollupDeltas()
+    applied = []
+    for params in updates:
+        row = current.get(params["b_reference"])
+        if row is None or (only_pending and row.status != "pending"):
+            continue
+        if not can_transition(row.status, params["b_status"]):
+            continue
+        deltas.transition(row.created_at, row.amount, row.status, params["b_status"])
+        applied.append(params)
+
+    if applied:
+        await db.execute(settle_statement(only_pending), applied)
+        await deltas.apply(db)
+    return applied
+
+
+def event_row(reference: str, source: str, payload: Dict, gateway_status: Optional[str] = None) -> Dict:
+    """
+    Values for one gateway_events row
+
+    Args:
+        reference: Transaction reference the payload belongs to
+        source: Where it came from (verify, webhook, reconcile)
+        payload: Raw payload as returned by Paystack
+        gateway_status: Paystack's transaction status, if known
+    """
+    return {
+        "reference": reference,
+        "source": source,
+        "gateway_status": gateway_status,
+        "payload": payload,
+        "created_at": utcnow(),
+    }
+
+
+async def record_events(db: AsyncSession, rows: Iterable[Dict]) -> None:
+    """
+    Insert gateway_events rows in one executemany, within the caller's
+    transaction (the caller commits)
+    """
+    rows: List[Dict] = list(rows)
+    if rows:
+        await db.execute(insert(GatewayEvent), rows)
@@ -0,0 +1,112 @@
+"""
+Shared HTTP client for outbound Paystack calls
+One pooled, keep-alive client per process, opened and closed by the app lifespan
+"""
+import logging
+import time
+from typing import Optional
+
+import httpx
+
+from payment_service.app.config import settings
+from payment_service.app import metrics
+
+POOL_WAIT_SECONDS = metrics.histogram(
+    "paystack_http_pool_wait_seconds",
+    "Time spent waiting for a pooled connection to api.paystack.co",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+# First events httpcore emits once a request owns a connection: either a new
+# TCP connect or, for a reused keep-alive connection, sending the headers
+_CONNECTION_ACQUIRED_EVENTS = (
+    "connection.connect_tcp.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_client() -> httpx.AsyncClient:
+    """
+    Build an AsyncClient configured from settings
+    """
+    http2 = settings.PAYSTACK_HTTP2
+    if http2 and not _http2_available():
+        logging.warning("PAYSTACK_HTTP2 is enabled but the 'h2' package is missing, using HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.PAYSTACK_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.PAYSTACK_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.PAYSTACK_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(
+        connect=settings.PAYSTACK_CONNECT_TIMEOUT,
+        read=settings.PAYSTACK_READ_TIMEOUT,
+        write=settings.PAYSTACK_WRITE_TIMEOUT,
+        pool=settings.PAYSTACK_POOL_TIMEOUT
+    )
+    return httpx.AsyncClient(
+        base_url=settings.PAYSTACK_BASE_URL,
+        http2=http2,
+        limits=limits,
+        timeout=timeout
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """
+    Open the shared client (called from the app lifespan)
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared client and release pooled connections
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared client, creating it lazily outside the app lifespan
+    (CLI tools, scripts)
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+    return _client
+
+
+def pool_wait_trace():
+    """
+    Build an httpcore trace callback that records how long a request waited
+    for a pooled connection
+    """
+    started = time.perf_counter()
+    recorded = False
+
+    async def trace(event_name: str, info: dict) -> None:
+        nonlocal recorded
+        if not recorded and event_name in _CONNECTION_ACQUIRED_EVENTS:
+            recorded = True
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+    return trace
@@ -1,37 +1,187 @@
+import asyncio
 import httpx
-from typing import Dict, Optional
+import logging
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+from payment_service.app import metrics
 from payment_service.app.config import settings
+from payment_service.app.instrumentation import PAYSTACK_IN_FLIGHT
+from payment_service.app.services.http_client import get_http_client, pool_wait_trace
+from payment_service.app.services.references import reference_generator
+from payment_service.app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    RateLimitExceeded,
+    TokenBucket,
+    backoff_delay,
+)
+
+PAYSTACK_LATENCY = metrics.histogram(
+    "paystack_request_duration_seconds",
+    "Paystack API call latency by endpoint and outcome",
+    ("endpoint", "status")
+)
+PAYSTACK_LAST_SUCCESS = metrics.gauge(
+    "paystack_last_success_timestamp_seconds",
+    "Unix time of the last Paystack call that got a non-5xx answer"
+)
+PAYSTACK_RETRIES = metrics.counter(
+    "paystack_retries_total",
+    "Paystack calls retried after a transient failure",
+    ("endpoint",)
+)
+
+# Shared by every PaystackService, like the HTTP client: the rate limit
+# and failure count are per process, not per caller
+paystack_limiter = TokenBucket(
+    rate=settings.PAYSTACK_RATE_LIMIT,
+    burst=settings.PAYSTACK_RATE_BURST,
+    max_wait=settings.PAYSTACK_RATE_LIMIT_MAX_WAIT
+)
+paystack_breaker = CircuitBreaker(
+    failure_threshold=settings.PAYSTACK_BREAKER_FAILURES,
+    reset_timeout=settings.PAYSTACK_BREAKER_RESET_TIMEOUT
+)
+
+
+class PaystackAPIError(Exception):
+    """
+    A failed Paystack call; carries the HTTP status (and Retry-After for
+    429s) when Paystack answered at all
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.status_code == 429
+
+    @property
+    def transient(self) -> bool:
+        """
+        Worth retrying later: no answer, throttled, or a Paystack 5xx
+        """
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+    @classmethod
+    def from_http_error(cls, prefix: str, error: httpx.HTTPError) -> "PaystackAPIError":
+        status_code = None
+        retry_after = None
+        if isinstance(error, httpx.HTTPStatusError):
+            status_code = error.response.status_code
+            try:
+                retry_after = float(error.response.headers.get("Retry-After", ""))
+            except ValueError:
+                retry_after = None
+        return cls(f"{prefix}: {str(error)}", status_code=status_code, retry_after=retry_after)
+
+
+class PaystackUnavailableError(PaystackAPIError):
+    """
+    The call was not sent: the circuit breaker is open or the rate
+    limiter's queue is too long. retry_after says when to try again.
+    """
+
 
 class PaystackService:
-    def __init__(self):
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
         self.base_url = settings.PAYSTACK_BASE_URL
         self.secret_key = settings.PAYSTACK_SECRET_KEY
         self.headers = {
             "Authorization": f"Bearer {self.secret_key}",
             "Content-Type": "application/json"
         }
+        self._client = client
+        self.limiter = limiter or paystack_limiter
+        self.breaker = breaker or paystack_breaker
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Pooled client shared across requests (see services/http_client.py)
+        """
+        return self._client or get_http_client()
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send one Paystack call through the circuit breaker, the rate
+        limiter and the pooled client, timing it per endpoint and status
+
+        Raises:
+            PaystackUnavailableError: The call was not sent
+        """
+        try:
+            probe = self.breaker.before_call()
+        except CircuitOpen as e:
+            raise PaystackUnavailableError(f"Paystack unavailable: {str(e)}", retry_after=e.retry_after)
+
+        try:
+            await self.limiter.acquire()
+        except RateLimitExceeded as e:
+            self.breaker.record(None, probe)
+            raise PaystackUnavailableError(f"Paystack rate limit: {str(e)}", status_code=429, retry_after=e.wait)
+
+        status = "error"
+        # None until an outcome is known, so a cancelled call (client went
+        # away) neither opens nor closes the circuit
+        success = None
+        started = time.perf_counter()
+        PAYSTACK_IN_FLIGHT.inc()
+        try:
+            response = await self.client.request(
+                method,
+                url,
+                headers=self.headers,
+                extensions={"trace": pool_wait_trace()},
+                **kwargs
+            )
+            status = str(response.status_code)
+            success = response.status_code < 500
+            if success:
+                PAYSTACK_LAST_SUCCESS.set(time.time())
+            return response
+        except httpx.TimeoutException:
+            status = "timeout"
+            success = False
+            raise
+        except httpx.TransportError:
+            success = False
+            raise
+        finally:
+            self.breaker.record(success, probe)
+            PAYSTACK_IN_FLIGHT.dec()
+            PAYSTACK_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
 
     async def initialize_transaction(
-        self, 
-        email: str, 
-        amount: int, 
+        self,
+        email: str,
+        amount: int,
         reference: str,
         callback_url: str
     ) -> Dict:
         """
         Initialize a transaction with Paystack
-        
+
         Args:
             email: Customer email
             amount: Amount in kobo (smallest currency unit)
             reference: Unique transaction reference
             callback_url: URL to redirect after payment
-            
+
         Returns:
             Dict containing transaction initialization response
         """
         url = f"{self.base_url}/transaction/initialize"
-        
+
         payload = {
             "email": email,
             "amount": amount,
@@ -39,50 +189,120 @@ class PaystackService:
             "callback_url": callback_url,
             "currency": "NGN"
         }
-        
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                raise Exception(f"Paystack API error: {str(e)}")
 
-    async def verify_transaction(self, reference: str) -> Dict:
+        try:
+            response = await self._request("initialize", "POST", url, json=payload)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            raise PaystackAPIError.from_http_error("Paystack API error", e)
+
+    async def verify_transaction(self, reference: str, retries: Optional[int] = None) -> Dict:
         """
         Verify a transaction with Paystack
-        
+
+        Timeouts, connection errors, 429s and 5xx answers are retried with
+        jittered exponential backoff (verify is a read, so this is safe);
+        calls refused by the breaker or limiter are not.
+
         Args:
             reference: Transaction reference to verify
-            
+            retries: Retries after the first attempt (default PAYSTACK_VERIFY_RETRIES)
+
         Returns:
             Dict containing transaction verification response
         """
         url = f"{self.base_url}/transaction/verify/{reference}"
-        
-        async with httpx.AsyncClient() as client:
+        retries = settings.PAYSTACK_VERIFY_RETRIES if retries is None else retries
+
+        attempt = 0
+        while True:
             try:
-                response = await client.get(
-                    url, 
-                    headers=self.headers,
-                    timeout=30.0
-                )
+                response = await self._request("verify", "GET", url)
                 response.raise_for_status()
                 return response.json()
             except httpx.HTTPError as e:
-                raise Exception(f"Paystack verification error: {str(e)}")
+                error = PaystackAPIError.from_http_error("Paystack verification error", e)
+                if not error.transient or attempt >= retries:
+                    raise error
+            delay = backoff_delay(
+                attempt,
+                settings.PAYSTACK_RETRY_BACKOFF_BASE,
+                settings.PAYSTACK_RETRY_BACKOFF_MAX,
+                error.retry_after
+            )
+            attempt += 1
+            PAYSTACK_RETRIES.inc(endpoint="verify")
+            logging.warning(
+                "Retrying verification of %s in %.2fs (%d/%d): %s", reference, delay, attempt, retries, error
+            )
+            await asyncio.sleep(delay)
+
+    async def list_transactions(
+        self,
+        page: int = 1,
+        per_page: int = 100,
+        from_: Optional[datetime] = None,
+        to: Optional[datetime] = None,
+        status: Optional[str] = None
+    ) -> Dict:
+        """
+        Fetch one page of transactions from Paystack
+
+        Args:
+            page: Page number (1-based)
+            per_page: Records per page
+            from_: Only transactions created at or after this time
+            to: Only transactions created before this time
+            status: Filter by Paystack status (success, failed, abandoned)
+
+        Returns:
+            Dict with "data" (list of transactions) and "meta" (pagination)
+        """
+        url = f"{self.base_url}/transaction"
+
+        params = {"page": page, "perPage": per_page}
+        if from_ is not None:
+            params["from"] = from_.isoformat()
+        if to is not None:
+            params["to"] = to.isoformat()
+        if status:
+            params["status"] = status
+
+        try:
+            response = await self._request("list", "GET", url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            raise PaystackAPIError.from_http_error("Paystack list error", e)
+
+    async def iter_transaction_pages(
+        self,
+        from_: datetime,
+        to: datetime,
+        per_page: int = 100,
+        start_page: int = 1
+    ) -> AsyncIterator[Dict]:
+        """
+        Page through every transaction created in [from_, to)
+
+        Yields:
+            Each page response as returned by list_transactions
+        """
+        page = start_page
+        while True:
+            response = await self.list_transactions(page=page, per_page=per_page, from_=from_, to=to)
+            yield response
+
+            meta = response.get("meta") or {}
+            page_count = int(meta.get("pageCount") or 0)
+            if not response.get("data") or page >= page_count:
+                return
+            page += 1
 
     def generate_reference(self) -> str:
         """
-        Generate a unique transaction reference
+        Generate a unique, time-ordered transaction reference (see
+        services/references.py)
         """
-        import uuid
-        import time
-        timestamp = str(int(time.time()))
-        unique_id = str(uuid.uuid4())[:8]
-        return f"PAY_{timestamp}_{unique_id}"
+        return reference_generator.generate()
@@ -0,0 +1,393 @@
+"""
+Bulk reconciliation of transactions stuck in "pending"
+
+Pending rows older than RECONCILE_MIN_AGE are streamed in keyset-paginated
+chunks (WHERE id > last_id ORDER BY id LIMIT n), verified against Paystack
+with bounded concurrency, and settled with one batched UPDATE per chunk.
+The last id of every applied chunk is checkpointed so an interrupted run
+resumes where it stopped.
+
+run_window() is the cheaper variant for large backlogs: it pages through
+Paystack's list-transactions API for a time window and hash-joins each
+page against local pending rows on reference, so one API call can settle
+a whole page of transactions instead of one.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from payment_service.app import metrics
+from payment_service.app.config import settings
+from payment_service.app.db import AsyncSessionLocal
+from payment_service.app.models import Transaction, utcnow
+from payment_service.app.services.gateway_events import event_row, record_events, settle, settle_params
+from payment_service.app.services.paystack_service import PaystackAPIError, PaystackService
+from payment_service.app.services.resilience import backoff_delay
+from payment_service.app.services.verification import verification_cache
+
+# Paystack transaction status -> local status it settles to
+SETTLED_STATUSES = {
+    "success": "success",
+    "failed": "failed",
+}
+
+RECONCILED = metrics.counter(
+    "reconciliation_transactions_total",
+    "Pending transactions checked by reconciliation",
+    ("outcome",)
+)
+
+
+class ReconciliationReport:
+    """
+    Counters and throughput for one reconciliation run
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.rows_scanned = 0
+        self.settled: Dict[str, int] = {status: 0 for status in SETTLED_STATUSES.values()}
+        self.unresolved = 0
+        self.errors = 0
+        self.api_calls = 0
+        self.rate_limited = 0
+        self.chunks = 0
+        self.last_id = 0
+        self.remote_records = 0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self) -> Dict:
+        elapsed = self.elapsed or 1e-9
+        return {
+            "rows_scanned": self.rows_scanned,
+            "settled": dict(self.settled),
+            "unresolved": self.unresolved,
+            "errors": self.errors,
+            "api_calls": self.api_calls,
+            "rate_limited": self.rate_limited,
+            "chunks": self.chunks,
+            "last_id": self.last_id,
+            "remote_records": self.remote_records,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows_scanned / elapsed, 2),
+            "api_calls_per_second": round(self.api_calls / elapsed, 2),
+        }
+
+
+class ReconciliationService:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        paystack_service: Optional[PaystackService] = None,
+        chunk_size: int = settings.RECONCILE_CHUNK_SIZE,
+        concurrency: int = settings.RECONCILE_CONCURRENCY,
+        min_age: float = settings.RECONCILE_MIN_AGE,
+        max_retries: int = settings.RECONCILE_MAX_RETRIES,
+        checkpoint_path: Optional[str] = settings.RECONCILE_CHECKPOINT_PATH
+    ):
+        self.session_factory = session_factory
+        self.paystack_service = paystack_service or PaystackService()
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.min_age = min_age
+        self.max_retries = max_retries
+        self.checkpoint_path = checkpoint_path
+        # Shared by all in-flight verifications: a 429 pauses every worker
+        self._paused_until = 0.0
+
+    async def run(self, resume: bool = True, limit: Optional[int] = None) -> ReconciliationReport:
+        """
+        Reconcile pending transactions
+
+        Args:
+            resume: Start after the last checkpointed id
+            limit: Stop after scanning this many rows
+
+        Returns:
+            ReconciliationReport for the run
+        """
+        report = ReconciliationReport()
+        last_id = self.load_checkpoint() if resume else 0
+        cutoff = utcnow() - timedelta(seconds=self.min_age)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        while limit is None or report.rows_scanned < limit:
+            size = self.chunk_size if limit is None else min(self.chunk_size, limit - report.rows_scanned)
+            chunk = await self._fetch_chunk(last_id, cutoff, size)
+            if not chunk:
+                # Reached the end of the pending set; next run starts over
+                self.clear_checkpoint()
+                break
+
+            results = await asyncio.gather(*(
+                self._verify(reference, semaphore, report) for _, reference in chunk
+            ))
+            await self._apply([result for result in results if result is not None], report)
+
+            last_id = chunk[-1][0]
+            report.rows_scanned += len(chunk)
+            report.chunks += 1
+            report.last_id = last_id
+            self.save_checkpoint(last_id)
+
+        report.finished = time.perf_counter()
+        logging.info("Reconciliation finished: %s", json.dumps(report.as_dict()))
+        return report
+
+    async def run_window(
+        self,
+        start: datetime,
+        end: datetime,
+        per_page: int = settings.RECONCILE_PAGE_SIZE
+    ) -> ReconciliationReport:
+        """
+        Reconcile pending transactions created in [start, end) from
+        Paystack's transaction list
+
+        Args:
+            start: Window start
+            end: Window end
+            per_page: Records per Paystack page
+
+        Returns:
+            ReconciliationReport for the run (chunks counts API pages)
+        """
+        report = ReconciliationReport()
+        page = 1
+        attempt = 0
+
+        while True:
+            try:
+                async for response in self.paystack_service.iter_transaction_pages(
+                    from_=start, to=end, per_page=per_page, start_page=page
+                ):
+                    report.api_calls += 1
+                    attempt = 0
+                    records = response.get("data") or []
+                    report.remote_records += len(records)
+                    report.chunks += 1
+                    await self._merge_page(records, report)
+                    page += 1
+                break
+            except PaystackAPIError as e:
+                if not e.rate_limited or attempt >= self.max_retries:
+                    report.errors += 1
+                    logging.error("Window reconciliation stopped at page %d: %s", page, e)
+                    break
+                report.api_calls += 1
+                report.rate_limited += 1
+                self._back_off(attempt, e.retry_after)
+                attempt += 1
+                await asyncio.sleep(max(0.0, self._paused_until - time.monotonic()))
+
+        report.finished = time.perf_counter()
+        logging.info("Window reconciliation finished: %s", json.dumps(report.as_dict()))
+        return report
+
+    async def _merge_page(self, records: List[dict], report: ReconciliationReport) -> None:
+        """
+        Join one page of Paystack records against local pending rows
+        """
+        # Hash index of the page by reference
+        remote: Dict[str, dict] = {}
+        for record in records:
+            reference = record.get("reference")
+            if reference:
+                remote[reference] = record
+        if not remote:
+            return
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Transaction.reference)
+                .where(Transaction.reference.in_(list(remote)))
+                .where(Transaction.status == "pending")
+            )
+            local_pending = result.scalars().all()
+
+        updates = []
+        for reference in local_pending:
+            record = remote[reference]
+            report.rows_scanned += 1
+            status = SETTLED_STATUSES.get(record.get("status"))
+            if status is None:
+                report.unresolved += 1
+                RECONCILED.inc(outcome="unresolved")
+                continue
+            updates.append((
+                settle_params(reference, status, record.get("reference"), record),
+                event_row(reference, "reconcile", record, record.get("status"))
+            ))
+
+        await self._apply(updates, report)
+
+    async def _fetch_chunk(self, last_id: int, cutoff, size: int) -> List[Tuple[int, str]]:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Transaction.id, Transaction.reference)
+                .where(Transaction.status == "pending")
+                .where(Transaction.id > last_id)
+                .where(Transaction.created_at < cutoff)
+                .order_by(Transaction.id)
+                .limit(size)
+            )
+            return [tuple(row) for row in result.all()]
+
+    async def _verify(
+        self,
+        reference: str,
+        semaphore: asyncio.Semaphore,
+        report: ReconciliationReport
+    ) -> Optional[Tuple[dict, dict]]:
+        """
+        Verify one reference, retrying transient failures
+
+        Retries happen here only: verify_transaction's own are turned off,
+        so each attempt is one API call and the shared 429 pause applies
+        between them.
+
+        Returns:
+            (settle_params, gateway event row) when Paystack reports a
+            settled status
+        """
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                report.api_calls += 1
+                try:
+                    response = await self.paystack_service.verify_transaction(reference, retries=0)
+                except PaystackAPIError as e:
+                    if e.transient and attempt < self.max_retries:
+                        if e.rate_limited:
+                            report.rate_limited += 1
+                            self._back_off(attempt, e.retry_after)
+                        else:
+                            await asyncio.sleep(backoff_delay(
+                                attempt, settings.RECONCILE_BACKOFF_BASE, settings.RECONCILE_BACKOFF_MAX, e.retry_after
+                            ))
+                        continue
+                    report.errors += 1
+                    RECONCILED.inc(outcome="error")
+                    logging.warning("Reconciliation verify failed for %s: %s", reference, e)
+                    return None
+                except Exception as e:
+                    report.errors += 1
+                    RECONCILED.inc(outcome="error")
+                    logging.warning("Reconciliation verify failed for %s: %s", reference, e)
+                    return None
+                break
+            else:
+                return None
+
+        data = response.get("data") or {}
+        status = SETTLED_STATUSES.get(data.get("status")) if response.get("status") else None
+        if status is None:
+            report.unresolved += 1
+            RECONCILED.inc(outcome="unresolved")
+            return None
+
+        return (
+            settle_params(reference, status, data.get("reference"), data),
+            event_row(reference, "reconcile", response, data.get("status"))
+        )
+
+    def _back_off(self, attempt: int, retry_after: Optional[float]) -> None:
+        delay = retry_after if retry_after is not None else min(
+            settings.RECONCILE_BACKOFF_MAX,
+            settings.RECONCILE_BACKOFF_BASE * (2 ** attempt)
+        )
+        delay += random.uniform(0, delay / 2)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    async def _apply(self, updates: List[Tuple[dict, dict]], report: ReconciliationReport) -> None:
+        """
+        Settle rows and record their gateway payloads in one transaction
+
+        Args:
+            updates: (settle_params, gateway event row) pairs
+        """
+        if not updates:
+            return
+
+        async with self.session_factory() as db:
+            applied = await settle(db, [params for params, _ in updates], only_pending=True)
+            await record_events(db, [row for _, row in updates])
+            await db.commit()
+
+        for params, _ in updates:
+            verification_cache.pop(params["b_reference"])
+        for params in applied:
+            report.settled[params["b_status"]] += 1
+            RECONCILED.inc(outcome=params["b_status"])
+
+    def load_checkpoint(self) -> int:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        try:
+            with open(self.checkpoint_path) as f:
+                return int(json.load(f).get("last_id", 0))
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable reconciliation checkpoint: %s", e)
+            return 0
+
+    def save_checkpoint(self, last_id: int) -> None:
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"last_id": last_id, "updated_at": utcnow().isoformat()}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self) -> None:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+class ReconciliationScheduler:
+    """
+    Run reconciliation every RECONCILE_INTERVAL seconds inside the app
+    """
+
+    def __init__(self, service: Optional[ReconciliationService] = None, interval: float = settings.RECONCILE_INTERVAL):
+        self.service = service
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        self.service = self.service or ReconciliationService()
+        self._task = asyncio.create_task(self._loop(), name="reconciliation")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.service.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error("Scheduled reconciliation error: %s", e)
+
+
+reconciliation_scheduler = ReconciliationScheduler()
@@ -0,0 +1,263 @@
+"""
+Time-ordered transaction references
+
+PAY_ followed by 16 Crockford base32 characters encoding 80 bits:
+
+    48 bits  milliseconds since the Unix epoch
+    12 bits  node id (one per process)
+    20 bits  sequence within the millisecond
+
+References from one node are strictly increasing, references from
+different nodes never collide, and the alphabet sorts in ASCII order, so
+new rows always land at the right edge of the reference index instead of
+on random pages.
+
+The node id is REFERENCE_NODE_ID when set. Otherwise each process leases
+a free one from the reference_nodes table on startup (NodeLease), so
+workers and instances sharing a database never share an id. The app does
+not start when no id can be leased.
+"""
+import asyncio
+import base64
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from payment_service.app.config import settings
+from payment_service.app.db import AsyncSessionLocal
+from payment_service.app.models import ReferenceNode, utcnow
+
+PREFIX = "PAY_"
+NODE_BITS = 12
+SEQUENCE_BITS = 20
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# base64.b32encode (C) with its RFC 4648 alphabet, translated to Crockford's
+_TO_CROCKFORD = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", _CROCKFORD)
+_FROM_CROCKFORD = {char: value for value, char in enumerate(_CROCKFORD)}
+
+
+class ReferenceGenerator:
+    """
+    Snowflake-style generator; thread-safe
+
+    If the clock steps backwards the last timestamp is kept (and the
+    sequence continues), so references stay monotonic. When a millisecond's
+    sequence is exhausted it waits for the next one.
+    """
+
+    def __init__(self, node_id: Optional[int], prefix: str = PREFIX):
+        self.node_id: Optional[int] = None
+        self.prefix = prefix
+        self._last_ms = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        if node_id is not None:
+            self.assign(node_id)
+
+    def assign(self, node_id: int) -> None:
+        """
+        Set the node id embedded in every following reference
+        """
+        if not 0 <= node_id <= MAX_NODE:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE}")
+        with self._lock:
+            self.node_id = node_id
+
+    def _next_value(self) -> int:
+        with self._lock:
+            if self.node_id is None:
+                raise RuntimeError("No reference node id: set REFERENCE_NODE_ID or lease one with node_lease.acquire()")
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                while time.time_ns() // 1_000_000 <= self._last_ms:
+                    time.sleep(0.0001)
+                self._last_ms = time.time_ns() // 1_000_000
+                self._sequence = 0
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+
+    def generate(self) -> str:
+        """
+        Next reference, e.g. PAY_01HX3M7Q2G00G000
+        """
+        encoded = base64.b32encode(self._next_value().to_bytes(10, "big")).decode("ascii")
+        return self.prefix + encoded.translate(_TO_CROCKFORD)
+
+
+def decode(reference: str) -> Optional[int]:
+    """
+    The 80-bit value behind a generated reference, or None for references
+    in any other format (e.g. the older PAY_<seconds>_<uuid> ones)
+    """
+    if not reference.startswith(PREFIX) or len(reference) != len(PREFIX) + 16:
+        return None
+    value = 0
+    for char in reference[len(PREFIX):]:
+        digit = _FROM_CROCKFORD.get(char)
+        if digit is None:
+            return None
+        value = (value << 5) | digit
+    return value
+
+
+def reference_time(reference: str) -> Optional[datetime]:
+    """
+    When a reference was generated (UTC, millisecond precision), from the
+    reference alone; None when it is not in the generated format
+    """
+    value = decode(reference)
+    if value is None:
+        return None
+    return datetime.fromtimestamp((value >> (NODE_BITS + SEQUENCE_BITS)) / 1000, timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands timezone-aware columns back naive (stored as UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class NodeLease:
+    """
+    Lease on a node id in reference_nodes for as long as the process runs
+
+    acquire() claims the lowest id that has no lease or whose lease has
+    expired, and renews it every third of REFERENCE_NODE_LEASE. A process
+    that dies stops renewing, so its id frees up one lease period later.
+    If a renewal finds the lease taken over (the database was unreachable
+    for a whole period) a new id is claimed.
+    """
+
+    CLAIM_ATTEMPTS = 10
+
+    def __init__(
+        self,
+        generator: ReferenceGenerator,
+        session_factory=AsyncSessionLocal,
+        lease_seconds: float = settings.REFERENCE_NODE_LEASE
+    ):
+        self.generator = generator
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:255]
+        self.node_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> None:
+        """
+        Lease a node id for the generator, unless it already has a fixed
+        one (REFERENCE_NODE_ID)
+
+        Raises:
+            RuntimeError: No node id could be leased
+        """
+        if self.generator.node_id is not None:
+            return
+        self.node_id = await self._claim()
+        self.generator.assign(self.node_id)
+        logging.info("Leased reference node id %d as %s", self.node_id, self.owner)
+        self._task = asyncio.create_task(self._renew_loop(), name="reference-node-lease")
+
+    async def release(self) -> None:
+        """
+        Stop renewing and free the node id for the next process
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    delete(ReferenceNode)
+                    .where(ReferenceNode.node_id == self.node_id)
+                    .where(ReferenceNode.owner == self.owner)
+                )
+                await db.commit()
+        except Exception as e:
+            logging.warning("Could not release reference node id %s: %s", self.node_id, e)
+
+    async def _claim(self) -> int:
+        for _ in range(self.CLAIM_ATTEMPTS):
+            now = utcnow()
+            expires_at = now + timedelta(seconds=self.lease_seconds)
+            async with self.session_factory() as db:
+                rows = (await db.execute(select(ReferenceNode.node_id, ReferenceNode.expires_at))).all()
+                leases = {node_id: _as_utc(expires) for node_id, expires in rows}
+                node_id = next((i for i in range(MAX_NODE + 1) if leases.get(i, now) <= now), None)
+                if node_id is None:
+                    raise RuntimeError(
+                        f"All {MAX_NODE + 1} reference node ids are leased; set REFERENCE_NODE_ID explicitly"
+                    )
+
+                if node_id in leases:
+                    # Take over an expired lease, unless another process just did
+                    result = await db.execute(
+                        update(ReferenceNode)
+                        .where(ReferenceNode.node_id == node_id)
+                        .where(ReferenceNode.expires_at <= now)
+                        .values(owner=self.owner, expires_at=expires_at)
+                    )
+                    claimed = result.rowcount == 1
+                else:
+                    try:
+                        await db.execute(
+                            insert(ReferenceNode).values(node_id=node_id, owner=self.owner, expires_at=expires_at)
+                        )
+                        claimed = True
+                    except IntegrityError:
+                        claimed = False
+
+                if claimed:
+                    await db.commit()
+                    return node_id
+                await db.rollback()
+        raise RuntimeError(f"Could not lease a reference node id in {self.CLAIM_ATTEMPTS} attempts")
+
+    async def _renew(self) -> bool:
+        """
+        Returns:
+            False if the lease is no longer ours
+        """
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(ReferenceNode)
+                .where(ReferenceNode.node_id == self.node_id)
+                .where(ReferenceNode.owner == self.owner)
+                .values(expires_at=utcnow() + timedelta(seconds=self.lease_seconds))
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+    async def _renew_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await self._renew():
+                    logging.error("Lost the lease on reference node id %d, leasing a new one", self.node_id)
+                    self.node_id = await self._claim()
+                    self.generator.assign(self.node_id)
+                    logging.info("Leased reference node id %d as %s", self.node_id, self.owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning("Could not renew the lease on reference node id %s: %s", self.node_id, e)
+
+
+reference_generator = ReferenceGenerator(settings.REFERENCE_NODE_ID if settings.REFERENCE_NODE_ID >= 0 else None)
+node_lease = NodeLease(reference_generator)
@@ -0,0 +1,192 @@
+"""
+Outbound protection for Paystack calls
+
+- TokenBucket: client-side rate limit, so bursts queue briefly here rather
+  than collecting 429s (or a ban) from Paystack
+- CircuitBreaker: after N consecutive failures stop calling for a while
+  and fail fast, then let a single probe through to test recovery
+- backoff_delay: full-jitter exponential backoff for retries
+"""
+import asyncio
+import random
+import time
+from typing import Optional
+
+from payment_service.app import metrics
+
+LIMITER_WAIT = metrics.histogram(
+    "paystack_rate_limiter_wait_seconds",
+    "Time Paystack calls waited for a rate limiter token",
+    buckets=(0.0, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LIMITER_REJECTED = metrics.counter(
+    "paystack_rate_limiter_rejected_total",
+    "Paystack calls refused because the limiter wait would exceed its maximum"
+)
+BREAKER_STATE = metrics.gauge(
+    "paystack_circuit_state",
+    "Paystack circuit breaker state (0 closed, 1 half-open, 2 open)"
+)
+BREAKER_TRANSITIONS = metrics.counter(
+    "paystack_circuit_transitions_total",
+    "Paystack circuit breaker state changes",
+    ("state",)
+)
+BREAKER_REJECTED = metrics.counter(
+    "paystack_circuit_rejected_total",
+    "Paystack calls failed fast while the circuit was open"
+)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, wait: float):
+        super().__init__(f"Rate limiter wait of {wait:.2f}s exceeds the maximum")
+        self.wait = wait
+
+
+class CircuitOpen(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    rate tokens per second, up to burst banked. Callers that find the
+    bucket empty reserve the next token and sleep until it is due, so
+    waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, max_wait: float = 5.0):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.max_wait = max_wait
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """
+        Take one token, sleeping until it is available
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            RateLimitExceeded: The wait would be longer than max_wait
+        """
+        if not self.enabled:
+            return 0.0
+        self._refill(time.monotonic())
+        wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+        if wait > self.max_wait:
+            LIMITER_REJECTED.inc()
+            raise RateLimitExceeded(wait)
+
+        self._tokens -= 1
+        LIMITER_WAIT.observe(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Closed: calls flow, consecutive failures are counted. Open (after
+    failure_threshold of them): calls fail fast for reset_timeout seconds.
+    Half-open: one probe call decides between closed and open again.
+
+    before_call() says whether the call is that probe; pass it back to
+    record(). Outcomes of calls that started before the circuit opened do
+    not move it while it is open or half-open.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        BREAKER_STATE.set(0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            BREAKER_STATE.set(_STATE_VALUES[state])
+            BREAKER_TRANSITIONS.inc(state=state)
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self) -> bool:
+        """
+        Returns:
+            True if this call is the half-open probe
+
+        Raises:
+            CircuitOpen: The call must not be made
+        """
+        if not self.enabled or self.state == CLOSED:
+            return False
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                BREAKER_REJECTED.inc()
+                raise CircuitOpen(self.retry_after())
+            self._set_state(HALF_OPEN)
+        # Half-open: exactly one probe at a time
+        if self._probe_in_flight:
+            BREAKER_REJECTED.inc()
+            raise CircuitOpen(self.reset_timeout)
+        self._probe_in_flight = True
+        return True
+
+    def record(self, success: Optional[bool], probe: bool = False) -> None:
+        """
+        Report a call's outcome; None when it was cancelled before one
+
+        Args:
+            success: Outcome, or None
+            probe: What before_call() returned for this call
+        """
+        if probe:
+            self._probe_in_flight = False
+        elif self.state != CLOSED:
+            # Started before the circuit opened: only the probe decides now
+            return
+        if success is None or not self.enabled:
+            return
+        if success:
+            self.failures = 0
+            self._set_state(CLOSED)
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt)),
+    or Retry-After (capped) when the server sent one
+    """
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
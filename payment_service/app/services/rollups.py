@@ -0,0 +1,258 @@
+"""
+Per-day transaction rollups
+
+transaction_rollups holds (day, status, count, sum_amount), keyed by the
+UTC day a transaction was created. Every code path that inserts a
+transaction or changes its status adds its deltas in the same database
+transaction, so /stats reads O(days) rows instead of scanning
+transactions. rebuild() recomputes a range from the raw tables (hot and
+archive, see archival.py) and check() compares the two.
+"""
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, Date, Integer, String, bindparam, delete, func, insert, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from payment_service.app import metrics
+from payment_service.app.models import ArchivedTransaction, Transaction, TransactionRollup
+
+ROLLUP_MISMATCHES = metrics.gauge(
+    "transaction_rollup_mismatches",
+    "(day, status) rollup rows that disagreed with the transactions table at the last check"
+)
+
+
+def day_of(created_at: Optional[datetime]) -> date:
+    """
+    UTC day a transaction is counted under
+    """
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _day_column(dialect_name: str, created_at):
+    if dialect_name == "postgresql":
+        return func.date(func.timezone("UTC", created_at))
+    # SQLite stores naive UTC; date() gives the same 'YYYY-MM-DD' as the Date column
+    return func.date(created_at)
+
+
+# Same syntax on SQLite and PostgreSQL. Plain text because the dialect
+# insert().on_conflict_do_update() construct has no cache key, so it would
+# be recompiled on every status change.
+_UPSERT = text(
+    "INSERT INTO transaction_rollups (day, status, count, sum_amount) "
+    "VALUES (:day, :status, :count, :sum_amount) "
+    "ON CONFLICT (day, status) DO UPDATE SET "
+    "count = transaction_rollups.count + excluded.count, "
+    "sum_amount = transaction_rollups.sum_amount + excluded.sum_amount"
+).bindparams(
+    bindparam("day", type_=Date),
+    bindparam("status", type_=String),
+    bindparam("count", type_=Integer),
+    bindparam("sum_amount", type_=BigInteger)
+)
+
+
+def _bounds(created_at, start: Optional[date], end: Optional[date]) -> List:
+    """
+    created_at conditions for the days start..end inclusive
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(created_at >= datetime.combine(start, time.min, timezone.utc))
+    if end is not None:
+        conditions.append(created_at < datetime.combine(end + timedelta(days=1), time.min, timezone.utc))
+    return conditions
+
+
+def _day_range(query, start: Optional[date], end: Optional[date]):
+    if start is not None:
+        query = query.where(TransactionRollup.day >= start)
+    if end is not None:
+        query = query.where(TransactionRollup.day <= end)
+    return query
+
+
+class RollupDeltas:
+    """
+    Net (count, amount) changes per (day, status), applied with one
+    upsert executemany
+    """
+
+    def __init__(self):
+        self._deltas: Dict[Tuple[date, str], List[int]] = {}
+
+    def add(self, created_at: Optional[datetime], status: str, amount: int, sign: int = 1) -> None:
+        key = (day_of(created_at), status)
+        delta = self._deltas.setdefault(key, [0, 0])
+        delta[0] += sign
+        delta[1] += sign * amount
+
+    def transition(self, created_at: Optional[datetime], amount: int, old_status: str, new_status: str) -> None:
+        if old_status != new_status:
+            self.add(created_at, old_status, amount, -1)
+            self.add(created_at, new_status, amount, 1)
+
+    def __bool__(self) -> bool:
+        return any(count or amount for count, amount in self._deltas.values())
+
+    def merge(self, other: "RollupDeltas") -> None:
+        for (day, status), (count, amount) in other._deltas.items():
+            delta = self._deltas.setdefault((day, status), [0, 0])
+            delta[0] += count
+            delta[1] += amount
+
+    async def apply(self, db: AsyncSession) -> None:
+        """
+        Upsert the deltas within the caller's transaction (the caller commits)
+
+        Inside defer_rollups(db) they are merged into the session's pending
+        deltas instead, and written once before its commit.
+        """
+        pending = db.info.get(_DEFERRED_KEY)
+        if pending is not None and pending is not self:
+            pending.merge(self)
+            self._deltas.clear()
+            return
+
+        # Sorted, so concurrent writers lock rollup rows in the same order
+        rows = [
+            {"day": day, "status": status, "count": count, "sum_amount": amount}
+            for (day, status), (count, amount) in sorted(self._deltas.items())
+            if count or amount
+        ]
+        if rows:
+            await db.execute(_UPSERT, rows)
+        self._deltas.clear()
+
+
+_DEFERRED_KEY = "deferred_rollup_deltas"
+
+
+def defer_rollups(db: AsyncSession) -> RollupDeltas:
+    """
+    Collect every RollupDeltas.apply() on db into one RollupDeltas; the
+    caller applies it (one upsert per day/status touched) before committing
+    """
+    deltas = RollupDeltas()
+    db.info[_DEFERRED_KEY] = deltas
+    return deltas
+
+
+def end_deferred_rollups(db: AsyncSession) -> None:
+    db.info.pop(_DEFERRED_KEY, None)
+
+
+async def read_stats(
+    db: AsyncSession,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    status: Optional[str] = None
+) -> List[TransactionRollup]:
+    """
+    Rollup rows for days start..end inclusive, oldest first
+    """
+    query = _day_range(select(TransactionRollup), start, end)
+    if status:
+        query = query.where(TransactionRollup.status == status)
+    result = await db.execute(query.order_by(TransactionRollup.day, TransactionRollup.status))
+    return list(result.scalars())
+
+
+def _aggregate(dialect_name: str, start: Optional[date], end: Optional[date], models=(Transaction, ArchivedTransaction)):
+    """
+    GROUP BY day, status over the raw tables (hot and archive)
+    """
+    rows = union_all(*(
+        select(model.created_at, model.status, model.amount).where(*_bounds(model.created_at, start, end))
+        for model in models
+    )).subquery()
+    day = _day_column(dialect_name, rows.c.created_at)
+    return (
+        select(day, rows.c.status, func.count(), func.coalesce(func.sum(rows.c.amount), 0))
+        .group_by(day, rows.c.status)
+    )
+
+
+async def _raw_aggregate(db: AsyncSession, start: Optional[date], end: Optional[date]) -> Dict[Tuple[date, str], Tuple[int, int]]:
+    result = await db.execute(_aggregate(db.get_bind().dialect.name, start, end))
+    return {
+        (date.fromisoformat(str(row[0])), row[1]): (row[2], row[3])
+        for row in result.all()
+    }
+
+
+async def rebuild(db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+    """
+    Recompute rollups for days start..end (everything when both are None)
+    from the transactions and transactions_archive tables, in one
+    transaction
+
+    Concurrent writers queue behind the rebuild: on PostgreSQL the rollup
+    table is locked first, on SQLite the DELETE takes the write lock.
+    """
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        await db.execute(text("LOCK TABLE transaction_rollups IN SHARE ROW EXCLUSIVE MODE"))
+
+    await db.execute(_day_range(delete(TransactionRollup), start, end))
+    table = TransactionRollup.__table__
+    await db.execute(
+        insert(table).from_select(
+            [table.c.day, table.c.status, table.c["count"], table.c.sum_amount],
+            _aggregate(dialect_name, start, end)
+        )
+    )
+    await db.commit()
+
+    count = await db.scalar(_day_range(select(func.count()).select_from(table), start, end))
+    logging.info("Rebuilt transaction rollups %s..%s: %d rows", start or "start", end or "end", count)
+    return {"from": start.isoformat() if start else None, "to": end.isoformat() if end else None, "rollup_rows": count}
+
+
+async def check(db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+    """
+    Compare rollups with a GROUP BY over the raw table for days start..end
+
+    Returns:
+        Report with consistent flag and the mismatching (day, status) rows
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Both reads from one snapshot
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    raw = await _raw_aggregate(db, start, end)
+    rollups = {
+        (row.day, row.status): (row.count, row.sum_amount)
+        for row in await read_stats(db, start, end)
+    }
+    await db.commit()
+
+    mismatches = []
+    for key in sorted(set(raw) | set(rollups)):
+        expected = raw.get(key, (0, 0))
+        actual = rollups.get(key, (0, 0))
+        if expected != actual:
+            mismatches.append({
+                "day": key[0].isoformat(),
+                "status": key[1],
+                "expected": {"count": expected[0], "sum_amount": expected[1]},
+                "rollup": {"count": actual[0], "sum_amount": actual[1]},
+            })
+
+    ROLLUP_MISMATCHES.set(len(mismatches))
+    if mismatches:
+        logging.warning("Transaction rollups disagree with the raw table on %d rows", len(mismatches))
+    return {
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+        "checked": len(set(raw) | set(rollups)),
+        "consistent": not mismatches,
+        "mismatches": mismatches,
+    }
@@ -0,0 +1,34 @@
+"""
+Paystack webhook signature verification
+
+Paystack signs every webhook with HMAC-SHA512 over the raw request body,
+keyed with the account's secret key, and sends the hex digest in the
+x-paystack-signature header.
+"""
+import hashlib
+import hmac
+from typing import Optional
+
+
+class WebhookSignatureVerifier:
+    def __init__(self, secret: str):
+        # Keyed once; each request copies the prepared state instead of
+        # re-deriving the HMAC key pads
+        self._prototype = hmac.new(secret.encode(), digestmod=hashlib.sha512) if secret else None
+
+    @property
+    def configured(self) -> bool:
+        return self._prototype is not None
+
+    def sign(self, body: bytes) -> str:
+        mac = self._prototype.copy()
+        mac.update(body)
+        return mac.hexdigest()
+
+    def verify(self, body: bytes, signature: Optional[str]) -> bool:
+        """
+        Constant-time check of a signature header against the raw body
+        """
+        if self._prototype is None or not signature:
+            return False
+        return hmac.compare_digest(self.sign(body), signature.strip().lower())
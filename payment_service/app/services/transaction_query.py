@@ -0,0 +1,202 @@
+"""
+Filtered, keyset-paginated transaction listing
+
+Pages are ordered newest first by (created_at, id) and continue from an
+opaque cursor holding the last row's key, so page N costs the same index
+range scan as page 1 (OFFSET would read and discard every earlier row).
+The composite indexes on Transaction cover each filter combination.
+
+Settled rows the archival job has moved to transactions_archive are still
+listed and exported: both tables are read (UNION ALL, same indexes on
+each) and merged in key order. Only a status=pending filter reads the hot
+table alone, since the archive never holds pending rows.
+"""
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from payment_service.app.models import TERMINAL_STATUSES, ArchivedTransaction, Transaction
+
+# Columns returned by the listing and export APIs
+LIST_COLUMNS = (
+    Transaction.id,
+    Transaction.reference,
+    Transaction.email,
+    Transaction.amount,
+    Transaction.status,
+    Transaction.paystack_reference,
+    Transaction.gateway_status,
+    Transaction.channel,
+    Transaction.fees,
+    Transaction.paid_at,
+    Transaction.created_at,
+    Transaction.updated_at,
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([_as_utc(created_at).isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+class TransactionFilters:
+    """
+    Filters shared by the listing and export endpoints
+    """
+
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        email: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ):
+        self.status = status
+        self.email = email
+        self.created_from = _as_utc(created_from)
+        self.created_to = _as_utc(created_to)
+
+    @property
+    def models(self) -> Tuple:
+        """
+        Tables that can hold matching rows
+        """
+        if self.status and self.status not in TERMINAL_STATUSES:
+            return (Transaction,)
+        return (Transaction, ArchivedTransaction)
+
+    def apply(self, query: Select, model=Transaction) -> Select:
+        if self.status:
+            query = query.where(model.status == self.status)
+        if self.email:
+            query = query.where(model.email == self.email)
+        if self.created_from:
+            query = query.where(model.created_at >= self.created_from)
+        if self.created_to:
+            query = query.where(model.created_at < self.created_to)
+        return query
+
+    def as_dict(self) -> Dict:
+        return {
+            "status": self.status,
+            "email": self.email,
+            "from": self.created_from.isoformat() if self.created_from else None,
+            "to": self.created_to.isoformat() if self.created_to else None,
+        }
+
+
+def ordered_query(
+    filters: TransactionFilters,
+    newest_first: bool = True,
+    before: Optional[Tuple[datetime, int]] = None
+):
+    """
+    LIST_COLUMNS of every matching row in the hot table and the archive,
+    ordered by (created_at, id)
+
+    Args:
+        filters: Status/email/date filters
+        newest_first: Descending rather than ascending order
+        before: Only rows whose (created_at, id) is below this key
+    """
+    branches = []
+    for model in filters.models:
+        query = filters.apply(select(*(getattr(model, column.key) for column in LIST_COLUMNS)), model)
+        if before is not None:
+            query = query.where(tuple_(model.created_at, model.id) < tuple_(*before))
+        branches.append(query)
+
+    query = branches[0] if len(branches) == 1 else union_all(*branches)
+    created_at, id = query.selected_columns.created_at, query.selected_columns.id
+    if newest_first:
+        return query.order_by(created_at.desc(), id.desc())
+    return query.order_by(created_at, id)
+
+
+def page_query(filters: TransactionFilters, limit: int, cursor: Optional[str] = None):
+    """
+    One page of LIST_COLUMNS, newest first, after cursor
+
+    Args:
+        filters: Status/email/date filters
+        limit: Rows to return
+        cursor: next_cursor of the previous page
+
+    Raises:
+        InvalidCursor: The cursor could not be decoded
+    """
+    before = None
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        before = (_as_utc(created_at), id)
+        if filters.created_to is not None and before[0] < filters.created_to:
+            # The cursor is the tighter upper bound; leaving "to" in as well
+            # lets the planner pick it for the index range and filter the rest
+            filters = TransactionFilters(filters.status, filters.email, filters.created_from)
+    return ordered_query(filters, before=before).limit(limit)
+
+
+def row_dict(row) -> Dict:
+    """
+    JSON-ready dict of one LIST_COLUMNS row
+    """
+    item = dict(row._mapping)
+    for field in ("paid_at", "created_at", "updated_at"):
+        if item[field] is not None:
+            item[field] = _as_utc(item[field]).isoformat()
+    return item
+
+
+async def list_transactions(
+    db: AsyncSession,
+    filters: TransactionFilters,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one page of transactions
+
+    Args:
+        db: Async database session
+        filters: Status/email/date filters
+        limit: Page size
+        cursor: next_cursor of the previous page, None for the first page
+
+    Returns:
+        (rows as dicts, cursor of the next page or None on the last page)
+    """
+    # One extra row tells whether another page exists
+    result = await db.execute(page_query(filters, limit + 1, cursor))
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return [row_dict(row) for row in rows], next_cursor
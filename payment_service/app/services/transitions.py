@@ -0,0 +1,93 @@
+"""
+Transaction status transitions
+
+A transition is one conditional statement:
+
+    UPDATE transactions SET status = :to_status, ...
+    WHERE reference = :reference AND status = :from_status
+    RETURNING *
+
+It costs one round trip instead of SELECT, commit and refresh, and it
+needs no row lock. When a webhook, a /payments/success verify and
+reconciliation race on one reference, only the first UPDATE still finds
+the row in from_status. The others match nothing, so a settled
+transaction is never overwritten. The allowed moves are
+models.STATUS_TRANSITIONS.
+"""
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from payment_service.app import metrics
+from payment_service.app.models import STATUS_TRANSITIONS, Transaction
+from payment_service.app.services.rollups import RollupDeltas
+
+TRANSITIONS = metrics.counter(
+    "transaction_transitions_total",
+    "Conditional status updates, by whether the row was still in the expected status",
+    ("from_status", "to_status", "outcome")
+)
+
+
+class InvalidTransition(ValueError):
+    """
+    A status change STATUS_TRANSITIONS does not allow
+    """
+
+
+def can_transition(from_status: str, to_status: str) -> bool:
+    return to_status in STATUS_TRANSITIONS.get(from_status, ())
+
+
+async def transition(
+    db: AsyncSession,
+    reference: str,
+    to_status: str,
+    from_status: str = "pending",
+    **fields
+) -> Optional[Transaction]:
+    """
+    Move a transaction from from_status to to_status and update its daily
+    rollups, within the caller's transaction (the caller commits)
+
+    Args:
+        db: Async database session
+        reference: Transaction reference
+        to_status: New status
+        from_status: Status the row must still be in
+        **fields: Other Transaction columns to set (paystack_reference,
+            gateway fields)
+
+    Returns:
+        The updated Transaction, or None if no transaction with this
+        reference is in from_status (not found, or already moved on)
+
+    Raises:
+        InvalidTransition: If the state machine does not allow the change
+    """
+    if not can_transition(from_status, to_status):
+        raise InvalidTransition(f"Transaction status cannot change from {from_status} to {to_status}")
+
+    statement = (
+        update(Transaction)
+        .where(Transaction.reference == reference, Transaction.status == from_status)
+        .values(status=to_status, **fields)
+        .returning(Transaction)
+    )
+    # Loaded as a query so a copy already in the session is refreshed from
+    # the RETURNING row (an ORM UPDATE leaves it stale)
+    result = await db.execute(
+        select(Transaction).from_statement(statement).execution_options(populate_existing=True)
+    )
+    transaction = result.scalar_one_or_none()
+
+    if transaction is None:
+        TRANSITIONS.inc(from_status=from_status, to_status=to_status, outcome="skipped")
+        return None
+
+    deltas = RollupDeltas()
+    deltas.transition(transaction.created_at, transaction.amount, from_status, to_status)
+    await deltas.apply(db)
+    TRANSITIONS.inc(from_status=from_status, to_status=to_status, outcome="applied")
+    return transaction
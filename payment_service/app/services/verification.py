@@ -1,105 +1,207 @@
-from sqlalchemy.orm import Session
-from payment_service.app.models import Transaction
-from payment_service.app.services.paystack_service import PaystackService
+from sqlalchemy.ext.asyncio import AsyncSession
+from payment_service.app import metrics
+from payment_service.app.cache import SingleFlight, TTLCache
+from payment_service.app.config import settings
+from payment_service.app.db import AsyncSessionLocal
+from payment_service.app.models import TERMINAL_STATUSES, Transaction
+from payment_service.app.services.archival import find_transaction
+from payment_service.app.services.gateway_events import event_row, extract_fields, record_events
+from payment_service.app.services.paystack_service import PaystackAPIError, PaystackService
+from payment_service.app.services.transitions import transition
 from typing import Optional
+import logging
+
+CACHE_LOOKUPS = metrics.counter(
+    "verification_cache_lookups_total",
+    "Verification result cache lookups",
+    ("result",)
+)
+VERIFICATIONS = metrics.counter(
+    "verification_requests_total",
+    "Verification requests by how they were answered",
+    ("source",)
+)
+
+# Recent verification results by reference. Terminal results never change
+# and are kept for VERIFICATION_CACHE_TTL; pending ones only briefly, to
+# absorb refreshes and prefetches. The webhook processor evicts references
+# it settles.
+verification_cache = TTLCache(
+    maxsize=settings.VERIFICATION_CACHE_SIZE,
+    ttl=settings.VERIFICATION_CACHE_TTL
+)
 
 class VerificationService:
-    def __init__(self):
-        self.paystack_service = PaystackService()
+    def __init__(self, session_factory=AsyncSessionLocal, paystack_service: Optional[PaystackService] = None):
+        self.paystack_service = paystack_service or PaystackService()
+        self.session_factory = session_factory
+        self.cache = verification_cache
+        self._in_flight = SingleFlight()
+
+    async def get_transaction(
+        self,
+        db: AsyncSession,
+        reference: str
+    ) -> Optional[Transaction]:
+        """
+        Load a transaction by reference, archived ones included
+
+        Args:
+            db: Async database session
+            reference: Transaction reference
+
+        Returns:
+            Transaction object (an ArchivedTransaction if it has been
+            archived) or None if not found
+        """
+        return await find_transaction(db, reference)
 
     async def verify_and_update_transaction(
-        self, 
-        db: Session, 
+        self,
+        db: AsyncSession,
         reference: str
     ) -> Optional[Transaction]:
         """
         Verify transaction with Paystack and update database
-        
+
+        Cached and terminal results are returned without calling Paystack;
+        concurrent verifications of one reference share a single call.
+
         Args:
-            db: Database session
+            db: Async database session
             reference: Transaction reference to verify
-            
+
         Returns:
             Updated Transaction object or None if not found
         """
+        cached = self.cache.get(reference)
+        if cached is not None:
+            CACHE_LOOKUPS.inc(result="hit")
+            VERIFICATIONS.inc(source="cache")
+            return cached
+        CACHE_LOOKUPS.inc(result="miss")
+
         # Get transaction from database
-        transaction = db.query(Transaction).filter(
-            Transaction.reference == reference
-        ).first()
-        
+        transaction = await self.get_transaction(db, reference)
+
         if not transaction:
             return None
-            
+
+        if transaction.status not in TERMINAL_STATUSES:
+            # End the read-only transaction so this request does not hold a
+            # pooled connection while it waits on Paystack
+            await db.commit()
+            transaction = await self._in_flight.do(
+                reference,
+                lambda: self._verify_with_paystack(reference)
+            )
+        else:
+            VERIFICATIONS.inc(source="database")
+
+        if transaction is not None:
+            self._remember(transaction)
+        return transaction
+
+    def _remember(self, transaction: Transaction) -> None:
+        ttl = None if transaction.status in TERMINAL_STATUSES else settings.VERIFICATION_PENDING_CACHE_TTL
+        self.cache.set(transaction.reference, transaction, ttl=ttl)
+
+    async def _verify_with_paystack(self, reference: str) -> Optional[Transaction]:
+        """
+        Call Paystack and store the outcome, in a session owned by the
+        in-flight call so it outlives any single waiting request
+        """
+        async with self.session_factory() as db:
+            transaction = await self.get_transaction(db, reference)
+
+            # Settled by a webhook or another process since the caller looked
+            if not transaction or transaction.status in TERMINAL_STATUSES:
+                VERIFICATIONS.inc(source="database")
+                return transaction
+
+            VERIFICATIONS.inc(source="paystack")
+            return await self._apply_verification(db, transaction, reference)
+
+    async def _apply_verification(
+        self,
+        db: AsyncSession,
+        transaction: Transaction,
+        reference: str
+    ) -> Transaction:
         try:
             # Verify with Paystack
             verification_response = await self.paystack_service.verify_transaction(reference)
-            
+
             if verification_response.get("status"):
                 data = verification_response.get("data", {})
-                
+
                 # Update transaction status
                 if data.get("status") == "success":
-                    transaction.status = "success"
+                    status = "success"
                 elif data.get("status") == "failed":
-                    transaction.status = "failed"
+                    status = "failed"
                 else:
-                    transaction.status = "pending"
-                
+                    status = "pending"
+
                 # Update additional fields
-                transaction.paystack_reference = data.get("reference")
-                transaction.gateway_response = str(verification_response)
-                
-                db.commit()
-                db.refresh(transaction)
-                
-                return transaction
+                fields = {"paystack_reference": data.get("reference"), **extract_fields(data)}
+                gateway_status = data.get("status")
             else:
                 # Verification failed
-                transaction.status = "failed"
-                transaction.gateway_response = str(verification_response)
-                db.commit()
-                db.refresh(transaction)
-                
-                return transaction
-                
+                status = "failed"
+                fields = {}
+                gateway_status = None
+
         except Exception as e:
+            if isinstance(e, PaystackAPIError) and e.transient:
+                # Paystack is down, throttling us or the circuit is open:
+                # the payment may well have gone through, so leave it
+                # pending for the webhook, a later visit or reconciliation
+                logging.warning("Verification of %s deferred: %s", reference, e)
+                return transaction
+
             # Handle verification error
-            transaction.status = "failed"
-            transaction.gateway_response = f"Verification error: {str(e)}"
-            db.commit()
-            db.refresh(transaction)
-            
+            status = "failed"
+            fields = {}
+            verification_response = {"status": False, "message": f"Verification error: {str(e)}"}
+            gateway_status = None
+
+        # One conditional UPDATE: if a webhook settled the transaction while
+        # Paystack was answering, it matches nothing and that outcome stands
+        updated = await transition(db, reference, status, **fields)
+        await record_events(db, [event_row(reference, "verify", verification_response, gateway_status)])
+        await db.commit()
+
+        if updated is None:
+            await db.refresh(transaction)
             return transaction
+        return updated
 
-    def update_transaction_status(
-        self, 
-        db: Session, 
-        reference: str, 
+    async def update_transaction_status(
+        self,
+        db: AsyncSession,
+        reference: str,
         status: str,
         paystack_reference: str = None
     ) -> Optional[Transaction]:
         """
-        Update transaction status in database
-        
+        Settle a pending transaction in database
+
         Args:
-            db: Database session
+            db: Async database session
             reference: Transaction reference
             status: New status
             paystack_reference: Paystack reference (optional)
-            
+
         Returns:
-            Updated Transaction object or None if not found
+            Updated Transaction object, or None if not found or no longer
+            pending
+
+        Raises:
+            InvalidTransition: If status is not one a pending transaction
+                can move to
         """
-        transaction = db.query(Transaction).filter(
-            Transaction.reference == reference
-        ).first()
-        
-        if transaction:
-            transaction.status = status
-            if paystack_reference:
-                transaction.paystack_reference = paystack_reference
-            
-            db.commit()
-            db.refresh(transaction)
-            
+        fields = {"paystack_reference": paystack_reference} if paystack_reference else {}
+        transaction = await transition(db, reference, status, **fields)
+        await db.commit()
         return transaction
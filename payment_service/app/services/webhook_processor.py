@@ -0,0 +1,265 @@
+"""
+Background processing of the webhook inbox
+
+The webhook route only inserts a WebhookEvent row and returns 200. A small
+pool of asyncio workers claims pending events in batches and applies the
+charge.success / charge.failed transitions with one bulk UPDATE per batch.
+
+Redeliveries are dropped at the door: seen event keys sit in a bounded
+TTL cache, and the unique constraint on webhook_events.event_key catches
+whatever the cache has forgotten (or another process accepted).
+"""
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_, select, update
+
+from payment_service.app import jsonutil, metrics
+from payment_service.app.cache import TTLCache
+from payment_service.app.config import settings
+from payment_service.app.db import AsyncSessionLocal
+from payment_service.app.models import WebhookEvent, utcnow
+from payment_service.app.services.gateway_events import event_row, record_events, settle, settle_params
+from payment_service.app.services.verification import verification_cache
+
+# Paystack event -> transaction status it settles to
+EVENT_STATUSES = {
+    "charge.success": "success",
+    "charge.failed": "failed",
+}
+
+QUEUE_DEPTH = metrics.gauge(
+    "webhook_queue_depth",
+    "Webhook events waiting to be processed"
+)
+PROCESSING_LAG = metrics.histogram(
+    "webhook_processing_lag_seconds",
+    "Time from webhook receipt to the event being applied",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+EVENTS_PROCESSED = metrics.counter(
+    "webhook_events_processed_total",
+    "Webhook events drained from the inbox",
+    ("event", "outcome")
+)
+
+DUPLICATES = metrics.counter(
+    "webhook_duplicates_total",
+    "Webhook redeliveries dropped before processing",
+    ("source",)
+)
+
+# Event keys already accepted into the inbox
+seen_events = TTLCache(
+    maxsize=settings.WEBHOOK_DEDUP_CACHE_SIZE,
+    ttl=settings.WEBHOOK_DEDUP_TTL
+)
+
+
+def event_key(event_type: Optional[str], data: dict, body: bytes) -> str:
+    """
+    Identify a delivery independently of retries: Paystack resends the same
+    event with the same data.id, so key on that and fall back to the
+    reference, then to a digest of the raw body
+    """
+    identity = data.get("id") or data.get("reference") or hashlib.sha256(body).hexdigest()
+    return f"{event_type}:{identity}"
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they were written as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class WebhookProcessor:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        workers: int = settings.WEBHOOK_WORKERS,
+        batch_size: int = settings.WEBHOOK_BATCH_SIZE,
+        poll_interval: float = settings.WEBHOOK_POLL_INTERVAL
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        """
+        Spawn the worker tasks on the running event loop
+        """
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(n), name=f"webhook-worker-{n}")
+            for n in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers; claimed but unfinished events are reclaimed
+        after WEBHOOK_CLAIM_TIMEOUT
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """
+        Wake idle workers after a new event has been stored
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                processed = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error("Webhook worker %d error: %s", number, e)
+                processed = 0
+
+            if processed:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, db) -> str:
+        """
+        Mark up to batch_size pending (or abandoned) events as ours
+        """
+        token = uuid.uuid4().hex
+        stale_before = utcnow() - timedelta(seconds=settings.WEBHOOK_CLAIM_TIMEOUT)
+        claimable = (
+            select(WebhookEvent.id)
+            .where(or_(
+                WebhookEvent.status == "pending",
+                (WebhookEvent.status == "processing") & (WebhookEvent.claimed_at < stale_before)
+            ))
+            .order_by(WebhookEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(claimable.scalar_subquery()))
+            .where(WebhookEvent.status.in_(("pending", "processing")))
+            .values(
+                status="processing",
+                claim_token=token,
+                claimed_at=utcnow(),
+                attempts=WebhookEvent.attempts + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return token
+
+    async def process_batch(self) -> int:
+        """
+        Claim one batch of events and apply it
+
+        Returns:
+            Number of events claimed
+        """
+        async with self.session_factory() as db:
+            token = await self._claim(db)
+            result = await db.execute(
+                select(WebhookEvent).where(WebhookEvent.claim_token == token)
+            )
+            events = list(result.scalars())
+
+            if events:
+                try:
+                    await self._apply(db, events)
+                except Exception as e:
+                    await db.rollback()
+                    await self._release(db, token, str(e))
+                    raise
+
+            await self._update_queue_depth(db)
+            return len(events)
+
+    async def _apply(self, db, events: List[WebhookEvent]) -> None:
+        # Last delivery wins when a batch holds several events for one reference
+        updates: Dict[str, dict] = {}
+        gateway_events: List[dict] = []
+        for event in events:
+            status = EVENT_STATUSES.get(event.event_type)
+            if status is None or not event.reference:
+                EVENTS_PROCESSED.inc(event=event.event_type or "", outcome="ignored")
+                continue
+            data = jsonutil.loads(event.payload).get("data", {})
+            updates[event.reference] = settle_params(
+                event.reference, status, data.get("paystack_reference"), data
+            )
+            gateway_events.append(event_row(event.reference, "webhook", data, data.get("status")))
+
+        if updates:
+            await settle(db, list(updates.values()))
+            await record_events(db, gateway_events)
+
+        processed_at = utcnow()
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_([event.id for event in events]))
+            .values(status="processed", processed_at=processed_at, error=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        # Drop any short-lived pending verification results for these references
+        for reference in updates:
+            verification_cache.pop(reference)
+
+        for event in events:
+            PROCESSING_LAG.observe((processed_at - _as_utc(event.received_at)).total_seconds())
+            if event.reference in updates:
+                EVENTS_PROCESSED.inc(event=event.event_type, outcome="applied")
+        logging.info("Applied %d webhook updates from %d events", len(updates), len(events))
+
+    async def _release(self, db, token: str, error: str) -> None:
+        """
+        Return a failed batch to the inbox, parking events that keep failing
+        """
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.claim_token == token)
+            .values(status="pending", error=error)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.claim_token == token)
+            .where(WebhookEvent.attempts >= settings.WEBHOOK_MAX_ATTEMPTS)
+            .values(status="failed")
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async def _update_queue_depth(self, db) -> None:
+        result = await db.execute(
+            select(func.count())
+            .select_from(WebhookEvent)
+            .where(WebhookEvent.status.in_(("pending", "processing")))
+        )
+        QUEUE_DEPTH.set(result.scalar_one())
+
+
+webhook_processor = WebhookProcessor()
@@ -0,0 +1,64 @@
+"""
+Shared Jinja2 templates
+
+One environment for the whole app, so each template is parsed and
+compiled once per process. Templates are compiled during startup
+(warm_templates) rather than on the first request that needs them, and
+with TEMPLATE_CACHE_DIR set the compiled bytecode is also kept on disk
+for the next cold start.
+
+Templates link static files with asset_url() (content-hashed, see
+assets.py). Pages with no per-request data are rendered once and served
+precompressed with static_page().
+"""
+import logging
+import os
+from typing import Dict
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+from payment_service.app.assets import Asset, static_assets
+from payment_service.app.config import settings
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+# Only re-check template files for changes while developing
+templates.env.auto_reload = settings.DEBUG
+if settings.TEMPLATE_CACHE_DIR:
+    os.makedirs(settings.TEMPLATE_CACHE_DIR, exist_ok=True)
+    templates.env.bytecode_cache = jinja2.FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR)
+templates.env.globals["asset_url"] = static_assets.url
+
+# Rendered static pages by template name
+_pages: Dict[str, Asset] = {}
+
+
+def warm_templates() -> int:
+    """
+    Compile every template into the environment's cache
+
+    Returns:
+        Number of templates compiled
+    """
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    logging.info("Compiled %d templates", len(names))
+    return len(names)
+
+
+def static_page(name: str) -> Asset:
+    """
+    A template without per-request data, rendered once (on every call
+    while DEBUG, so edits show up)
+
+    Returns:
+        The rendered page; answer with .response(request.headers)
+    """
+    page = _pages.get(name)
+    if page is None or settings.DEBUG:
+        html = templates.env.get_template(name).render()
+        page = _pages[name] = Asset(html.encode("utf-8"), "text/html; charset=utf-8")
+    return page
@@ -0,0 +1,235 @@
+"""
+Hot table size and query times before and after archiving settled rows
+
+Builds a SQLite database (migrated to the current schema) with --rows
+transactions spread over the past two years, all settled except the
+most recent ones, of which --pending-ratio are still pending. It measures
+the hot-table work on every request and every reconciliation run, then
+runs the archival job (ARCHIVE_AFTER_DAYS) and measures again:
+
+- transactions table + index bytes (dbstat)
+- a reconciliation pass over pending rows (services/reconciliation.py's chunk query)
+- GET /transactions?email=... first page
+- inserts of new transactions (100 per commit, like group commit)
+- lookups by reference in the hot table and, after archival, through
+  find_transaction for hot and for archived rows
+
+Usage:
+    python -m payment_service.bench.archival [--rows 500000] [--recent-days 30]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from payment_service.app.models import Transaction
+from payment_service.app.schema import MIGRATIONS_DIR
+from payment_service.app.services.archival import ArchivalJob, find_transaction
+from payment_service.app.services.transaction_query import TransactionFilters, page_query
+
+CUSTOMERS = 5000
+
+
+def migrate(url: str) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, "head")
+    engine.dispose()
+
+
+def populate(url: str, rows: int, recent_days: float, pending_ratio: float) -> list:
+    """
+    Returns:
+        References of every row, oldest first
+    """
+    engine = create_engine(url)
+    now = datetime.now(timezone.utc)
+    span = timedelta(days=730).total_seconds()
+    recent = now - timedelta(days=recent_days)
+    references = []
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            created_at = now - timedelta(seconds=span * (1 - i / rows))
+            pending = created_at > recent and random.random() < pending_ratio
+            reference = f"PAY_{int(created_at.timestamp())}_{i:08x}"
+            references.append(reference)
+            batch.append({
+                "email": f"customer{random.randrange(CUSTOMERS)}@example.com",
+                "amount": random.randrange(1000, 500000),
+                "reference": reference,
+                "status": "pending" if pending else random.choice(("success", "success", "success", "failed")),
+                "created_at": created_at,
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Transaction.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Transaction.__table__), batch)
+    engine.dispose()
+    return references
+
+
+def _timed(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def measure(url: str, hot_references: list) -> dict:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        size = conn.scalar(text(
+            "SELECT sum(pgsize) FROM dbstat WHERE name = 'transactions' "
+            "OR (name LIKE 'ix_transactions_%' AND name NOT LIKE 'ix_transactions_archive%')"
+        ))
+        hot_rows = conn.scalar(select(func.count()).select_from(Transaction))
+
+        def reconcile_pass():
+            last_id = 0
+            cutoff = datetime.now(timezone.utc)
+            while True:
+                rows = conn.execute(
+                    select(Transaction.id, Transaction.reference)
+                    .where(Transaction.status == "pending")
+                    .where(Transaction.id > last_id)
+                    .where(Transaction.created_at < cutoff)
+                    .order_by(Transaction.id)
+                    .limit(200)
+                ).all()
+                if not rows:
+                    return
+                last_id = rows[-1][0]
+
+        def email_page():
+            for customer in range(50):
+                filters = TransactionFilters(email=f"customer{customer}@example.com")
+                conn.execute(page_query(filters, 50)).all()
+
+        sample = random.sample(hot_references, min(2000, len(hot_references)))
+
+        def lookups():
+            for reference in sample:
+                conn.execute(select(Transaction.id).where(Transaction.reference == reference)).first()
+
+        reconcile = _timed(reconcile_pass)
+        email = _timed(email_page) / 50
+        lookup = _timed(lookups) / len(sample)
+        conn.commit()
+
+        counter = [0]
+
+        def inserts():
+            now = datetime.now(timezone.utc)
+            conn.execute(insert(Transaction.__table__), [
+                {
+                    "email": f"customer{random.randrange(CUSTOMERS)}@example.com",
+                    "amount": 5000,
+                    "reference": f"PAY_NEW_{counter[0] + i:08d}_{random.getrandbits(32):08x}",
+                    "status": "pending",
+                    "created_at": now,
+                }
+                for i in range(100)
+            ])
+            conn.commit()
+            counter[0] += 100
+
+        insert_rate = 100 / _timed(inserts, repeat=50)
+        # Leave the pending set as it was for the next measurement
+        conn.execute(Transaction.__table__.delete().where(Transaction.reference.like("PAY_NEW_%")))
+        conn.commit()
+    engine.dispose()
+    return {
+        "hot_rows": hot_rows,
+        "hot_mib": size / 2 ** 20,
+        "reconcile_ms": reconcile * 1000,
+        "email_page_ms": email * 1000,
+        "lookup_us": lookup * 1e6,
+        "inserts_per_s": insert_rate,
+    }
+
+
+async def _lookup_seconds(db: AsyncSession, references: list) -> float:
+    sample = random.sample(references, min(1000, len(references)))
+    started = time.perf_counter()
+    for reference in sample:
+        if await find_transaction(db, reference) is None:
+            raise RuntimeError(f"{reference} not found")
+    return (time.perf_counter() - started) / max(1, len(sample))
+
+
+async def archive(async_url: str, hot_references: list, archived_references: list) -> tuple:
+    """
+    Returns:
+        (job report, archive job seconds, find_transaction seconds for hot
+        rows, for archived rows)
+    """
+    engine = create_async_engine(async_url)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    started = time.perf_counter()
+    report = await ArchivalJob(session_factory=session_factory).run()
+    elapsed = time.perf_counter() - started
+
+    async with session_factory() as db:
+        hot_lookup = await _lookup_seconds(db, hot_references)
+        archived_lookup = await _lookup_seconds(db, archived_references)
+    await engine.dispose()
+    return report, elapsed, hot_lookup, archived_lookup
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Hot table size and query times before and after archival")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--recent-days", type=float, default=30, help="Rows this recent may still be pending")
+    parser.add_argument("--pending-ratio", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "archival.db")
+        url = f"sqlite:///{path}"
+        migrate(url)
+        references = populate(url, args.rows, args.recent_days, args.pending_ratio)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=ArchivalJob().older_than_days)
+        # Legacy references carry their creation second
+        hot = [r for r in references if datetime.fromtimestamp(int(r.split("_")[1]), timezone.utc) >= cutoff]
+        old = [r for r in references if datetime.fromtimestamp(int(r.split("_")[1]), timezone.utc) < cutoff]
+
+        before = measure(url, hot)
+        report, elapsed, hot_lookup, archived_lookup = asyncio.run(
+            archive(f"sqlite+aiosqlite:///{path}", hot, old)
+        )
+        after = measure(url, hot)
+
+    print(f"{args.rows:,} transactions over 2 years; archived {report['archived']:,} in {elapsed:.1f}s "
+          f"({report['batches']} batches)")
+    print(f"{'':>22} {'before':>12} {'after':>12}")
+    for key, label, fmt in (
+        ("hot_rows", "hot rows", "{:,.0f}"),
+        ("hot_mib", "hot table+index MiB", "{:,.1f}"),
+        ("reconcile_ms", "pending scan ms", "{:,.2f}"),
+        ("email_page_ms", "email page ms", "{:,.3f}"),
+        ("lookup_us", "hot lookup us", "{:,.1f}"),
+        ("inserts_per_s", "inserts/s", "{:,.0f}"),
+    ):
+        print(f"{label:>22} {fmt.format(before[key]):>12} {fmt.format(after[key]):>12}")
+    print(f"find_transaction: hot row {hot_lookup * 1e6:,.0f} us, archived row {archived_lookup * 1e6:,.0f} us")
+
+
+if __name__ == "__main__":
+    main()
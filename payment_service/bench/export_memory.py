@@ -0,0 +1,95 @@
+"""
+Memory profile of the streaming transaction export
+
+Runs TransactionExport over growing slices of a large synthetic SQLite
+table (built by bench/pagination.py's generator, reused when present) and
+reports, per export, the peak Python heap (tracemalloc), the process peak
+RSS and throughput. With the server-side cursor both stay flat as the row
+count grows by orders of magnitude; a buffered export grows linearly.
+tracemalloc slows the export several times over, so read throughput from
+the CLI or the endpoint instead.
+
+Usage:
+    python -m payment_service.bench.export_memory [--rows 3000000] [--format ndjson] [--gzip]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import time
+import tracemalloc
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from payment_service.bench.pagination import START, STEP_SECONDS, ensure_archive_table, generate
+from payment_service.app.services.export import TransactionExport
+from payment_service.app.services.transaction_query import TransactionFilters
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_export(session_factory, rows: int, format: str, compress: bool, batch_size: int) -> dict:
+    # Rows are STEP_SECONDS apart from START, so a "to" bound selects the first N
+    filters = TransactionFilters(created_to=START + timedelta(seconds=STEP_SECONDS * rows + 1))
+    export = TransactionExport(filters, format=format, compress=compress, batch_size=batch_size, session_factory=session_factory)
+
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    with open(os.devnull, "wb") as out:
+        async for chunk in export.chunks():
+            out.write(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    return {
+        "rows": export.rows,
+        "bytes": export.bytes,
+        "seconds": elapsed,
+        "heap_peak_mib": peak / 1024 / 1024,
+        "rss_peak_mib": peak_rss_mib(),
+    }
+
+
+async def main_async(args) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{args.db}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    sizes = [size for size in (10_000, 100_000, 1_000_000, args.rows) if size <= args.rows]
+
+    tracemalloc.start()
+    print(f"format={args.format} gzip={args.gzip} batch={args.batch_size}")
+    print(f"{'rows':>10} {'MiB out':>9} {'seconds':>8} {'rows/s':>9} {'heap peak MiB':>14} {'RSS peak MiB':>13}")
+    for size in sorted(set(sizes)):
+        r = await run_export(session_factory, size, args.format, args.gzip, args.batch_size)
+        print(
+            f"{r['rows']:>10} {r['bytes'] / 1024 / 1024:>9.1f} {r['seconds']:>8.2f} "
+            f"{r['rows'] / r['seconds']:>9.0f} {r['heap_peak_mib']:>14.2f} {r['rss_peak_mib']:>13.1f}"
+        )
+    tracemalloc.stop()
+    await engine.dispose()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Memory profile of the streaming export")
+    parser.add_argument("--rows", type=int, default=3_000_000, help="Largest export (and table size if generated)")
+    parser.add_argument("--db", default="/tmp/transactions-bench.db", help="SQLite file, reused when it exists")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    sync_engine = create_engine(f"sqlite:///{args.db}")
+    if not os.path.exists(args.db) or os.path.getsize(args.db) == 0:
+        print(f"generating {args.rows} rows into {args.db} ...")
+        generate(sync_engine, args.rows)
+    ensure_archive_table(sync_engine)
+    sync_engine.dispose()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Local stand-in for api.paystack.co
+
+Implements the endpoints PaystackService uses (initialize, verify, list)
+plus a webhook emitter, with injectable latency, errors and rate limiting.
+Point the service at it with PAYSTACK_BASE_URL=http://127.0.0.1:9000.
+
+Usage:
+    python -m payment_service.bench.fake_paystack --port 9000 --latency-ms 80 --error-rate 0.01 --rate-limit 100
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+
+class FakePaystackConfig:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: int = 0,
+        success_rate: float = 0.9,
+        secret_key: str = "sk_test_fake"
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit  # requests per second, 0 = unlimited
+        self.success_rate = success_rate
+        self.secret_key = secret_key  # signs emitted webhooks, match PAYSTACK_SECRET_KEY
+
+
+def create_app(config: Optional[FakePaystackConfig] = None) -> FastAPI:
+    """
+    Build the fake Paystack app; state lives in the app instance
+    """
+    config = config or FakePaystackConfig()
+    app = FastAPI(title="Fake Paystack")
+    app.state.config = config
+    app.state.transactions = {}
+    app.state.calls = {}
+    window: Deque[float] = deque()
+    next_id = iter(range(1, 1 << 62))
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        path = request.url.path
+        if path.startswith("/_"):
+            return await call_next(request)
+
+        endpoint = path.split("/")[2] if path.count("/") >= 2 else path.strip("/")
+        app.state.calls[endpoint] = app.state.calls.get(endpoint, 0) + 1
+
+        if config.rate_limit:
+            now = time.monotonic()
+            while window and window[0] <= now - 1.0:
+                window.popleft()
+            if len(window) >= config.rate_limit:
+                return JSONResponse(
+                    {"status": False, "message": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": "1"}
+                )
+            window.append(now)
+
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+            await asyncio.sleep(max(0.0, delay) / 1000)
+
+        if config.error_rate and random.random() < config.error_rate:
+            return JSONResponse({"status": False, "message": "Injected upstream error"}, status_code=502)
+
+        return await call_next(request)
+
+    def _settle(record: dict) -> dict:
+        if record["status"] == "ongoing":
+            record["status"] = "success" if random.random() < config.success_rate else "failed"
+            record["paid_at"] = datetime.now(timezone.utc).isoformat()
+            record["gateway_response"] = "Successful" if record["status"] == "success" else "Declined"
+        return record
+
+    @app.post("/transaction/initialize")
+    async def initialize(request: Request):
+        body = await request.json()
+        reference = body.get("reference") or f"fake_{random.getrandbits(48):x}"
+        if reference in app.state.transactions:
+            raise HTTPException(status_code=400, detail="Duplicate Transaction Reference")
+        access_code = f"ac_{random.getrandbits(40):x}"
+        app.state.transactions[reference] = {
+            "id": next(next_id),
+            "reference": reference,
+            "amount": body.get("amount"),
+            "currency": body.get("currency", "NGN"),
+            "customer": {"email": body.get("email")},
+            "status": "ongoing",
+            "channel": "card",
+            "fees": int((body.get("amount") or 0) * 0.015),
+            "paid_at": None,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        return {
+            "status": True,
+            "message": "Authorization URL created",
+            "data": {
+                "authorization_url": f"https://checkout.paystack.com/{access_code}",
+                "access_code": access_code,
+                "reference": reference,
+            },
+        }
+
+    @app.get("/transaction/verify/{reference}")
+    async def verify(reference: str):
+        record = app.state.transactions.get(reference)
+        if record is None:
+            return JSONResponse({"status": False, "message": "Transaction reference not found"}, status_code=400)
+        return {"status": True, "message": "Verification successful", "data": _settle(record)}
+
+    @app.get("/transaction")
+    async def list_transactions(request: Request, page: int = 1, perPage: int = 50, status: Optional[str] = None):
+        records = [_settle(record) for record in app.state.transactions.values()]
+        window_from = request.query_params.get("from")
+        window_to = request.query_params.get("to")
+        if window_from:
+            records = [r for r in records if datetime.fromisoformat(r["created_at"]) >= datetime.fromisoformat(window_from)]
+        if window_to:
+            records = [r for r in records if datetime.fromisoformat(r["created_at"]) < datetime.fromisoformat(window_to)]
+        if status:
+            records = [record for record in records if record["status"] == status]
+        total = len(records)
+        start = (page - 1) * perPage
+        return {
+            "status": True,
+            "message": "Transactions retrieved",
+            "data": records[start:start + perPage],
+            "meta": {
+                "total": total,
+                "skipped": start,
+                "perPage": perPage,
+                "page": page,
+                "pageCount": max(1, -(-total // perPage)),
+            },
+        }
+
+    @app.post("/_emit_webhook")
+    async def emit_webhook(request: Request):
+        """
+        Send a charge.success/charge.failed webhook for a known reference to
+        {"target": "http://host/webhook/paystack", "reference": ..., "duplicates": n}
+        """
+        body = await request.json()
+        record = app.state.transactions.get(body["reference"])
+        if record is None:
+            raise HTTPException(status_code=404, detail="Unknown reference")
+        _settle(record)
+        payload = json.dumps({
+            "event": "charge.success" if record["status"] == "success" else "charge.failed",
+            "data": record,
+        }).encode()
+        statuses = []
+        async with httpx.AsyncClient() as client:
+            for _ in range(1 + int(body.get("duplicates", 0))):
+                response = await client.post(
+                    body["target"],
+                    content=payload,
+                    headers={
+                        "Content-Type": "application/json",
+                        "x-paystack-signature": hmac.new(
+                            config.secret_key.encode(), payload, hashlib.sha512
+                        ).hexdigest(),
+                    }
+                )
+                statuses.append(response.status_code)
+        return {"statuses": statuses}
+
+    @app.get("/_stats")
+    async def stats():
+        return {"calls": app.state.calls, "transactions": len(app.state.transactions)}
+
+    @app.post("/_config")
+    async def update_config(request: Request):
+        for key, value in (await request.json()).items():
+            if hasattr(config, key):
+                setattr(config, key, value)
+        return vars(config)
+
+    return app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake Paystack API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean added latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter around the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with a 502")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per second before 429s (0 = off)")
+    parser.add_argument("--success-rate", type=float, default=0.9, help="Fraction of transactions that settle as success")
+    parser.add_argument("--secret-key", default="sk_test_fake", help="Key used to sign emitted webhooks")
+    args = parser.parse_args(argv)
+
+    config = FakePaystackConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        success_rate=args.success_rate,
+        secret_key=args.secret_key
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Load-test harness for the payment endpoints
+
+Drives /payments/initiate, /payments/success and /webhook/paystack at a
+target request rate (open loop: requests are scheduled on a fixed clock, so
+a slow server shows up as latency rather than a lower send rate) and
+reports throughput, latency percentiles, errors and database commits per
+scenario. Run the service against bench/fake_paystack.py first:
+
+    python -m payment_service.bench.fake_paystack --port 9000 --latency-ms 80 &
+    PAYSTACK_BASE_URL=http://127.0.0.1:9000 uvicorn payment_service.app.main:app --port 8000 &
+    python -m payment_service.bench.loadtest --target http://127.0.0.1:8000 --paystack http://127.0.0.1:9000 \\
+        --rps 100 --duration 30 --output bench-results.json [--compare previous-results.json]
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import platform
+import random
+import re
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ("initiate", "success", "webhook")
+
+_COMMITS_RE = re.compile(r"^db_commits_total\s+([0-9.eE+-]+)$", re.MULTILINE)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+async def scrape_commits(client: httpx.AsyncClient) -> Optional[float]:
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    match = _COMMITS_RE.search(response.text)
+    return float(match.group(1)) if match else None
+
+
+async def run_open_loop(
+    send: Callable[[int], "asyncio.Future"],
+    rps: float,
+    duration: float,
+    max_in_flight: int
+) -> Dict:
+    """
+    Fire send(i) at a fixed rate and measure each call from its scheduled
+    start, so queueing delay is not hidden (no coordinated omission)
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(max_in_flight)
+    total = int(rps * duration)
+    started = time.perf_counter()
+
+    async def one(i: int, scheduled: float) -> None:
+        async with semaphore:
+            try:
+                status = str(await send(i))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+        latencies.append(time.perf_counter() - scheduled)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    tasks = []
+    for i in range(total):
+        scheduled = started + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    return {
+        "requests": total,
+        "ok": ok,
+        "errors": total - ok,
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p90": round(percentile(latencies, 90) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round((latencies[-1] if latencies else 0.0) * 1000, 2),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+class LoadTest:
+    def __init__(
+        self,
+        target: str,
+        paystack: str,
+        rps: float,
+        duration: float,
+        max_in_flight: int,
+        duplicate_rate: float,
+        secret_key: str = "sk_test_fake"
+    ):
+        self.target = target.rstrip("/")
+        self.paystack = paystack.rstrip("/")
+        self.rps = rps
+        self.duration = duration
+        self.max_in_flight = max_in_flight
+        self.duplicate_rate = duplicate_rate
+        self.secret_key = secret_key.encode()
+        self.references: List[str] = []
+        self.client = httpx.AsyncClient(
+            base_url=self.target,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        )
+
+    async def initiate(self, i: int) -> int:
+        response = await self.client.post(
+            "/payments/initiate",
+            data={"email": f"load{i}@example.com", "amount": 1000 + i % 5000},
+            follow_redirects=False
+        )
+        return response.status_code
+
+    async def success(self, i: int) -> int:
+        reference = self.references[i % len(self.references)] if self.references else f"missing_{i}"
+        response = await self.client.get("/payments/success", params={"reference": reference})
+        return response.status_code
+
+    async def webhook(self, i: int) -> int:
+        # A share of deliveries repeat an earlier event, like Paystack retries
+        n = random.randrange(max(1, i)) if i and random.random() < self.duplicate_rate else i
+        reference = self.references[n % len(self.references)] if self.references else f"missing_{n}"
+        payload = {
+            "event": "charge.success",
+            "data": {"id": 10_000_000 + n, "reference": reference, "status": "success", "amount": 1000},
+        }
+        body = json.dumps(payload).encode()
+        response = await self.client.post(
+            "/webhook/paystack",
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "x-paystack-signature": hmac.new(self.secret_key, body, hashlib.sha512).hexdigest(),
+            }
+        )
+        return response.status_code
+
+    async def collect_references(self, limit: int) -> None:
+        """
+        Pick up references created by the initiate scenario from the fake
+        Paystack's list endpoint (synthetic references are used otherwise)
+        """
+        try:
+            async with httpx.AsyncClient(base_url=self.paystack, timeout=30.0) as client:
+                response = await client.get("/transaction", params={"perPage": limit})
+                self.references = [item["reference"] for item in response.json().get("data", [])]
+        except (httpx.HTTPError, ValueError, KeyError):
+            self.references = []
+
+    async def run(self, scenarios: List[str]) -> Dict:
+        results = {}
+        for scenario in scenarios:
+            if scenario != "initiate" and not self.references:
+                await self.collect_references(int(self.rps * self.duration))
+            commits_before = await scrape_commits(self.client)
+            result = await run_open_loop(getattr(self, scenario), self.rps, self.duration, self.max_in_flight)
+            # Give background workers (webhook inbox) a moment to flush
+            await asyncio.sleep(1.0)
+            commits_after = await scrape_commits(self.client)
+            if commits_before is not None and commits_after is not None:
+                result["db_commits"] = int(commits_after - commits_before)
+                result["db_commits_per_request"] = round(result["db_commits"] / max(1, result["requests"]), 3)
+            results[scenario] = result
+        await self.client.aclose()
+        return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict) -> Dict:
+    """
+    Percentage change per scenario for throughput, p50/p99 and commits
+    """
+    changes = {}
+    for scenario, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if not before:
+            continue
+
+        def delta(now, then):
+            return round((now - then) / then * 100, 1) if then else None
+
+        changes[scenario] = {
+            "throughput_rps_pct": delta(result["throughput_rps"], before["throughput_rps"]),
+            "p50_pct": delta(result["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            "p99_pct": delta(result["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+            "db_commits_per_request_pct": delta(
+                result.get("db_commits_per_request", 0), before.get("db_commits_per_request", 0)
+            ),
+        }
+    return changes
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the payment service")
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--paystack", default="http://127.0.0.1:9000", help="Fake Paystack base URL")
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per scenario")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2, help="Share of webhook deliveries that are retries")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--secret-key", default="sk_test_fake", help="PAYSTACK_SECRET_KEY of the target, to sign webhooks")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to diff against")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    test = LoadTest(args.target, args.paystack, args.rps, args.duration, args.max_in_flight, args.duplicate_rate, args.secret_key)
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": {"target": args.target, "rps": args.rps, "duration": args.duration, "scenarios": scenarios},
+        "scenarios": asyncio.run(test.run(scenarios)),
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["compared_to"] = args.compare
+            report["changes"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
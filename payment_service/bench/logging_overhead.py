@@ -0,0 +1,165 @@
+"""
+Per-request logging overhead: synchronous text logging vs. the queued
+JSON pipeline
+
+A webhook-shaped endpoint logs "Received Paystack webhook" on every
+request, as routes/webhook.py does. Three setups serve it:
+- none: logging disabled (the floor)
+- legacy: logging.basicConfig text handler writing from the event loop,
+  f-string message
+- current: logs.configure() (QueueHandler, JSON written by a listener
+  thread, lazy arguments, info_sampled() events kept at --sample-rate) plus
+  RequestContextMiddleware and its per-request line
+
+Each setup writes to a fast sink (/dev/null) and to a slow one whose
+writes take --slow-write-ms, like a log pipe the collector is not keeping
+up with. Requests go straight through the ASGI app, one at a time, and
+the report shows the time each request held the event loop, plus records
+written and dropped.
+
+Usage:
+    python -m payment_service.bench.logging_overhead [--requests 20000] [--slow-write-ms 0.2]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from payment_service.app import logs
+
+EVENT_TYPE = "charge.success"
+REFERENCE = "PAY_1700000000_0000beef"
+
+
+class Sink(io.TextIOBase):
+    """
+    Counts lines; each write optionally blocks like a full pipe
+    """
+
+    def __init__(self, write_delay: float = 0.0):
+        self.write_delay = write_delay
+        self.lines = 0
+        self.devnull = open(os.devnull, "w")
+
+    def write(self, text: str) -> int:
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        self.lines += text.count("\n")
+        return self.devnull.write(text)
+
+    def flush(self) -> None:
+        self.devnull.flush()
+
+
+def legacy_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/webhook/paystack")
+    async def webhook():
+        logging.info(f"Received Paystack webhook: {EVENT_TYPE}")
+        return {"status": "success"}
+
+    return app
+
+
+def current_app():
+    app = FastAPI()
+
+    @app.post("/webhook/paystack")
+    async def webhook():
+        logs.bind_reference(REFERENCE)
+        logs.info_sampled("Received Paystack webhook: %s", EVENT_TYPE)
+        return {"status": "success"}
+
+    return logs.RequestContextMiddleware(app)
+
+
+async def drive(app, requests: int):
+    """
+    Returns:
+        (requests/s, p50 seconds, p99 seconds)
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/webhook/paystack",
+        "raw_path": b"/webhook/paystack",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        pass
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        timings.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return requests / elapsed, statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def setup(name: str, sink: Sink, sample_rate: float) -> None:
+    root = logging.getLogger()
+    logs.stop()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    if name == "none":
+        root.addHandler(logging.NullHandler())
+        root.setLevel(logging.WARNING)
+    elif name == "legacy":
+        logging.basicConfig(level=logging.INFO, format=logs.TEXT_FORMAT, stream=sink, force=True)
+    else:
+        logs.configure(level="INFO", log_format="json", sample_rate=sample_rate, stream=sink, force=True)
+
+
+async def run(requests: int, slow_write: float, sample_rate: float) -> None:
+    print(f"{'sink':>6} {'setup':>8} {'req/s':>9} {'p50 us':>8} {'p99 us':>9} {'lines':>7} {'dropped':>8}")
+    for sink_name, delay in (("fast", 0.0), ("slow", slow_write)):
+        for name in ("none", "legacy", "current"):
+            sink = Sink(delay)
+            setup(name, sink, sample_rate)
+            app = current_app() if name == "current" else legacy_app()
+            dropped_before = logs.LOG_RECORDS_DROPPED.value(reason="queue_full")
+            # Warm up, then measure
+            await drive(app, min(requests, 500))
+            sink.lines = 0
+            rate, p50, p99 = await drive(app, requests)
+            # Flush what the listener still holds; not on the request path
+            logs.stop()
+            dropped = logs.LOG_RECORDS_DROPPED.value(reason="queue_full") - dropped_before
+            print(
+                f"{sink_name:>6} {name:>8} {rate:>9,.0f} {p50 * 1e6:>8.1f} {p99 * 1e6:>9.1f} "
+                f"{sink.lines:>7,} {dropped:>8,.0f}"
+            )
+    setup("none", Sink(), sample_rate)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Per-request logging overhead")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--slow-write-ms", type=float, default=0.2, help="Time each write to the slow sink takes")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="LOG_SAMPLE_RATE for the current setup")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.requests, args.slow_write_ms / 1000, args.sample_rate))
+
+
+if __name__ == "__main__":
+    main()
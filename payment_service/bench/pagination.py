@@ -0,0 +1,153 @@
+"""
+Keyset vs. OFFSET page latency on a large synthetic transactions table
+
+Generates a SQLite database with --rows transactions (10M by default; the
+file is kept and reused with --db), then times one page of /transactions'
+query at increasing depths, for each filter shape the API supports:
+
+- keyset: services/transaction_query.page_query with the cursor of the row
+  just before that depth (what a client walking the pages sends)
+- offset: the same filters and ordering with OFFSET depth
+
+Keyset pages stay flat as depth grows; OFFSET grows linearly.
+
+Usage:
+    python -m payment_service.bench.pagination [--rows 10000000] [--db /tmp/transactions-bench.db]
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.schema import CreateTable
+
+from payment_service.app.models import ArchivedTransaction, Transaction
+from payment_service.app.services.transaction_query import (
+    LIST_COLUMNS, TransactionFilters, encode_cursor, page_query
+)
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+STEP_SECONDS = 3
+EMAILS = 100000
+DEPTHS = (0, 1000, 10000, 100000, 1000000, 5000000)
+
+
+def generate(engine, rows: int) -> None:
+    """
+    Fill transactions inside SQLite with a recursive CTE (no Python
+    round-trip per row), then build the indexes
+    """
+    table = Transaction.__table__
+    with engine.begin() as conn:
+        conn.execute(CreateTable(table))
+        conn.execute(text(
+            """
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows)
+            INSERT INTO transactions (id, email, amount, reference, status, created_at)
+            SELECT
+                i,
+                'user' || (abs(random()) % :emails) || '@example.com',
+                100 + abs(random()) % 1000000,
+                'PAY_' || i,
+                CASE abs(random()) % 10 WHEN 9 THEN 'pending' WHEN 8 THEN 'failed' WHEN 7 THEN 'failed' ELSE 'success' END,
+                strftime('%Y-%m-%d %H:%M:%S', :start, '+' || (i * :step) || ' seconds') || '.000000'
+            FROM n
+            """
+        ), {"rows": rows, "emails": EMAILS, "start": START.strftime("%Y-%m-%d %H:%M:%S"), "step": STEP_SECONDS})
+    for index in table.indexes:
+        started = time.perf_counter()
+        index.create(engine)
+        print(f"  index {index.name}: {time.perf_counter() - started:.1f}s")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def ensure_archive_table(engine) -> None:
+    """
+    Listing, export and rollup queries also read transactions_archive;
+    an empty one (with its indexes) keeps them valid on generated files
+    """
+    ArchivedTransaction.__table__.create(engine, checkfirst=True)
+
+
+def timed(conn, query, repeat: int = 3):
+    best, rows = float("inf"), []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(query).all()
+        best = min(best, time.perf_counter() - started)
+    return best, rows
+
+
+def offset_query(filters: TransactionFilters, depth: int, limit: int):
+    return (
+        filters.apply(select(*LIST_COLUMNS))
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .offset(depth)
+        .limit(limit)
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Keyset vs OFFSET pagination latency")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--db", default="/tmp/transactions-bench.db", help="SQLite file, reused when it exists")
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--skip-offset", action="store_true", help="Only time keyset pages")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{args.db}")
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, _):
+        dbapi_connection.execute("PRAGMA cache_size = -262144")  # 256 MiB
+
+    if not os.path.exists(args.db) or os.path.getsize(args.db) == 0:
+        print(f"generating {args.rows} rows into {args.db} ...")
+        started = time.perf_counter()
+        generate(engine, args.rows)
+        print(f"  generated in {time.perf_counter() - started:.1f}s")
+    ensure_archive_table(engine)
+
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT max(id) FROM transactions")).scalar()
+        email = conn.execute(text("SELECT email FROM transactions WHERE id = 1")).scalar()
+        middle = START + timedelta(seconds=STEP_SECONDS * total // 2)
+        scenarios = {
+            "all": TransactionFilters(),
+            "status=success": TransactionFilters(status="success"),
+            "status=pending": TransactionFilters(status="pending"),
+            f"email={email}": TransactionFilters(email=email),
+            "older half (to=)": TransactionFilters(created_to=middle),
+        }
+
+        print(f"rows={total} page={args.limit}")
+        for name, filters in scenarios.items():
+            plan = conn.execute(
+                text("EXPLAIN QUERY PLAN " + str(page_query(filters, args.limit, encode_cursor(middle, 1)).compile(
+                    engine, compile_kwargs={"literal_binds": True}
+                )))
+            ).all()
+            print(f"\n{name}: {' | '.join(row[-1] for row in plan)}")
+            print(f"  {'depth':>9} {'keyset ms':>10} {'offset ms':>10}")
+            for depth in DEPTHS:
+                cursor = None
+                if depth:
+                    # Key of the last row of the previous page (untimed)
+                    previous = conn.execute(offset_query(filters, depth - 1, 1)).first()
+                    if previous is None:
+                        break
+                    cursor = encode_cursor(previous.created_at, previous.id)
+                keyset_seconds, keyset_rows = timed(conn, page_query(filters, args.limit, cursor))
+                offset_cell = "-"
+                if not args.skip_offset:
+                    offset_seconds, offset_rows = timed(conn, offset_query(filters, depth, args.limit))
+                    assert [r.id for r in offset_rows] == [r.id for r in keyset_rows], "pages differ"
+                    offset_cell = f"{offset_seconds * 1000:10.2f}"
+                print(f"  {depth:>9} {keyset_seconds * 1000:10.2f} {offset_cell:>10}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
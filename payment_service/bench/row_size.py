@@ -0,0 +1,198 @@
+"""
+Transactions row size and read time: gateway_response blob vs. gateway_events
+
+Builds two SQLite databases with the same synthetic transactions:
+- legacy: the full verify response stored as str(dict) in
+  transactions.gateway_response (the previous layout)
+- current: extracted fields on transactions, payload compressed in
+  gateway_events
+
+and reports the transactions table size, average row bytes, the time of a
+status scan (the pending sweep reads every page of the table), whole-row
+lookups by reference and a full SELECT *.
+
+Usage:
+    python -m payment_service.bench.row_size [--rows 50000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, create_engine, func, insert, text
+
+from payment_service.app.models import GatewayEvent, Transaction, utcnow
+from payment_service.app.services.gateway_events import event_row, extract_fields
+
+
+def verify_response(i: int) -> dict:
+    reference = f"PAY_{1700000000 + i}_{i:08x}"
+    return {
+        "status": True,
+        "message": "Verification successful",
+        "data": {
+            "id": 3000000 + i,
+            "domain": "test",
+            "status": "success",
+            "reference": reference,
+            "amount": 500000,
+            "message": None,
+            "gateway_response": "Successful",
+            "paid_at": "2024-05-01T10:00:00.000Z",
+            "created_at": "2024-05-01T09:59:30.000Z",
+            "channel": "card",
+            "currency": "NGN",
+            "ip_address": "102.89.0.1",
+            "metadata": {"custom_fields": []},
+            "fees": 7500,
+            "authorization": {
+                "authorization_code": f"AUTH_{i:010d}",
+                "bin": "408408",
+                "last4": "4081",
+                "exp_month": "12",
+                "exp_year": "2030",
+                "channel": "card",
+                "card_type": "visa",
+                "bank": "TEST BANK",
+                "country_code": "NG",
+                "brand": "visa",
+                "reusable": True,
+                "signature": f"SIG_{i:016d}",
+            },
+            "customer": {"id": 100 + i, "email": f"customer{i}@example.com", "customer_code": f"CUS_{i:012d}"},
+        },
+    }
+
+
+def legacy_table(metadata: MetaData) -> Table:
+    return Table(
+        "transactions", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("email", String(255), nullable=False, index=True),
+        Column("amount", Integer, nullable=False),
+        Column("reference", String(255), unique=True, nullable=False, index=True),
+        Column("status", String(50), nullable=False),
+        Column("paystack_reference", String(255), index=True),
+        Column("gateway_response", Text),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+
+
+def table_bytes(engine, table: str) -> int:
+    with engine.connect() as conn:
+        page_size = conn.execute(text("PRAGMA page_size")).scalar()
+        try:
+            # dbstat is compiled into most SQLite builds
+            return conn.execute(text("SELECT sum(pgsize) FROM dbstat WHERE name = :name"), {"name": table}).scalar()
+        except Exception:
+            return page_size * conn.execute(text("PRAGMA page_count")).scalar()
+
+
+def best_of(engine, sql: str, repeat: int = 3) -> float:
+    """
+    Best-of-N time to run sql and fetch every result row through the driver
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            for _row in conn.exec_driver_sql(sql):
+                pass
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def lookups(engine, references, repeat: int = 3) -> float:
+    """
+    Best-of-N time for whole-row lookups by reference (the status pages)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            for reference in references:
+                conn.exec_driver_sql("SELECT * FROM transactions WHERE reference = ?", (reference,)).fetchone()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def build_legacy(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    table = legacy_table(metadata)
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(table), [
+            {
+                "email": f"customer{i}@example.com",
+                "amount": 500000,
+                "reference": response["data"]["reference"],
+                "status": "success",
+                "paystack_reference": response["data"]["reference"],
+                "gateway_response": str(response),
+            }
+            for i, response in ((i, verify_response(i)) for i in range(rows))
+        ])
+    return engine, table
+
+
+def build_current(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Transaction.__table__.create(engine)
+    GatewayEvent.__table__.create(engine)
+    transactions, events = [], []
+    for i in range(rows):
+        response = verify_response(i)
+        data = response["data"]
+        transactions.append({
+            "email": f"customer{i}@example.com",
+            "amount": 500000,
+            "reference": data["reference"],
+            "status": "success",
+            "paystack_reference": data["reference"],
+            "created_at": utcnow(),
+            **extract_fields(data),
+        })
+        events.append(event_row(data["reference"], "verify", response, data["status"]))
+    with engine.begin() as conn:
+        conn.execute(insert(Transaction.__table__), transactions)
+        conn.execute(insert(GatewayEvent.__table__), events)
+    return engine, Transaction.__table__
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare transactions row size and read time")
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    references = [verify_response(i)["data"]["reference"] for i in random.sample(range(args.rows), min(args.rows, 5000))]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, build in (("legacy", build_legacy), ("current", build_current)):
+            engine, _ = build(os.path.join(tmp, f"{name}.db"), args.rows)
+            size = table_bytes(engine, "transactions")
+            results[name] = {
+                "size": size,
+                "scan": best_of(engine, "SELECT count(*) FROM transactions WHERE status = 'pending'"),
+                "lookup": lookups(engine, references),
+                "full": best_of(engine, "SELECT * FROM transactions"),
+                "events": table_bytes(engine, "gateway_events") if name == "current" else None,
+            }
+            engine.dispose()
+
+    print(f"rows={args.rows} lookups={len(references)}")
+    for name, r in results.items():
+        line = (
+            f"{name:<8} transactions={r['size'] / 1024 / 1024:7.2f} MiB  avg_row={r['size'] / args.rows:7.1f} B  "
+            f"status_scan={r['scan'] * 1000:7.1f} ms  lookups={r['lookup'] * 1000:7.1f} ms  "
+            f"select_all={r['full'] * 1000:7.1f} ms"
+        )
+        if r["events"] is not None:
+            line += f"  (gateway_events={r['events'] / 1024 / 1024:.2f} MiB)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+SQLite write throughput: per-request commits vs. WAL vs. group commit
+
+Concurrent clients each repeatedly do what /payments/initiate does to the
+database (insert a pending transaction and bump its daily rollup), against
+a fresh database file per mode:
+
+- legacy: default rollback journal, synchronous=FULL, one commit per write
+  (the engine before the SQLite pragmas)
+- wal: sqlite_pragmas() (WAL, synchronous=NORMAL, busy_timeout, mmap),
+  one commit per write
+- group: sqlite_pragmas() plus GroupCommitWriter
+
+and reports writes/s, latency percentiles and failed writes.
+
+Usage:
+    python -m payment_service.bench.sqlite_writes [--clients 50] [--writes 5000] [--dir .]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from payment_service.app.db import Base, apply_sqlite_pragmas
+from payment_service.app.group_commit import GroupCommitWriter
+from payment_service.app.models import Transaction, utcnow
+from payment_service.app.services.references import ReferenceGenerator
+from payment_service.app.services.rollups import RollupDeltas
+
+MODES = ("legacy", "wal", "group")
+
+
+def make_operation(reference: str):
+    async def operation(db: AsyncSession) -> None:
+        # Same shape as create_transaction in routes/payments.py
+        transaction = Transaction(
+            email="bench@example.com", amount=5000, reference=reference, status="pending", created_at=utcnow()
+        )
+        db.add(transaction)
+        deltas = RollupDeltas()
+        deltas.add(transaction.created_at, "pending", 5000)
+        await deltas.apply(db)
+    return operation
+
+
+async def run_mode(mode: str, path: str, clients: int, writes: int) -> dict:
+    url = f"sqlite+aiosqlite:///{path}"
+    setup = create_engine(f"sqlite:///{path}")
+    if mode != "legacy":
+        apply_sqlite_pragmas(setup)
+    Base.metadata.create_all(setup)
+    setup.dispose()
+
+    engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=5, max_overflow=10)
+    if mode != "legacy":
+        apply_sqlite_pragmas(engine.sync_engine)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    writer = GroupCommitWriter(session_factory, enabled=mode == "group")
+    writer.start()
+
+    generator = ReferenceGenerator(node_id=0)
+    latencies = []
+    errors = 0
+    remaining = writes
+
+    async def client():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                await writer.submit(make_operation(generator.generate()))
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    await writer.stop()
+    await engine.dispose()
+
+    latencies.sort()
+    return {
+        "writes_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="SQLite write throughput by commit mode")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--dir", default=".", help="Where to create the database files (use a real disk, not tmpfs)")
+    args = parser.parse_args(argv)
+
+    print(f"{args.clients} clients, {args.writes} writes per mode")
+    print(f"{'mode':>8} {'writes/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode in MODES:
+        with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+            result = asyncio.run(run_mode(mode, os.path.join(directory, "writes.db"), args.clients, args.writes))
+        print(
+            f"{mode:>8} {result['writes_per_second']:>10,.0f} {result['p50_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cold start: import-time profile and time to first request
+
+- import profile: runs `python -X importtime -c "import payment_service.app.main"`
+  in a fresh interpreter and lists the slowest modules (cumulative and
+  self time) plus the total
+- time to first request: starts uvicorn and polls until GET / (the
+  payment form, so templates are rendered) answers 200, timed from process
+  spawn as Render sees it; once against an empty SQLite file (first
+  deploy) and then repeatedly against the same, already set up file
+  (restarts and scale-ups, the common case)
+
+Usage:
+    python -m payment_service.bench.startup [--runs 5] [--top 15]
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP = "payment_service.app.main"
+
+
+def _env(database_path: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{database_path}"
+    env.setdefault("PYTHONPATH", os.getcwd())
+    return env
+
+
+def import_profile(top: int):
+    """
+    Returns:
+        (total seconds, [(cumulative seconds, self seconds, module)] slowest first)
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {APP}"],
+            env=_env(os.path.join(directory, "profile.db")),
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:"):].split("|")
+            rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, module.rstrip()))
+        except ValueError:
+            continue
+    total = next((row[0] for row in rows if row[2].strip() == APP), 0.0)
+    return total, sorted(rows, reverse=True)[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(database_path: str, timeout: float = 60.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{APP}:app", "--port", str(port), "--log-level", "warning"],
+        env=_env(database_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        # http.client rather than httpx: a new httpx client per poll builds
+        # an SSL context, which steals enough CPU to skew the measurement
+        while time.perf_counter() - started < timeout:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5.0)
+            try:
+                connection.request("GET", "/")
+                if connection.getresponse().status == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            time.sleep(0.005)
+        raise RuntimeError("server did not answer in time")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Import profile and time to first request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    total, rows = import_profile(args.top)
+    print(f"import {APP}: {total * 1000:.0f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative, self_time, module in rows:
+        print(f"{cumulative * 1000:>14.1f} {self_time * 1000:>8.1f}  {module}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "ttfr.db")
+        first = time_to_first_request(database_path)
+        timings = [time_to_first_request(database_path) for _ in range(args.runs)]
+    print(f"time to first request, empty database: {first * 1000:.0f} ms")
+    print(
+        f"time to first request, restart ({args.runs} runs): median {statistics.median(timings) * 1000:.0f} ms, "
+        f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
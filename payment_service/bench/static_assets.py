@@ -0,0 +1,157 @@
+"""
+Checkout page weight and home page latency: per-request rendering vs.
+precompressed, cache-friendly serving
+
+Two in-process apps serve the payment form and its stylesheet:
+- legacy: index.html rendered by Jinja on every request, styles.css from
+  StaticFiles (uncompressed, revalidated by ETag on every page view)
+- current: index.html rendered once and styles.css hashed, both held
+  gzip/brotli-compressed in memory (see assets.py, templating.static_page)
+
+and reports, for a browser that accepts "gzip, deflate, br":
+- bytes on the wire (headers and body) for a first visit (page and
+  stylesheet) and a repeat visit with a warm browser cache (conditional
+  page request, and the stylesheet only when it is not immutable)
+- GET / latency and requests/s through the ASGI app (server side only)
+
+Usage:
+    python -m payment_service.bench.static_assets [--requests 5000]
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+
+from payment_service.app.assets import STATIC_DIR, StaticAssets
+from payment_service.app.templating import TEMPLATES_DIR, static_page
+
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+def legacy_app() -> FastAPI:
+    app = FastAPI()
+    templates = Jinja2Templates(directory=TEMPLATES_DIR)
+    # The previous templates linked url_for('static', path='/styles.css')
+    templates.env.globals["asset_url"] = lambda path: app.url_path_for("static", path="/" + path)
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+    @app.get("/")
+    async def home(request: Request):
+        return templates.TemplateResponse("index.html", {"request": request})
+
+    return app
+
+
+def current_app() -> FastAPI:
+    app = FastAPI()
+    app.mount("/static", StaticAssets(), name="static")
+
+    @app.get("/")
+    async def home(request: Request):
+        return static_page("index.html").response(request.headers)
+
+    return app
+
+
+def _wire_bytes(response: httpx.Response) -> int:
+    headers = sum(len(name) + len(value) + 4 for name, value in response.headers.raw)
+    return headers + response.num_bytes_downloaded
+
+
+async def checkout_bytes(client: httpx.AsyncClient):
+    """
+    Returns:
+        (first visit bytes, repeat visit bytes, requests on repeat visit)
+    """
+    page = await client.get("/", headers={"accept-encoding": ACCEPT_ENCODING})
+    stylesheet_url = re.search(r'rel="stylesheet" href="([^"]+)"', page.text).group(1)
+    stylesheet = await client.get(stylesheet_url, headers={"accept-encoding": ACCEPT_ENCODING})
+    first = _wire_bytes(page) + _wire_bytes(stylesheet)
+
+    # Warm cache: revalidate the page, and the stylesheet unless it is immutable
+    repeat_page = await client.get(
+        "/", headers={"accept-encoding": ACCEPT_ENCODING, "if-none-match": page.headers.get("etag", "")}
+    )
+    repeat = _wire_bytes(repeat_page)
+    requests = 1
+    if "immutable" not in stylesheet.headers.get("cache-control", ""):
+        repeat_stylesheet = await client.get(
+            stylesheet_url,
+            headers={"accept-encoding": ACCEPT_ENCODING, "if-none-match": stylesheet.headers.get("etag", "")}
+        )
+        repeat += _wire_bytes(repeat_stylesheet)
+        requests += 1
+    return first, repeat, requests
+
+
+async def home_latency(app: FastAPI, requests: int):
+    """
+    GET / straight through the ASGI app, so the client's own overhead is
+    not measured
+
+    Returns:
+        (requests/s, p50 seconds, p99 seconds)
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept-encoding", ACCEPT_ENCODING.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"GET / answered {message['status']}")
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        timings.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return requests / elapsed, statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+async def run(requests: int) -> None:
+    print(f"{'app':>8} {'first visit B':>14} {'repeat visit B':>15} {'repeat reqs':>12} {'GET / req/s':>12} {'p50 us':>8} {'p99 us':>8}")
+    for name, factory in (("legacy", legacy_app), ("current", current_app)):
+        app = factory()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            first, repeat, repeat_requests = await checkout_bytes(client)
+        # Warm up, then measure
+        await home_latency(app, min(requests, 200))
+        rate, p50, p99 = await home_latency(app, requests)
+        print(
+            f"{name:>8} {first:>14,} {repeat:>15,} {repeat_requests:>12} {rate:>12,.0f} "
+            f"{p50 * 1e6:>8.0f} {p99 * 1e6:>8.0f}"
+        )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Checkout page weight and home page latency")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+/stats from rollups vs. aggregating the transactions table
+
+Uses the synthetic table from bench/pagination.py (generated when
+missing), builds transaction_rollups from it once, then times the
+per-day/status totals for growing date ranges both ways.
+
+Usage:
+    python -m payment_service.bench.stats [--rows 10000000] [--db /tmp/transactions-bench.db]
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+
+from payment_service.app.models import TransactionRollup
+from payment_service.app.services.rollups import _aggregate
+from payment_service.bench.pagination import ensure_archive_table, generate
+
+
+def best_of(conn, query, repeat: int = 3):
+    best, rows = float("inf"), []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(query).all()
+        best = min(best, time.perf_counter() - started)
+    return best, rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Rollup vs raw aggregate latency")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--db", default="/tmp/transactions-bench.db", help="SQLite file, reused when it exists")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    if not os.path.exists(args.db) or os.path.getsize(args.db) == 0:
+        print(f"generating {args.rows} rows into {args.db} ...")
+        generate(engine, args.rows)
+    ensure_archive_table(engine)
+
+    table = TransactionRollup.__table__
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        conn.execute(insert(table).from_select(
+            [table.c.day, table.c.status, table.c["count"], table.c.sum_amount],
+            _aggregate("sqlite", None, None)
+        ))
+        print(f"rollups built in {time.perf_counter() - started:.1f}s")
+
+    with engine.connect() as conn:
+        last_day = conn.execute(select(func.max(table.c.day))).scalar()
+        print(f"{'days':>6} {'raw ms':>10} {'rollup ms':>10}")
+        for days in (1, 7, 30, 90, 365):
+            start = last_day - timedelta(days=days - 1)
+            raw_seconds, raw_rows = best_of(conn, _aggregate("sqlite", start, last_day))
+            rollup_seconds, rollup_rows = best_of(
+                conn,
+                select(table).where(table.c.day >= start).where(table.c.day <= last_day).order_by(table.c.day, table.c.status)
+            )
+            assert sum(row[2] for row in raw_rows) == sum(row[2] for row in rollup_rows), "totals differ"
+            print(f"{days:>6} {raw_seconds * 1000:>10.2f} {rollup_seconds * 1000:>10.2f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark of the webhook verify+parse path
+
+Compares, per request:
+- the old path (stdlib json.loads on every body, no signature check)
+- HMAC-SHA512 verification with a freshly keyed hmac vs. the prepared
+  WebhookSignatureVerifier, followed by json or orjson parsing
+- rejection of a forged request (verification only, nothing parsed)
+
+Usage:
+    python -m payment_service.bench.webhook_verify [--size 4096] [--number 20000]
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import timeit
+
+from payment_service.app import jsonutil
+from payment_service.app.services.signature import WebhookSignatureVerifier
+
+SECRET = "sk_test_benchmark_secret_key_0123456789"
+
+
+def build_body(size: int) -> bytes:
+    data = {
+        "id": 302961,
+        "reference": "PAY_1700000000_abcdef12",
+        "status": "success",
+        "amount": 500000,
+        "channel": "card",
+        "customer": {"email": "customer@example.com"},
+        "metadata": {"padding": ""},
+    }
+    body = json.dumps({"event": "charge.success", "data": data})
+    data["metadata"]["padding"] = "x" * max(0, size - len(body))
+    return json.dumps({"event": "charge.success", "data": data}).encode()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=2048, help="Approximate webhook body size in bytes")
+    parser.add_argument("--number", type=int, default=20000, help="Iterations per case")
+    args = parser.parse_args(argv)
+
+    body = build_body(args.size)
+    verifier = WebhookSignatureVerifier(SECRET)
+    signature = verifier.sign(body)
+    forged = "0" * len(signature)
+    key = SECRET.encode()
+
+    def fresh_hmac_verify() -> bool:
+        digest = hmac.new(key, body, hashlib.sha512).hexdigest()
+        return hmac.compare_digest(digest, signature)
+
+    cases = {
+        "baseline: json.loads only (no verification)": lambda: json.loads(body.decode("utf-8")),
+        "verify (fresh hmac) + json.loads": lambda: fresh_hmac_verify() and json.loads(body),
+        "verify (prepared key) + json.loads": lambda: verifier.verify(body, signature) and json.loads(body),
+        "verify (prepared key) + jsonutil.loads": lambda: verifier.verify(body, signature) and jsonutil.loads(body),
+        "reject forged (prepared key)": lambda: verifier.verify(body, forged),
+    }
+
+    print(f"body={len(body)} bytes, orjson={'yes' if jsonutil.orjson else 'no'}, n={args.number}")
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        print(f"{name:<45} {best * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Initial schema: transactions, webhook inbox, gateway events, daily rollups
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("reference", sa.String(255), nullable=False),
+        sa.Column("status", sa.String(50), nullable=False),
+        sa.Column("paystack_reference", sa.String(255), nullable=True),
+        sa.Column("gateway_status", sa.String(50), nullable=True),
+        sa.Column("channel", sa.String(50), nullable=True),
+        sa.Column("fees", sa.Integer(), nullable=True),
+        sa.Column("paid_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_transactions_id", "transactions", ["id"])
+    op.create_index("ix_transactions_reference", "transactions", ["reference"], unique=True)
+    op.create_index("ix_transactions_paystack_reference", "transactions", ["paystack_reference"])
+    op.create_index("ix_transactions_created_at_id", "transactions", ["created_at", "id"])
+    op.create_index("ix_transactions_status_created_at_id", "transactions", ["status", "created_at", "id"])
+    op.create_index("ix_transactions_email_created_at_id", "transactions", ["email", "created_at", "id"])
+
+    op.create_table(
+        "webhook_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("event_key", sa.String(255), nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=True),
+        sa.Column("reference", sa.String(255), nullable=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("claim_token", sa.String(32), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("event_key"),
+    )
+    op.create_index("ix_webhook_events_reference", "webhook_events", ["reference"])
+    op.create_index("ix_webhook_events_claim_token", "webhook_events", ["claim_token"])
+    op.create_index("ix_webhook_events_status_id", "webhook_events", ["status", "id"])
+
+    op.create_table(
+        "gateway_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("reference", sa.String(255), nullable=False),
+        sa.Column("source", sa.String(20), nullable=False),
+        sa.Column("gateway_status", sa.String(50), nullable=True),
+        # models.CompressedJSON: JSONB on PostgreSQL, zlib-compressed JSON elsewhere
+        sa.Column("payload", sa.LargeBinary().with_variant(postgresql.JSONB(), "postgresql"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_gateway_events_reference", "gateway_events", ["reference"])
+
+    op.create_table(
+        "transaction_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("status", sa.String(50), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("sum_amount", sa.BigInteger(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("transaction_rollups")
+    op.drop_index("ix_gateway_events_reference", table_name="gateway_events")
+    op.drop_table("gateway_events")
+    op.drop_index("ix_webhook_events_status_id", table_name="webhook_events")
+    op.drop_index("ix_webhook_events_claim_token", table_name="webhook_events")
+    op.drop_index("ix_webhook_events_reference", table_name="webhook_events")
+    op.drop_table("webhook_events")
+    op.drop_index("ix_transactions_email_created_at_id", table_name="transactions")
+    op.drop_index("ix_transactions_status_created_at_id", table_name="transactions")
+    op.drop_index("ix_transactions_created_at_id", table_name="transactions")
+    op.drop_index("ix_transactions_paystack_reference", table_name="transactions")
+    op.drop_index("ix_transactions_reference", table_name="transactions")
+    op.drop_index("ix_transactions_id", table_name="transactions")
+    op.drop_table("transactions")
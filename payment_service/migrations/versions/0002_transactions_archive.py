@@ -0,0 +1,63 @@
+"""Archive table for settled transactions, monthly partitions on PostgreSQL
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # Partitions (transactions_archive_YYYY_MM) are created by the archival job
+        op.execute(
+            """
+            CREATE TABLE transactions_archive (
+                id INTEGER NOT NULL,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                amount INTEGER NOT NULL,
+                reference VARCHAR(255) NOT NULL,
+                status VARCHAR(50) NOT NULL,
+                paystack_reference VARCHAR(255),
+                gateway_status VARCHAR(50),
+                channel VARCHAR(50),
+                fees INTEGER,
+                paid_at TIMESTAMP WITH TIME ZONE,
+                updated_at TIMESTAMP WITH TIME ZONE,
+                archived_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+            """
+        )
+    else:
+        op.create_table(
+            "transactions_archive",
+            sa.Column("id", sa.Integer(), nullable=False, autoincrement=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("amount", sa.Integer(), nullable=False),
+            sa.Column("reference", sa.String(255), nullable=False),
+            sa.Column("status", sa.String(50), nullable=False),
+            sa.Column("paystack_reference", sa.String(255), nullable=True),
+            sa.Column("gateway_status", sa.String(50), nullable=True),
+            sa.Column("channel", sa.String(50), nullable=True),
+            sa.Column("fees", sa.Integer(), nullable=True),
+            sa.Column("paid_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+            sa.PrimaryKeyConstraint("id", "created_at"),
+        )
+    op.create_index("ix_transactions_archive_reference", "transactions_archive", ["reference"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_archive_reference", table_name="transactions_archive")
+    # Drops the PostgreSQL partitions with it
+    op.drop_table("transactions_archive")
@@ -0,0 +1,30 @@
+"""Keyset indexes on transactions_archive for listing and export
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# Same shape as the transactions indexes; on PostgreSQL each is created on
+# every partition, present and future
+INDEXES = {
+    "ix_transactions_archive_created_at_id": ["created_at", "id"],
+    "ix_transactions_archive_status_created_at_id": ["status", "created_at", "id"],
+    "ix_transactions_archive_email_created_at_id": ["email", "created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, "transactions_archive", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="transactions_archive")
@@ -0,0 +1,27 @@
+"""Leases on transaction reference node ids
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reference_nodes",
+        sa.Column("node_id", sa.Integer(), nullable=False, autoincrement=False),
+        sa.Column("owner", sa.String(255), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("node_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reference_nodes")
@@ -0,0 +1,44 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from payment_service.app.config import settings
+
+BATCH = {"payments": [{"email": "a@example.com", "amount": 500000}]}
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}])
+def test_batch_requires_admin_token(monkeypatch, headers):
+    from payment_service.app.main import app
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+    response = TestClient(app).post("/payments/batch", json=BATCH, headers=headers)
+    assert response.status_code == 401
+
+
+def test_batch_closed_without_configured_token(monkeypatch):
+    from payment_service.app.main import app
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "")
+    response = TestClient(app).post("/payments/batch", json=BATCH, headers={"Authorization": "Bearer anything"})
+    assert response.status_code == 503
+
+
+def test_batch_ignores_client_callback_url(monkeypatch):
+    from payment_service.app.main import app
+    from payment_service.app.routes import payments
+
+    calls = []
+
+    async def initiate(items, callback_url):
+        calls.append(callback_url)
+        return {"results": []}
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+    monkeypatch.setattr(payments.batch_initiator, "initiate", initiate)
+    response = TestClient(app).post(
+        "/payments/batch",
+        json={**BATCH, "callback_url": "https://attacker.example/paid"},
+        headers={"Authorization": "Bearer s3cret"}
+    )
+    assert response.status_code == 200
+    assert calls == ["http://testserver/payments/success"]
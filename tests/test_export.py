@@ -0,0 +1,101 @@
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+
+from payment_service.app.config import settings
+from payment_service.app.models import Transaction
+from payment_service.app.services.export import FIELDS, TransactionExport
+from payment_service.app.services.transaction_query import TransactionFilters
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+BATCH_SIZE = 500
+# Peak traced heap allowed for an export of any size. Holding the 40k-row
+# export in memory would take several times this.
+PEAK_BOUND = 2 * 1024 * 1024
+
+
+def populate(db_path, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        for offset in range(0, rows, 10_000):
+            conn.execute(insert(Transaction.__table__), [
+                {
+                    "email": f"customer{i % 100}@example.com",
+                    "amount": 5000 + i,
+                    "reference": f"PAY_TEST_{i:08d}",
+                    "status": "success",
+                    "channel": "card",
+                    "created_at": START + timedelta(seconds=i),
+                }
+                for i in range(offset, min(rows, offset + 10_000))
+            ])
+    engine.dispose()
+
+
+async def export_peak(session_factory, rows: int, format: str, compress: bool):
+    """
+    Stream the first `rows` transactions, keeping only the chunk sizes
+
+    Returns:
+        (export, peak traced bytes while streaming)
+    """
+    filters = TransactionFilters(created_to=START + timedelta(seconds=rows))
+    export = TransactionExport(
+        filters, format=format, compress=compress, batch_size=BATCH_SIZE, session_factory=session_factory
+    )
+    total = 0
+    tracemalloc.start()
+    try:
+        async for chunk in export.chunks():
+            total += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert total == export.bytes
+    return export, peak
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("format,compress", [("csv", False), ("ndjson", True)])
+async def test_export_memory_does_not_grow_with_rows(db_path, session_factory, format, compress):
+    populate(db_path, 40_000)
+
+    peaks = {}
+    for rows in (2_000, 40_000):
+        export, peak = await export_peak(session_factory, rows, format, compress)
+        assert export.rows == rows
+        assert peak < PEAK_BOUND, f"{rows} rows peaked at {peak} bytes"
+        peaks[rows] = peak
+    # 20x the rows, about the same peak
+    assert peaks[40_000] < peaks[2_000] * 2
+
+
+@pytest.mark.asyncio
+async def test_export_csv_content(db_path, session_factory):
+    populate(db_path, 3)
+    export = TransactionExport(TransactionFilters(), session_factory=session_factory)
+    body = b"".join([chunk async for chunk in export.chunks()]).decode()
+    lines = body.splitlines()
+    assert lines[0] == ",".join(FIELDS)
+    assert len(lines) == 4
+    assert lines[3].split(",")[1] == "PAY_TEST_00000002"
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}])
+def test_export_requires_admin_token(monkeypatch, headers):
+    from payment_service.app.main import app
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+    response = TestClient(app).get("/transactions/export", headers=headers)
+    assert response.status_code == 401
+
+
+def test_export_closed_without_configured_token(monkeypatch):
+    from payment_service.app.main import app
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "")
+    response = TestClient(app).get("/transactions/export", headers={"Authorization": "Bearer anything"})
+    assert response.status_code == 503
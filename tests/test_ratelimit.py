@@ -0,0 +1,25 @@
+import pytest
+
+from payment_service.app.ratelimit import RouteLimit, parse_rate
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("30/60", (30, 60.0)),
+    (" 5/0.5 ", (5, 0.5)),
+    ("10", (10, 1.0)),
+    ("", None),
+    ("0", None),
+])
+def test_parse_rate(value, expected):
+    assert parse_rate(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0/60", "-1/60", "30/0", "30/-5", "30/nan", "30/inf", "abc", "30/x", "1.5/60"])
+def test_parse_rate_rejects_invalid_rates(value):
+    with pytest.raises(ValueError, match="RATE_LIMIT_TEST"):
+        parse_rate(value, "RATE_LIMIT_TEST")
+
+
+def test_route_limit_names_the_setting():
+    with pytest.raises(ValueError, match="RATE_LIMIT_INITIATE_EMAIL"):
+        RouteLimit("initiate", per_ip="30/60", per_email="0/60")
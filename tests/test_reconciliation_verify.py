@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+from payment_service.app.config import settings
+from payment_service.app.services.paystack_service import PaystackService
+from payment_service.app.services.reconciliation import ReconciliationReport, ReconciliationService
+from payment_service.app.services.resilience import CircuitBreaker, TokenBucket
+
+
+def paystack(responses: list) -> tuple:
+    """
+    PaystackService whose verify calls get responses in order
+
+    Returns:
+        (service, list of requested paths)
+    """
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return responses[min(len(requests), len(responses)) - 1]
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://paystack.test")
+    service = PaystackService(client=client, limiter=TokenBucket(rate=0), breaker=CircuitBreaker(failure_threshold=0))
+    return service, requests
+
+
+SUCCESS = httpx.Response(200, json={"status": True, "data": {"reference": "REF_1", "status": "success"}})
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "RECONCILE_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(settings, "PAYSTACK_RETRY_BACKOFF_BASE", 0.001)
+
+
+async def verify(service: PaystackService, max_retries: int) -> tuple:
+    reconciliation = ReconciliationService(paystack_service=service, max_retries=max_retries, checkpoint_path=None)
+    report = ReconciliationReport()
+    result = await reconciliation._verify("REF_1", asyncio.Semaphore(1), report)
+    return result, report
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_verify_is_retried_once_per_attempt():
+    service, requests = paystack([httpx.Response(429, headers={"Retry-After": "0"}), SUCCESS])
+
+    result, report = await verify(service, max_retries=3)
+
+    assert result is not None
+    assert len(requests) == 2
+    assert report.api_calls == 2
+    assert report.rate_limited == 1
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_not_retried_twice_over(monkeypatch):
+    monkeypatch.setattr(settings, "PAYSTACK_VERIFY_RETRIES", 2)
+    service, requests = paystack([httpx.Response(503)])
+
+    result, report = await verify(service, max_retries=1)
+
+    # One retry in reconciliation, none inside verify_transaction
+    assert result is None
+    assert len(requests) == 2
+    assert report.api_calls == 2
+    assert report.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    service, requests = paystack([httpx.Response(404, json={"status": False})])
+
+    result, report = await verify(service, max_retries=3)
+
+    assert result is None
+    assert len(requests) == 1
+    assert report.errors == 1
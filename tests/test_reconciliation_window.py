@@ -0,0 +1,164 @@
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+from payment_service.app.models import GatewayEvent, Transaction
+from payment_service.app.services.paystack_service import PaystackService
+from payment_service.app.services.reconciliation import ReconciliationService
+from payment_service.app.services.resilience import CircuitBreaker, TokenBucket
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+END = datetime(2024, 5, 2, tzinfo=timezone.utc)
+
+
+class FakePaystack:
+    """
+    GET /transaction over a fixed record list, paginated like Paystack
+    (page, perPage; meta.pageCount). Pages listed in throttle answer 429
+    once each.
+    """
+
+    def __init__(self, records, throttle=(), page_count=None):
+        self.records = records
+        self.throttle = set(throttle)
+        self.page_count = page_count
+        self.pages = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/transaction"
+        page = int(request.url.params["page"])
+        per_page = int(request.url.params["perPage"])
+        self.pages.append(page)
+        if page in self.throttle:
+            self.throttle.discard(page)
+            return httpx.Response(429, headers={"Retry-After": "0"}, json={"status": False})
+
+        data = self.records[(page - 1) * per_page:page * per_page]
+        page_count = self.page_count or -(-len(self.records) // per_page)
+        return httpx.Response(200, json={
+            "status": True,
+            "data": data,
+            "meta": {"page": page, "perPage": per_page, "pageCount": page_count, "total": len(self.records)},
+        })
+
+    def service(self) -> PaystackService:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler), base_url="https://paystack.test")
+        return PaystackService(
+            client=client,
+            limiter=TokenBucket(rate=0),
+            breaker=CircuitBreaker(failure_threshold=0)
+        )
+
+
+def remote(reference: str, status: str) -> dict:
+    return {"reference": reference, "status": status, "channel": "card", "fees": 150, "amount": 500000}
+
+
+async def collect(service: PaystackService, per_page: int, start_page: int = 1) -> list:
+    return [
+        page async for page in service.iter_transaction_pages(START, END, per_page=per_page, start_page=start_page)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pages_stop_at_page_count():
+    paystack = FakePaystack([remote(f"REF_{i}", "success") for i in range(5)])
+
+    pages = await collect(paystack.service(), per_page=2)
+
+    assert paystack.pages == [1, 2, 3]
+    assert [len(page["data"]) for page in pages] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_pages_stop_on_empty_page():
+    # meta claims more pages than there is data for
+    paystack = FakePaystack([remote(f"REF_{i}", "success") for i in range(4)], page_count=10)
+
+    pages = await collect(paystack.service(), per_page=2)
+
+    assert paystack.pages == [1, 2, 3]
+    assert pages[-1]["data"] == []
+
+
+@pytest.mark.asyncio
+async def test_pages_resume_from_start_page():
+    paystack = FakePaystack([remote(f"REF_{i}", "success") for i in range(5)])
+
+    pages = await collect(paystack.service(), per_page=2, start_page=2)
+
+    assert paystack.pages == [2, 3]
+    assert [record["reference"] for page in pages for record in page["data"]] == ["REF_2", "REF_3", "REF_4"]
+
+
+def insert_transactions(db_path, rows) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        conn.execute(insert(Transaction.__table__), [
+            {"email": "customer@example.com", "amount": 500000, "reference": reference, "status": status,
+             "created_at": START}
+            for reference, status in rows
+        ])
+    engine.dispose()
+
+
+async def statuses(session_factory) -> dict:
+    async with session_factory() as db:
+        result = await db.execute(select(Transaction.reference, Transaction.status))
+        return dict(result.all())
+
+
+@pytest.mark.asyncio
+async def test_run_window_retries_page_after_429(db_path, session_factory):
+    insert_transactions(db_path, [(f"REF_{i}", "pending") for i in range(5)])
+    paystack = FakePaystack([remote(f"REF_{i}", "success") for i in range(5)], throttle=[2])
+    service = ReconciliationService(session_factory=session_factory, paystack_service=paystack.service())
+
+    report = await service.run_window(START, END, per_page=2)
+
+    # Page 2 is asked for again, and paging resumes there rather than at 1
+    assert paystack.pages == [1, 2, 2, 3]
+    assert report.rate_limited == 1
+    assert report.errors == 0
+    assert report.settled["success"] == 5
+    assert set((await statuses(session_factory)).values()) == {"success"}
+
+
+@pytest.mark.asyncio
+async def test_run_window_settles_only_local_pending_rows(db_path, session_factory):
+    insert_transactions(db_path, [
+        ("PAID", "pending"),
+        ("DECLINED", "pending"),
+        ("ALREADY_PAID", "success"),
+        ("ABANDONED", "pending"),
+    ])
+    paystack = FakePaystack([
+        remote("PAID", "success"),
+        remote("DECLINED", "failed"),
+        # Settled locally already: a stale remote status must not overwrite it
+        remote("ALREADY_PAID", "failed"),
+        # Not a settled status: left pending
+        remote("ABANDONED", "abandoned"),
+        # Not in the local database
+        remote("ELSEWHERE", "success"),
+    ])
+    service = ReconciliationService(session_factory=session_factory, paystack_service=paystack.service())
+
+    report = await service.run_window(START, END, per_page=2)
+
+    assert await statuses(session_factory) == {
+        "PAID": "success",
+        "DECLINED": "failed",
+        "ALREADY_PAID": "success",
+        "ABANDONED": "pending",
+    }
+    assert report.remote_records == 5
+    assert report.rows_scanned == 3
+    assert report.settled == {"success": 1, "failed": 1}
+    assert report.unresolved == 1
+
+    async with session_factory() as db:
+        events = (await db.execute(select(GatewayEvent.reference, GatewayEvent.source))).all()
+    assert sorted(events) == [("DECLINED", "reconcile"), ("PAID", "reconcile")]
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import insert, select, update
+
+from payment_service.app.models import ReferenceNode, utcnow
+from payment_service.app.services.references import MAX_NODE, NodeLease, ReferenceGenerator, decode
+
+
+def node_of(reference: str) -> int:
+    return (decode(reference) >> 20) & MAX_NODE
+
+
+def test_generator_without_node_id_refuses():
+    generator = ReferenceGenerator(None)
+
+    with pytest.raises(RuntimeError):
+        generator.generate()
+
+    generator.assign(7)
+    assert node_of(generator.generate()) == 7
+
+
+@pytest.mark.asyncio
+async def test_processes_lease_distinct_node_ids(session_factory):
+    leases = [NodeLease(ReferenceGenerator(None), session_factory) for _ in range(3)]
+    try:
+        for lease in leases:
+            await lease.acquire()
+
+        assert [lease.node_id for lease in leases] == [0, 1, 2]
+        assert [node_of(lease.generator.generate()) for lease in leases] == [0, 1, 2]
+    finally:
+        for lease in leases:
+            await lease.release()
+
+    async with session_factory() as db:
+        assert (await db.execute(select(ReferenceNode))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_fixed_node_id_skips_the_lease(session_factory):
+    lease = NodeLease(ReferenceGenerator(42), session_factory)
+
+    await lease.acquire()
+
+    assert lease.node_id is None
+    async with session_factory() as db:
+        assert (await db.execute(select(ReferenceNode))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_taken_over(session_factory):
+    async with session_factory() as db:
+        await db.execute(insert(ReferenceNode), [
+            {"node_id": 0, "owner": "dead:1:x", "expires_at": utcnow() - timedelta(seconds=1)},
+            {"node_id": 1, "owner": "alive:2:y", "expires_at": utcnow() + timedelta(seconds=60)},
+        ])
+        await db.commit()
+
+    lease = NodeLease(ReferenceGenerator(None), session_factory)
+    await lease.acquire()
+    try:
+        assert lease.node_id == 0
+    finally:
+        await lease.release()
+
+
+@pytest.mark.asyncio
+async def test_startup_fails_when_every_node_id_is_leased(session_factory):
+    expires_at = utcnow() + timedelta(seconds=60)
+    async with session_factory() as db:
+        await db.execute(insert(ReferenceNode), [
+            {"node_id": i, "owner": f"host:{i}:x", "expires_at": expires_at} for i in range(MAX_NODE + 1)
+        ])
+        await db.commit()
+
+    lease = NodeLease(ReferenceGenerator(None), session_factory)
+    with pytest.raises(RuntimeError, match="leased"):
+        await lease.acquire()
+    assert lease.generator.node_id is None
+
+
+@pytest.mark.asyncio
+async def test_renewal_notices_a_lost_lease(session_factory):
+    lease = NodeLease(ReferenceGenerator(None), session_factory)
+    await lease.acquire()
+    try:
+        assert await lease._renew()
+
+        # Another process took the id over while this one could not renew
+        async with session_factory() as db:
+            await db.execute(update(ReferenceNode).values(owner="other:3:z"))
+            await db.commit()
+
+        assert not await lease._renew()
+    finally:
+        await lease.release()
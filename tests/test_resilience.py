@@ -0,0 +1,71 @@
+import pytest
+
+from payment_service.app.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+def opened_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    for _ in range(2):
+        breaker.record(False, breaker.before_call())
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_failures_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record(False, breaker.before_call())
+    assert breaker.state == CLOSED
+    breaker.record(False, breaker.before_call())
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_only_one_probe_while_half_open():
+    breaker = opened_breaker()
+
+    assert breaker.before_call() is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_stale_call_does_not_free_the_probe_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    # Started while closed, still in flight when the circuit opens
+    stale = breaker.before_call()
+    breaker.record(False, breaker.before_call())
+    probe = breaker.before_call()
+
+    breaker.record(None, stale)
+    breaker.record(True, stale)
+
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    breaker.record(True, probe)
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens():
+    breaker = opened_breaker()
+    probe = breaker.before_call()
+
+    breaker.record(False, probe)
+
+    assert breaker.state == OPEN
+    # The slot is free again for the next probe
+    assert breaker.before_call() is True
+
+
+def test_cancelled_probe_frees_the_slot():
+    breaker = opened_breaker()
+    probe = breaker.before_call()
+
+    breaker.record(None, probe)
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call() is True
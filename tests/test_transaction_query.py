@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from payment_service.app.models import ArchivedTransaction, Transaction
+from payment_service.app.services.export import TransactionExport
+from payment_service.app.services.transaction_query import TransactionFilters, list_transactions
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def row(i: int, status: str) -> dict:
+    return {
+        "id": i,
+        "email": f"customer{i % 2}@example.com",
+        "amount": 1000 + i,
+        "reference": f"PAY_TEST_{i:04d}",
+        "status": status,
+        "created_at": START + timedelta(days=i),
+    }
+
+
+@pytest.fixture
+def split_tables(db_path):
+    """
+    Rows 1-6 settled and archived, 7-10 in the hot table (9 and 10 pending)
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        conn.execute(insert(ArchivedTransaction.__table__), [
+            {**row(i, "success" if i % 3 else "failed"), "archived_at": START + timedelta(days=200)}
+            for i in range(1, 7)
+        ])
+        conn.execute(insert(Transaction.__table__), [row(i, "pending" if i > 8 else "success") for i in range(7, 11)])
+    engine.dispose()
+
+
+async def walk(session_factory, filters: TransactionFilters, limit: int) -> list:
+    references, cursor = [], None
+    async with session_factory() as db:
+        while True:
+            items, cursor = await list_transactions(db, filters, limit, cursor)
+            references.extend(item["reference"] for item in items)
+            if cursor is None:
+                return references
+
+
+@pytest.mark.asyncio
+async def test_listing_pages_through_hot_and_archived_rows(split_tables, session_factory):
+    references = await walk(session_factory, TransactionFilters(), limit=3)
+
+    assert references == [f"PAY_TEST_{i:04d}" for i in range(10, 0, -1)]
+
+
+@pytest.mark.asyncio
+async def test_listing_filters_apply_to_archived_rows(split_tables, session_factory):
+    filters = TransactionFilters(status="success", created_to=START + timedelta(days=8))
+
+    references = await walk(session_factory, filters, limit=2)
+
+    assert references == ["PAY_TEST_0007", "PAY_TEST_0005", "PAY_TEST_0004", "PAY_TEST_0002", "PAY_TEST_0001"]
+
+
+@pytest.mark.asyncio
+async def test_pending_listing_reads_hot_table_only(split_tables, session_factory):
+    filters = TransactionFilters(status="pending")
+
+    assert filters.models == (Transaction,)
+    assert await walk(session_factory, filters, limit=50) == ["PAY_TEST_0010", "PAY_TEST_0009"]
+
+
+@pytest.mark.asyncio
+async def test_export_includes_archived_rows(split_tables, session_factory):
+    export = TransactionExport(TransactionFilters(email="customer0@example.com"), session_factory=session_factory)
+
+    body = b"".join([chunk async for chunk in export.chunks()]).decode()
+
+    assert [line.split(",")[1] for line in body.splitlines()[1:]] == [
+        f"PAY_TEST_{i:04d}" for i in (2, 4, 6, 8, 10)
+    ]